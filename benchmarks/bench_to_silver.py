@@ -0,0 +1,64 @@
+"""
+Micro-benchmark raw -> silver: implementação anterior (linhas dict + to_numeric/dropna/filtro)
+contra o caminho vetorizado atual de src.transform.to_silver_df.
+
+    python -m benchmarks.bench_to_silver --payloads 10000
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from src.transform import to_silver_df
+
+
+def _to_silver_df_legacy(data: dict) -> pd.DataFrame:
+    base_currency = data.get("base_code")
+    rates = data.get("conversion_rates", {})
+    last_update_unix = data.get("time_last_update_unix")
+    last_update_utc = datetime.fromtimestamp(last_update_unix, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    rows = [
+        {"base_currency": base_currency, "target_currency": cur, "rate": rate, "last_update_utc": last_update_utc}
+        for cur, rate in rates.items()
+    ]
+    df = pd.DataFrame(rows)
+    df['rate'] = pd.to_numeric(df['rate'], errors='coerce')
+    df = df.dropna(subset=['rate'])
+    df = df[df['rate'] > 0]
+    return df
+
+
+def synthetic_payloads(n: int, currencies: int = 162, seed: int = 0) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    codes = [f"C{i:03d}" for i in range(currencies)]
+    t0 = 1_700_000_000
+    out = []
+    for k in range(n):
+        rates = dict(zip(codes, rng.lognormal(0, 2, currencies).round(6).tolist()))
+        out.append({"base_code": "USD", "time_last_update_unix": t0 + 86400 * k, "conversion_rates": rates})
+    return out
+
+
+def _time(fn, payloads) -> float:
+    t = time.perf_counter()
+    for p in payloads:
+        fn(p)
+    return time.perf_counter() - t
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--payloads", type=int, default=10_000)
+    args = ap.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+    payloads = synthetic_payloads(args.payloads)
+    legacy = _time(_to_silver_df_legacy, payloads)
+    fast = _time(to_silver_df, payloads)
+    for name, secs in (("legado", legacy), ("vetorizado", fast)):
+        print(f"{name:>11}: {secs:8.3f}s  {args.payloads / secs:10.1f} payloads/s")
+    print(f"{'ganho':>11}: {legacy / fast:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Suite no estilo pytest-benchmark: `pytest benchmarks -q`.
+Usa o fixture `benchmark` do pytest-benchmark quando instalado; senão um cronômetro simples.
+"""
+import time
+import pytest
+
+try:
+    import pytest_benchmark  # noqa: F401
+    HAS_PLUGIN = True
+except ImportError:
+    HAS_PLUGIN = False
+
+
+if not HAS_PLUGIN:
+    @pytest.fixture
+    def benchmark(request):
+        def run(fn, *args, rounds=20, **kwargs):
+            lat = []
+            for _ in range(rounds):
+                t = time.perf_counter()
+                out = fn(*args, **kwargs)
+                lat.append(time.perf_counter() - t)
+            lat.sort()
+            print(f"\n{request.node.name}: p50={lat[len(lat) // 2] * 1000:.3f} ms  "
+                  f"p95={lat[int(len(lat) * 0.95) - 1] * 1000:.3f} ms")
+            return out
+        return run
@@ -0,0 +1,42 @@
+import contextlib
+import io
+import pytest
+from src import bench
+
+
+@pytest.fixture(scope="module")
+def history(tmp_path_factory):
+    root = tmp_path_factory.mktemp("bench")
+    with contextlib.chdir(root):
+        dates, codes, usd = bench.synthetic_history(120, 170)
+        bench.write_history(dates, codes, usd)
+        yield root, dates, codes, usd
+
+
+def test_to_silver_df(benchmark, history):
+    from src.transform import to_silver_df
+    _, dates, codes, usd = history
+    benchmark(to_silver_df, bench.payload(dates[-1], codes, usd[-1]))
+
+
+def test_to_gold_brl_df(benchmark, history):
+    from src.load import to_gold_brl_df
+    from src.transform import to_silver_df
+    _, dates, codes, usd = history
+    benchmark(to_gold_brl_df, to_silver_df(bench.payload(dates[-1], codes, usd[-1])))
+
+
+def test_compare_dates(benchmark, history):
+    from src.cli import compare_dates
+    root, dates, _, _ = history
+    with contextlib.chdir(root), contextlib.redirect_stdout(io.StringIO()):
+        assert benchmark(compare_dates, dates[0], dates[-1], "gold", None, 10) == 0
+
+
+def test_history_for(benchmark, history):
+    from src.cube import RateCube
+    root, dates, _, _ = history
+    with contextlib.chdir(root):
+        cube = RateCube.open("gold")
+        out = benchmark(cube.to_long, ["USD", "EUR", "BRL", "GBP", "JPY"], dates[-15], dates[-1])
+    assert len(out) == 75
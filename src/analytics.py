@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.cube import RateCube
+from src.runtime import setup_logging
+from src.telemetry import traced
+
+
+ANALYTICS_DIR = Path("data/gold/analytics")
+VOL_WINDOWS = (7, 30, 90)
+EMA_SPANS = (7, 30)
+RING = max(VOL_WINDOWS)
+
+
+class AnalyticsState:
+    """
+    Estado incremental por moeda: último valor, anel com os últimos log-retornos,
+    somas/contagens por janela, EMAs e pico para drawdown.
+    Cada novo dia custa O(moedas), sem reprocessar o histórico. `version`/`stamp`/`rows`
+    guardam a gold vista no último update (store.version, maior mtime e dias até last_date).
+    """
+
+    def __init__(self, currencies: list[str] | None = None):
+        self.currencies: list[str] = []
+        self._col: dict[str, int] = {}
+        self.last_date: str | None = None
+        self.pos = 0
+        self.version: str | None = None
+        self.stamp = 0
+        self.rows = 0
+        self.last = np.empty(0)
+        self.ring = np.empty((RING, 0))
+        self.sums = {w: np.empty(0) for w in VOL_WINDOWS}
+        self.sumsq = {w: np.empty(0) for w in VOL_WINDOWS}
+        self.counts = {w: np.empty(0) for w in VOL_WINDOWS}
+        self.ema = {s: np.empty(0) for s in EMA_SPANS}
+        self.peak = np.empty(0)
+        self.max_dd = np.empty(0)
+        self._extend(currencies or [])
+
+    def _extend(self, currencies: list[str]):
+        new = [c for c in currencies if c not in self._col]
+        if not new:
+            return
+        k = len(new)
+        for c in new:
+            self._col[c] = len(self.currencies)
+            self.currencies.append(c)
+        self.last = np.concatenate([self.last, np.full(k, np.nan)])
+        self.ring = np.concatenate([self.ring, np.full((RING, k), np.nan)], axis=1)
+        for w in VOL_WINDOWS:
+            self.sums[w] = np.concatenate([self.sums[w], np.zeros(k)])
+            self.sumsq[w] = np.concatenate([self.sumsq[w], np.zeros(k)])
+            self.counts[w] = np.concatenate([self.counts[w], np.zeros(k)])
+        for s in EMA_SPANS:
+            self.ema[s] = np.concatenate([self.ema[s], np.full(k, np.nan)])
+        self.peak = np.concatenate([self.peak, np.full(k, np.nan)])
+        self.max_dd = np.concatenate([self.max_dd, np.zeros(k)])
+
+    def update(self, date: str, currencies: list[str], values: np.ndarray) -> pd.DataFrame:
+        """Incorpora um dia (vetor de taxas) e devolve as métricas do dia."""
+        self._extend(currencies)
+        idx = np.array([self._col[c] for c in currencies], dtype=np.intp)
+        x = np.full(len(self.currencies), np.nan)
+        x[idx] = values
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.log(x / self.last)
+        valid = np.isfinite(r)
+        r_in = np.where(valid, r, 0.0)
+
+        for w in VOL_WINDOWS:
+            old = self.ring[(self.pos - w) % RING]
+            old_valid = np.isfinite(old)
+            old_in = np.where(old_valid, old, 0.0)
+            self.sums[w] += r_in - old_in
+            self.sumsq[w] += r_in ** 2 - old_in ** 2
+            self.counts[w] += valid.astype(float) - old_valid.astype(float)
+        self.ring[self.pos % RING] = np.where(valid, r, np.nan)
+        self.pos += 1
+
+        seen = np.isfinite(x)
+        for s in EMA_SPANS:
+            a = 2.0 / (s + 1)
+            prev = self.ema[s]
+            self.ema[s] = np.where(seen, np.where(np.isnan(prev), x, a * x + (1 - a) * prev), prev)
+        self.peak = np.where(seen, np.fmax(self.peak, x), self.peak)
+        dd = np.where(seen, x / self.peak - 1.0, np.nan)
+        self.max_dd = np.where(seen, np.fmin(self.max_dd, dd), self.max_dd)
+        self.last = np.where(seen, x, self.last)
+        self.last_date = date
+
+        out = {"currency": self.currencies, "value": x, "log_return": np.where(valid, r, np.nan)}
+        for w in VOL_WINDOWS:
+            n = self.counts[w]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                var = (self.sumsq[w] - self.sums[w] ** 2 / n) / (n - 1)
+            out[f"vol_{w}d"] = np.where(n >= 2, np.sqrt(np.clip(var, 0.0, None)), np.nan)
+        for s in EMA_SPANS:
+            out[f"ema_{s}"] = self.ema[s]
+        out["drawdown"] = dd
+        out["max_drawdown"] = self.max_dd
+        df = pd.DataFrame(out)
+        return df[seen].reset_index(drop=True)
+
+    def save(self, path: Path):
+        path.mkdir(parents=True, exist_ok=True)
+        arrays = {"last": self.last, "ring": self.ring, "peak": self.peak, "max_dd": self.max_dd}
+        for w in VOL_WINDOWS:
+            arrays[f"sums_{w}"], arrays[f"sumsq_{w}"], arrays[f"counts_{w}"] = self.sums[w], self.sumsq[w], self.counts[w]
+        for s in EMA_SPANS:
+            arrays[f"ema_{s}"] = self.ema[s]
+        meta = {"currencies": self.currencies, "last_date": self.last_date, "pos": self.pos,
+                "version": self.version, "stamp": self.stamp, "rows": self.rows}
+        # metadados dentro do mesmo .npz: uma única troca atômica, sem estado meio gravado
+        np.savez(path / "state.tmp.npz", meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(path / "state.tmp.npz", path / "state.npz")
+        (path / "state.json").unlink(missing_ok=True)  # formato anterior (meta separado)
+
+    @classmethod
+    def load(cls, path: Path) -> "AnalyticsState":
+        st = cls()
+        if not (path / "state.npz").exists():
+            return st
+        with np.load(path / "state.npz") as z:
+            if "meta" in z.files:
+                meta = json.loads(z["meta"].item())
+            elif (path / "state.json").exists():
+                meta = json.loads((path / "state.json").read_text(encoding="utf-8"))
+            else:
+                return st
+            st.currencies = meta["currencies"]
+            st._col = {c: j for j, c in enumerate(st.currencies)}
+            st.last_date = meta["last_date"]
+            st.pos = meta["pos"]
+            st.version, st.stamp, st.rows = meta.get("version"), meta.get("stamp", 0), meta.get("rows", 0)
+            st.last, st.ring, st.peak, st.max_dd = z["last"], z["ring"], z["peak"], z["max_dd"]
+            for w in VOL_WINDOWS:
+                st.sums[w], st.sumsq[w], st.counts[w] = z[f"sums_{w}"], z[f"sumsq_{w}"], z[f"counts_{w}"]
+            for s in EMA_SPANS:
+                st.ema[s] = z[f"ema_{s}"]
+        return st
+
+
+@traced("analytics")
+def update(rebuild: bool = False) -> int:
+    """
+    Aplica ao estado os dias da gold posteriores ao último processado
+    e grava data/gold/analytics/analytics_{dia}.parquet. Retorna o número de dias novos.
+    Dias regravados, inseridos ou removidos até o último processado (carimbos do cubo mais
+    novos que o estado, ou contagem diferente) pedem reconstrução: o estado não os desfaz.
+    """
+    state = AnalyticsState() if rebuild else AnalyticsState.load(ANALYTICS_DIR)
+    cube = RateCube.open("gold")
+    if state.version is not None and state.version == cube.version:
+        logging.info("Analytics já atualizado.")
+        return 0
+    done = cube._rows(None, state.last_date).stop if state.last_date else 0
+    if state.last_date and (done != state.rows or max(cube.stamps[:done], default=0) > state.stamp):
+        logging.info("Dias já processados foram regravados ou inseridos na gold; reconstruindo analytics.")
+        state, done = AnalyticsState(), 0
+    if done < len(cube.dates):
+        dates, ccys, block = cube.slice(None, cube.dates[done], None)
+    else:
+        dates, ccys, block = [], cube.currencies, None
+    ANALYTICS_DIR.mkdir(parents=True, exist_ok=True)
+    for i, day in enumerate(dates):
+        df = state.update(day, ccys, block[i])
+        df.to_parquet(ANALYTICS_DIR / f"analytics_{day}.parquet", index=False)
+    state.version, state.stamp = cube.version, max(cube.stamps, default=0)
+    state.rows = len(cube.dates)
+    state.save(ANALYTICS_DIR)
+    if not dates:
+        logging.info("Analytics já atualizado.")
+        return 0
+    logging.info(f"Analytics atualizado até {state.last_date} ({len(dates)} dia(s)).")
+    return len(dates)
+
+
+def load_day(day: str) -> pd.DataFrame | None:
+    p = ANALYTICS_DIR / f"analytics_{day}.parquet"
+    return pd.read_parquet(p) if p.exists() else None
+
+
+def main():
+    setup_logging()
+    update()
+
+
+if __name__ == "__main__":
+    main()
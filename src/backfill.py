@@ -1,31 +1,44 @@
 import os
 import argparse
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-import requests
 import pandas as pd
-from dotenv import load_dotenv
-from src.transform import to_silver_df
+from src.transform import dump_raw_json, to_silver_df
 from src.load import to_gold_brl_df
+from src.manifest import MANIFEST_PATH, Manifest, hash_frame, hash_payload
+from src.runtime import load_env, setup_logging
+from src.telemetry import span
+from src import goldformat, quality, viewcache
+from src.httpclient import TokenBucket, get_json, iter_json
+from src.ingest import api_url
 
-load_dotenv()
 
 RAW_DIR = Path("data/raw")
 SILVER_DIR = Path("data/silver")
 GOLD_DIR = Path("data/gold")
 BASE = "USD"
 
+# Cota da ExchangeRate API: mantemos um ritmo conservador por padrão;
+# ajuste com --rps conforme o plano contratado.
+DEFAULT_RPS = 2.0
+
+
 def daterange(start: datetime, end: datetime):
     cur = start
     while cur <= end:
         yield cur
         cur += timedelta(days=1)
 
-def fetch_history_day(api_key: str, day_str: str) -> dict:
-    url = f"https://v6.exchangerate-api.com/v6/{api_key}/history/{BASE}/{day_str}"
-    r = requests.get(url, timeout=30)
-    r.raise_for_status()
-    data = r.json()
+def _history_url(api_key: str, day_str: str) -> str:
+    return f"{api_url()}/{api_key}/history/{BASE}/{day_str}"
+
+def fetch_history_day(api_key: str, day_str: str, limiter: TokenBucket | None = None, cache: bool = True) -> dict:
+    return _normalize(get_json(_history_url(api_key, day_str), limiter, cache), day_str)
+
+def _normalize(data: dict, day_str: str) -> dict:
     if "conversion_rates" not in data and "rates" in data:
         data["conversion_rates"] = data["rates"]
     if "base_code" not in data:
@@ -35,7 +48,91 @@ def fetch_history_day(api_key: str, day_str: str) -> dict:
         data["time_last_update_unix"] = int(dt.timestamp())
     return data
 
-def backfill(start_str: str, end_str: str):
+def _paths(day: str) -> dict:
+    return {
+        "raw": RAW_DIR / f"{day}.json",
+        "silver": SILVER_DIR / f"{day}.parquet",
+        "gold": GOLD_DIR / f"exchange_rates_brl_base_{day}.parquet",
+    }
+
+def _is_complete(ledger: Manifest, day: str) -> bool:
+    paths = _paths(day)
+    raw = ledger.get(day, "raw")
+    silver = ledger.get(day, "silver")
+    return (
+        ledger.is_fresh(day, "raw", paths["raw"])
+        and ledger.is_fresh(day, "silver", paths["silver"], raw["content_hash"])
+        and ledger.is_fresh(day, "gold", paths["gold"], silver["content_hash"] if silver else None)
+    )
+
+def _process_day(day: str, data: dict | None, ledger: Manifest, state: quality.QualityState | None = None):
+    """
+    Grava as camadas de um dia. `data=None` reaproveita o raw já salvo (sem chamada à API).
+    Cada camada só é regravada se a entrada (hash da camada anterior) mudou. A silver nova
+    passa pela qualidade com `state` (em memória, dias em ordem de data).
+    """
+    paths = _paths(day)
+    stage = "raw"
+    with span("backfill.day", day=day, fetched=data is not None) as s:
+        try:
+            if data is not None:
+                raw_hash = hash_payload(data)
+                dump_raw_json(data, paths["raw"])
+                ledger.record(day, "raw", raw_hash, api_ts=data.get("time_last_update_unix"))
+            else:
+                raw_hash = ledger.get(day, "raw")["content_hash"]
+
+            stage = "silver"
+            df_silver = None
+            if ledger.is_fresh(day, "silver", paths["silver"], raw_hash):
+                silver_hash = ledger.get(day, "silver")["content_hash"]
+                if state is not None:
+                    df_silver = pd.read_parquet(paths["silver"])
+                    quality.observe(state, day, df_silver)
+            else:
+                if data is None:
+                    data = json.loads(paths["raw"].read_text(encoding="utf-8"))
+                df_silver = quality.check(day, to_silver_df(data), state)
+                df_silver.to_parquet(paths["silver"], index=False)
+                silver_hash = hash_frame(df_silver)
+                ledger.record(day, "silver", silver_hash, raw_hash)
+
+            stage = "gold"
+            if not ledger.is_fresh(day, "gold", paths["gold"], silver_hash):
+                if df_silver is None:
+                    df_silver = pd.read_parquet(paths["silver"])
+                df_gold = to_gold_brl_df(df_silver)
+                goldformat.write(paths["gold"], day, df_gold)
+                viewcache.write(day, df_gold["currency"], df_gold["rate_brl_base"], df_gold["last_update_utc"].iloc[0])
+                ledger.record(day, "gold", hash_frame(df_gold), silver_hash)
+                s.set(rows_out=len(df_gold), bytes_written=paths["gold"].stat().st_size)
+        except Exception:
+            ledger.record(day, stage, status="failed")
+            raise
+
+def _in_order(days: list[str], arrivals):
+    """Reordena resultados que chegam fora de ordem (pool/async) para a sequência de `days`."""
+    ready = {}
+    todo = iter(days)
+    nxt = next(todo, None)
+    for day, result in arrivals:
+        ready[day] = result
+        while nxt is not None and nxt in ready:
+            yield nxt, ready.pop(nxt)
+            nxt = next(todo, None)
+
+def backfill(start_str: str, end_str: str, workers: int = 1, rps: float | None = None, force: bool = False,
+             use_async: bool = False):
+    """
+    Baixa o histórico dia a dia e grava raw/silver/gold.
+    O manifesto (data/manifest.sqlite) permite retomar: dias completos são pulados,
+    dias com raw válido são apenas re-derivados e só os faltantes vão à API.
+    Com workers > 1 as requisições rodam em um pool limitado pelo token-bucket,
+    enquanto a thread principal processa (silver/gold) os dias já recebidos;
+    `use_async` troca o pool de threads pelo cliente assíncrono (httpclient).
+    `force` ignora o manifesto e também o cache HTTP em disco.
+    """
+    load_env()
     api_key = os.getenv("EXCHANGERATE_API_KEY")
     if not api_key:
         raise RuntimeError("EXCHANGERATE_API_KEY ausente no .env")
@@ -44,27 +141,98 @@ def backfill(start_str: str, end_str: str):
     GOLD_DIR.mkdir(parents=True, exist_ok=True)
     d0 = datetime.strptime(start_str, "%Y-%m-%d")
     d1 = datetime.strptime(end_str, "%Y-%m-%d")
-    for d in daterange(d0, d1):
-        day = d.strftime("%Y-%m-%d")
-        data = fetch_history_day(api_key, day)
-        raw_path = RAW_DIR / f"{day}.json"
-        pd.Series(data).to_json(raw_path, force_ascii=False, indent=2)
-        df_silver = to_silver_df(data)
-        silver_path = SILVER_DIR / f"{day}.parquet"
-        df_silver.to_parquet(silver_path, index=False)
-        df_gold = to_gold_brl_df(df_silver)
-        gold_path = GOLD_DIR / f"exchange_rates_brl_base_{day}.parquet"
-        df_gold.to_parquet(gold_path, index=False)
-        md_path = GOLD_DIR / f"daily_summary_{day}.md"
-        if not md_path.exists():
-            md_path.write_text(f"Resumo Cambial - {d.strftime('%d/%m/%Y')}\n\n(Gere com `python -m src.cli enrich` para o dia atual)", encoding="utf-8")
+    days = [d.strftime("%Y-%m-%d") for d in daterange(d0, d1)]
+    limiter = TokenBucket(rps) if rps else None
+    ledger = Manifest(MANIFEST_PATH)
+
+    to_fetch, to_derive = [], []
+    for day in days:
+        if force:
+            to_fetch.append(day)
+        elif _is_complete(ledger, day):
+            continue
+        elif ledger.is_fresh(day, "raw", _paths(day)["raw"]):
+            to_derive.append(day)
+        else:
+            to_fetch.append(day)
+    skipped = len(days) - len(to_fetch) - len(to_derive)
+    if skipped:
+        logging.info(f"Manifesto: {skipped} dia(s) já completos; retomando a partir de {ledger.last_good_day()}.")
+
+    def arrivals():
+        """(dia, payload | None | exceção) na ordem em que ficam prontos."""
+        for day in to_derive:
+            yield day, None
+        if use_async:
+            urls = {_history_url(api_key, day): day for day in to_fetch}
+            for url, result in iter_json(list(urls), max(1, workers), limiter, cache=not force):
+                yield urls[url], result if isinstance(result, Exception) else _normalize(result, urls[url])
+        elif workers <= 1:
+            for day in to_fetch:
+                try:
+                    yield day, fetch_history_day(api_key, day, limiter, not force)
+                except Exception as e:
+                    yield day, e
+        else:
+            pending = {}
+            todo = iter(to_fetch)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # janela limitada de requisições em voo para não acumular payloads na memória
+                for day in todo:
+                    pending[pool.submit(fetch_history_day, api_key, day, limiter, not force)] = day
+                    if len(pending) >= workers * 2:
+                        break
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        day = pending.pop(fut)
+                        yield day, fut.exception() or fut.result()
+                        nxt = next(todo, None)
+                        if nxt:
+                            pending[pool.submit(fetch_history_day, api_key, nxt, limiter, not force)] = nxt
+
+    # a qualidade compara cada dia com os anteriores: silver/gold saem em ordem de data,
+    # com o estado semeado da gold existente antes do dia (e de novo após dias já completos)
+    from src.cube import RateCube
+    cube = RateCube.open("gold")
+    todo_days = set(to_fetch) | set(to_derive)
+    position = {day: i for i, day in enumerate(days)}
+    state, prev = None, None
+    failed = []
+    try:
+        for day, result in _in_order(sorted(todo_days), arrivals()):
+            if state is None or position[day] != prev + 1:
+                state = quality.seed(cube, day)
+            prev = position[day]
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                _process_day(day, result, ledger, state)
+            except Exception as e:
+                logging.error(f"Falha no backfill de {day}: {e}")
+                failed.append(day)
+    finally:
+        ledger.close()
+    if state is not None and quality.commit(state):
+        logging.info(f"Estado de qualidade avançado até {state.last_date}.")
+    # resumos por regras para os dias sem resumo (o LLM fica opcional: enrich --llm-above)
+    from src.enrich import write_templates
+    write_templates(start_str, end_str)
+    logging.info(f"Backfill concluído: {len(days) - len(failed)}/{len(days)} dias ({len(to_fetch)} chamadas à API).")
+    if failed:
+        raise RuntimeError(f"Backfill falhou para {len(failed)} dia(s): {', '.join(sorted(failed))}")
 
 def main():
+    setup_logging()
     p = argparse.ArgumentParser()
     p.add_argument("--start", required=True, help="YYYY-MM-DD")
     p.add_argument("--end", required=True, help="YYYY-MM-DD")
+    p.add_argument("--workers", type=int, default=1, help="requisições concorrentes")
+    p.add_argument("--rps", type=float, default=DEFAULT_RPS, help="limite de requisições por segundo (0 = sem limite)")
+    p.add_argument("--force", action="store_true", help="ignora o manifesto e baixa tudo de novo")
+    p.add_argument("--async", dest="use_async", action="store_true", help="cliente HTTP assíncrono em vez do pool de threads")
     args = p.parse_args()
-    backfill(args.start, args.end)
+    backfill(args.start, args.end, args.workers, args.rps or None, args.force, args.use_async)
 
 if __name__ == "__main__":
     main()
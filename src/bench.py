@@ -0,0 +1,292 @@
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, o pico de RSS não é reportado
+    resource = None
+
+CASES = {}
+
+
+def case(name):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+def _codes(n: int) -> list[str]:
+    return ["BRL", "USD", "EUR", "GBP", "JPY", "ARS"][:n] + [f"C{i:03d}" for i in range(max(0, n - 6))]
+
+
+def synthetic_history(days: int, currencies: int, start: str = "2015-01-01", seed: int = 0):
+    """Passeio aleatório log-normal (dias × moedas) de taxas USD->moeda."""
+    rng = np.random.default_rng(seed)
+    d0 = datetime.strptime(start, "%Y-%m-%d")
+    dates = [(d0 + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+    level = rng.lognormal(0, 2, currencies)
+    level[1] = 1.0
+    steps = rng.normal(0, 0.005, (days, currencies))
+    steps[:, 1] = 0.0
+    return dates, _codes(currencies), level * np.exp(np.cumsum(steps, axis=0))
+
+
+def payload(day: str, codes: list[str], row: np.ndarray) -> dict:
+    ts = int(datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+    return {"base_code": "USD", "time_last_update_unix": ts, "conversion_rates": dict(zip(codes, row.round(6).tolist()))}
+
+
+def write_history(dates, codes, usd):
+    """Grava silver e gold diários em ./data (o benchmark roda dentro de um diretório temporário)."""
+    from src.load import to_gold_brl_df
+    from src.transform import to_silver_df
+    silver_dir, gold_dir = Path("data/silver"), Path("data/gold")
+    silver_dir.mkdir(parents=True, exist_ok=True)
+    gold_dir.mkdir(parents=True, exist_ok=True)
+    for day, row in zip(dates, usd):
+        df = to_silver_df(payload(day, codes, row))
+        df.to_parquet(silver_dir / f"{day}.parquet", index=False)
+        to_gold_brl_df(df).to_parquet(gold_dir / f"exchange_rates_brl_base_{day}.parquet", index=False)
+
+
+def _span_seconds(name: str, since: float) -> list[float]:
+    """Durações (s) dos spans `name` gravados por este processo desde `since` (telemetria em ./data/traces)."""
+    from src.telemetry import load_spans
+    df = load_spans(2)
+    if df.empty or "pid" not in df:
+        return []
+    df = df[(df["span"] == name) & (df["pid"] == os.getpid()) & (df["ts"] >= round(since, 3) - 0.001)]
+    return (df["ms"] / 1000.0).tolist()
+
+
+def _timed(fn, items) -> list[float]:
+    lat = []
+    for it in items:
+        t = time.perf_counter()
+        fn(it)
+        lat.append(time.perf_counter() - t)
+    return lat
+
+
+@case("to_silver_df")
+def _bench_silver(ctx):
+    from src.transform import to_silver_df
+    items = [payload(d, ctx["codes"], r) for d, r in zip(ctx["dates"], ctx["usd"])]
+    return _timed(to_silver_df, items), len(items), len(items) * len(ctx["codes"])
+
+
+@case("to_gold_brl_df")
+def _bench_gold(ctx):
+    from src.load import to_gold_brl_df
+    items = [pd.read_parquet(f"data/silver/{d}.parquet") for d in ctx["dates"][-365:]]
+    return _timed(to_gold_brl_df, items), len(items), len(items) * len(ctx["codes"])
+
+
+@case("compare_dates")
+def _bench_compare(ctx):
+    from src.cli import compare_dates
+    rng = np.random.default_rng(1)
+    pairs = [tuple(sorted(rng.choice(ctx["dates"], 2, replace=False))) for _ in range(50)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        compare_dates(*pairs[0], "gold", None, 10)  # aquece o cubo
+        lat = _timed(lambda p: compare_dates(p[0], p[1], "gold", None, 10), pairs)
+    return lat, len(pairs), len(pairs) * 2 * len(ctx["codes"])
+
+
+@case("history_for")
+def _bench_history(ctx):
+    from src.cube import RateCube
+    picks = ["USD", "EUR", "BRL", "GBP", "JPY"]
+    cube = RateCube.open("gold")
+    days = ctx["dates"]
+    ends = [days[i] for i in np.random.default_rng(2).integers(15, len(days), 200)]
+    lat = _timed(lambda end: cube.to_long(picks, days[days.index(end) - 14], end), ends)
+    return lat, len(ends), len(ends) * 15 * len(picks)
+
+
+@case("history_long")
+def _bench_history_long(ctx):
+    from src import rollup
+    from src.cube import RateCube
+    picks = ["USD", "EUR", "BRL", "GBP", "JPY"]
+    days = ctx["dates"]
+    cube = RateCube.open("gold")
+    rollup.update()
+    starts = [days[i] for i in np.random.default_rng(4).integers(0, max(1, len(days) - 365), 50)]
+    rows = []
+    lat = _timed(lambda start: rows.append(len(rollup.history(picks, start, days[-1], cube=cube)[1])), starts)
+    return lat, len(starts), sum(rows)
+
+
+class _StubAPI(BaseHTTPRequestHandler):
+    codes: list[str] = []
+    row: np.ndarray = np.empty(0)
+
+    def do_GET(self):
+        day = self.path.rsplit("/", 1)[-1]
+        body = json.dumps(payload(day, _StubAPI.codes, _StubAPI.row)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@case("backfill")
+def _bench_backfill(ctx):
+    import src.backfill as bf
+    n = min(len(ctx["dates"]), ctx.get("backfill_days", 90))
+    _StubAPI.codes, _StubAPI.row = ctx["codes"], ctx["usd"][-1]
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StubAPI)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    env = {"EXCHANGERATE_API_URL": f"http://127.0.0.1:{srv.server_port}/v6", "EXCHANGERATE_API_KEY": "bench"}
+    old_env = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        since, t = time.time(), time.perf_counter()
+        bf.backfill("2000-01-01", (datetime(2000, 1, 1) + timedelta(days=n - 1)).strftime("%Y-%m-%d"), workers=8, force=True)
+        total = time.perf_counter() - t
+    finally:
+        srv.shutdown()
+        for k, v in old_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    # latência por dia = span backfill.day (silver/gold de cada dia); a vazão usa o tempo de parede
+    return _span_seconds("backfill.day", since), n, n * len(ctx["codes"]), total
+
+
+@case("enrich")
+def _bench_enrich(ctx):
+    from src import enrich
+    days = ctx["dates"][-ctx.get("enrich_days", 60):]
+    since, t = time.time(), time.perf_counter()
+    enrich.main(start=days[0], end=days[-1], concurrency=8, mode="stub")
+    total = time.perf_counter() - t
+    # um span enrich por pedido (um dia por pedido no padrão), concorrentes: parede à parte
+    return _span_seconds("enrich", since), len(days), len(days), total
+
+
+@case("convert")
+def _bench_convert(ctx):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from src import convert
+    n = ctx.get("convert_rows", 2_000_000)
+    rng = np.random.default_rng(3)
+    days = np.array(ctx["dates"], dtype="datetime64[D]")
+    pq.write_table(pa.table({
+        "amount": rng.uniform(1, 1000, n).round(2),
+        "currency": pa.array(np.array(ctx["codes"])[rng.integers(0, len(ctx["codes"]), n)]).dictionary_encode(),
+        "timestamp": days[rng.integers(0, len(days), n)].astype("datetime64[ms]"),
+    }), "tx.parquet")
+    rates = convert.AsOfRates.from_gold()
+    t = time.perf_counter()
+    convert.convert_file("tx.parquet", "tx_brl.parquet", rates=rates)
+    total = time.perf_counter() - t
+    return [total], 1, n
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _run_case(name: str, ctx: dict):
+    """Roda um caso em um processo novo: o pico de RSS (ru_maxrss) passa a ser só o dele."""
+    logging.disable(logging.WARNING)
+    return CASES[name](ctx), _peak_rss_mb()
+
+
+def run(days: int = 3650, currencies: int = 170, only: list[str] | None = None) -> dict:
+    """
+    Gera o histórico sintético em um diretório temporário e mede cada caso em um processo
+    próprio (spawn). Casos em lote devolvem o tempo de parede à parte das latências; sem
+    latências por item, p50/p95 ficam None.
+    """
+    logging.disable(logging.WARNING)
+    results = {}
+    spawn = multiprocessing.get_context("spawn")
+    try:
+        with tempfile.TemporaryDirectory() as tmp, contextlib.chdir(tmp):
+            dates, codes, usd = synthetic_history(days, currencies)
+            write_history(dates, codes, usd)
+            ctx = {"dates": dates, "codes": codes, "usd": usd}
+            for name in CASES:
+                if only and name not in only:
+                    continue
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                    out, rss = pool.submit(_run_case, name, ctx).result()
+                lat, n_days, n_rows = out[:3]
+                total = out[3] if len(out) > 3 else float(np.sum(lat))
+                results[name] = {
+                    "n": n_days,
+                    "seconds": total,
+                    "days_per_s": n_days / total if total else None,
+                    "rows_per_s": n_rows / total if total else None,
+                    "p50_ms": float(np.percentile(lat, 50) * 1000) if len(lat) else None,
+                    "p95_ms": float(np.percentile(lat, 95) * 1000) if len(lat) else None,
+                    "peak_rss_mb": rss,
+                }
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.2) -> list[str]:
+    """Casos cuja vazão caiu mais que `tolerance` em relação ao baseline."""
+    regressions = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b or not b.get("rows_per_s") or not r.get("rows_per_s"):
+            continue
+        ratio = r["rows_per_s"] / b["rows_per_s"]
+        if ratio < 1 - tolerance:
+            regressions.append(f"{name}: {ratio:.2f}x do baseline")
+    return regressions
+
+
+def report(results: dict, baseline: dict | None = None):
+    print(f"{'caso':<16}{'dias/s':>12}{'linhas/s':>14}{'p50 ms':>10}{'p95 ms':>10}{'RSS MB':>9}{'vs base':>9}")
+    for name, r in results.items():
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "-"
+        p50, p95 = (f"{r[k]:>10.3f}" if r[k] is not None else f"{'-':>10}" for k in ("p50_ms", "p95_ms"))
+        vs = "-"
+        if baseline and baseline.get(name, {}).get("rows_per_s"):
+            vs = f"{r['rows_per_s'] / baseline[name]['rows_per_s']:.2f}x"
+        print(f"{name:<16}{r['days_per_s']:>12,.1f}{r['rows_per_s']:>14,.0f}{p50}{p95}{rss:>9}{vs:>9}")
+
+
+def main(days: int = 3650, currencies: int = 170, only: list[str] | None = None,
+         baseline: str | None = None, save: str | None = None, tolerance: float = 0.2) -> int:
+    results = run(days, currencies, only)
+    base = json.loads(Path(baseline).read_text(encoding="utf-8")) if baseline else None
+    report(results, base)
+    if save:
+        Path(save).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nBaseline salvo em {save}")
+    if base:
+        regressions = compare(results, base, tolerance)
+        if regressions:
+            print("\nRegressões: " + "; ".join(regressions))
+            return 1
+    return 0
@@ -1,10 +1,12 @@
 import argparse
+from datetime import datetime
 from pathlib import Path
-import pandas as pd
-from src.ingest import main as ingest_main
-from src.transform import main as transform_main
-from src.load import main as load_main
-from src.enrich import main as enrich_main
+from src import server, telemetry, viewcache
+from src.runtime import setup_logging
+
+# Dependências pesadas (pandas, pyarrow, requests, openai) são importadas dentro de cada
+# subcomando: o `view` com cache compacto responde só com a biblioteca padrão.
+# Com `cli serve` rodando, view/compare consultam o servidor antes de abrir o cubo.
 
 GOLD_DIR = Path("data/gold")
 SILVER_DIR = Path("data/silver")
@@ -19,29 +21,70 @@ def _pick_file(dirpath: Path, pattern: str, date_str: str | None) -> Path | None
 def _fmt_decimal(x: float, places: int = 6) -> str:
     return f"{x:,.{places}f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-def view_gold(date: str | None, currencies: list[str] | None, top: int | None) -> int:
-    p = _pick_file(GOLD_DIR, "exchange_rates_brl_base_{date}.parquet", date)
-    if not p:
-        print("Nenhum arquivo encontrado em data/gold para a data solicitada.")
-        return 1
-    df = pd.read_parquet(p)[["currency", "rate_brl_base", "last_update_utc"]].copy()
+def _table(headers: list[str], rows: list[list[str]]) -> str:
+    """Tabela alinhada à direita, no mesmo formato de DataFrame.to_string(index=False)."""
+    widths = [max([len(h)] + [len(r[i]) for r in rows]) for i, h in enumerate(headers)]
+    lines = [" ".join(h.rjust(w) for h, w in zip(headers, widths))]
+    lines += [" ".join(c.rjust(w) for c, w in zip(r, widths)) for r in rows]
+    return "\n".join(lines)
+
+def _print_view(date: str, base: str, items: list[tuple[str, float]], updated: str,
+                currencies: list[str] | None, top: int | None) -> int:
     if currencies:
         wanted = [c.upper() for c in currencies]
-        found = df["currency"].str.upper().isin(wanted)
-        missing = [c for c in wanted if c not in set(df["currency"].str.upper())]
+        available = {c for c, _ in items}
+        missing = [c for c in wanted if c not in available]
         if missing:
-            print(f"Moedas não encontradas no arquivo {p.name}: {', '.join(missing)}")
-        df = df[found]
+            print(f"Moedas não encontradas em {date}: {', '.join(missing)}")
+        items = [(c, v) for c, v in items if c in set(wanted)]
     if top:
-        df = df.sort_values("rate_brl_base", ascending=False).head(top)
-    df = df.sort_values("currency").reset_index(drop=True)
-    df["rate_brl_base"] = df["rate_brl_base"].map(_fmt_decimal)
-    print(f"\n[GOLD/BRL] Arquivo: {p}")
-    print(df.to_string(index=False))
+        items = sorted(items, key=lambda cv: -cv[1])[:top]
+    items = sorted(items)
+    rows = [[c, _fmt_decimal(v), updated] for c, v in items]
+    print(f"\n[GOLD/{base}] Data: {date}")
+    print(_table(["currency", f"rate_{base.lower()}_base", "last_update_utc"], rows))
     print()
     return 0
 
+def view_gold(date: str | None, currencies: list[str] | None, top: int | None, base: str = "BRL") -> int:
+    base = base.upper()
+    if base == "BRL":
+        entry = viewcache.read(date)
+        if entry is not None:
+            return _print_view(entry["date"], base, list(entry["rates"].items()), entry["updated"], currencies, top)
+    resp = server.query("rate" if base == "BRL" else "cross", {"date": date, "base": base})
+    if resp is not None and "rates" in resp:
+        return _print_view(resp["date"], base, list(resp["rates"].items()), resp["updated"], currencies, top)
+
+    import numpy as np
+    from src.crossrate import cross_table
+    from src.cube import RateCube
+    from src.store import version
+    cube = RateCube.open("gold")
+    if cube.empty or (date and date not in cube.date_index):
+        print("Nenhum arquivo encontrado em data/gold para a data solicitada.")
+        return 1
+    date = date or cube.dates[-1]
+    if base == "BRL":
+        values = cube.cross_section(date)
+        ccys = np.array(cube.currencies)
+    else:
+        try:
+            table = cross_table(date, base, version("silver") + version("gold"))
+        except KeyError as e:
+            print(e.args[0])
+            return 1
+        values = table[f"rate_{base.lower()}_base"].to_numpy()
+        ccys = table["currency"].to_numpy(dtype=str)
+    mask = ~np.isnan(values)
+    updated = cube.updated[cube.date_index[date]]
+    if base == "BRL":
+        viewcache.write(date, ccys[mask], values[mask], updated)
+    items = [(str(c), float(v)) for c, v in zip(ccys[mask], values[mask])]
+    return _print_view(date, base, items, updated, currencies, top)
+
 def view_silver(date: str | None, currencies: list[str] | None, top: int | None) -> int:
+    import pandas as pd
     p = _pick_file(SILVER_DIR, "{date}.parquet", date)
     if not p:
         print("Nenhum arquivo encontrado em data/silver para a data solicitada.")
@@ -60,52 +103,187 @@ def view_silver(date: str | None, currencies: list[str] | None, top: int | None)
     print()
     return 0
 
-def _load_layer_row(layer: str, path: Path) -> pd.DataFrame:
-    if layer == "gold":
-        df = pd.read_parquet(path)[["currency", "rate_brl_base"]].copy()
-        df = df.rename(columns={"rate_brl_base": "value"})
-    else:
-        df = pd.read_parquet(path)[["target_currency", "rate"]].copy()
-        df = df.rename(columns={"target_currency": "currency", "rate": "value"})
-    df["currency"] = df["currency"].astype(str)
-    return df
+def view_ticks(at: str | None, currencies: list[str] | None) -> int:
+    import time
+    from datetime import timezone
+    from src.ticks import TickStore
+    hit = TickStore().at(at if at is not None else int(time.time()), currencies or ["BRL", "EUR", "GBP", "JPY"])
+    if hit is None:
+        print("Nenhum tick encontrado em data/ticks até o instante solicitado.")
+        return 1
+    ts, rates = hit
+    when = datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    print(f"\n[TICKS/base=USD] Tick: {when} UTC ({ts})")
+    print(_table(["currency", "rate"], [[c, _fmt_decimal(v)] for c, v in sorted(rates.items())]))
+    print()
+    return 0
+
+def view_quality(date: str | None, rebuild: bool = False) -> int:
+    from src import quality
+    if rebuild:
+        quality.rebuild()
+    if date is None:
+        reports = sorted(quality.QUALITY_DIR.glob("quality_*.json")) if quality.QUALITY_DIR.exists() else []
+        if not reports:
+            print("Nenhum relatório de qualidade encontrado.")
+            return 1
+        date = reports[-1].stem.removeprefix("quality_")
+    report = quality.load_report(date)
+    if report is None:
+        print(f"Sem relatório de qualidade para {date}.")
+        return 1
+    drift = report["drift"]
+    print(f"\nQualidade {report['date']}: {report['status'].upper()}  "
+          f"({report['currencies']} moedas, {report['flagged']} sinalizada(s), {report['quarantined']} em quarentena)")
+    for e in report["errors"]:
+        print(f"  erro: {e}")
+    if drift["missing"] or drift["new"]:
+        print(f"  saíram: {', '.join(drift['missing']) or '-'}  entraram: {', '.join(drift['new']) or '-'}")
+    if report["outliers"]:
+        rows = [[o["currency"], _fmt_decimal(o["rate"]),
+                 "" if o["log_return"] is None else f"{o['log_return']:+.4f}".replace(".", ","),
+                 "" if o["z"] is None else f"{o['z']:+.1f}".replace(".", ","), o["status"]]
+                for o in report["outliers"]]
+        print(_table(["currency", "rate", "log_ret", "z", "status"], rows))
+    print()
+    return 0
+
+
+def view_gaps(start: str | None, end: str | None, fill: str | None, limit: int | None, force: bool) -> int:
+    import numpy as np
+    from src import gaps, goldformat, store
+    filled = goldformat.filled_days(store.LAYERS["gold"]["dir"])
+    observed = [d for d in store.list_dates("gold") if d not in filled]
+    missing = gaps.missing_dates(observed, start, end)
+    if not missing:
+        print("\nNenhuma lacuna no calendário da gold.\n")
+        return 0
+    days = np.array(missing, dtype="datetime64[D]")
+    breaks = np.flatnonzero(np.diff(days) != np.timedelta64(1, "D")) + 1
+    rows = []
+    for run in np.split(days, breaks):
+        first, last = str(run[0]), str(run[-1])
+        marks = sorted({filled[d] for d in run.astype(str) if d in filled})
+        rows.append([first, last, str(len(run)), ", ".join(marks) or "-"])
+    print(f"\n{len(missing)} dia(s) sem dados observados em {len(rows)} lacuna(s)")
+    print(_table(["início", "fim", "dias", "preenchido"], rows))
+    print()
+    if fill:
+        written = gaps.repair(fill, start, end, limit, force)
+        print(f"{len(written)} dia(s) gravados na gold com provenance={fill}.\n")
+    return 0
+
+
+def view_stats(days: int, stage: str | None, runs: int | None, fmt: str, out: str | None) -> int:
+    agg = telemetry.aggregate(telemetry.load_spans(days), stage, runs)
+    if agg.empty:
+        print("Nenhum span registrado (data/traces).")
+        return 1
+    if fmt == "openmetrics":
+        text = telemetry.to_openmetrics(agg)
+        if out:
+            with open(out, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            print(text, end="")
+        return 0
+    fmt_num = lambda v, p=1: "" if v != v else f"{v:,.{p}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    headers = ["span", "calls", "err", "p50_ms", "p95_ms", "max_ms", "total_s", "rows_out", "MB_written", "http_ms", "tokens", "US$"]
+    rows = []
+    for name, r in agg.iterrows():
+        tokens = r.get("tokens_in", float("nan")) + r.get("tokens_out", float("nan"))
+        rows.append([str(name), str(int(r["calls"])), str(int(r["errors"])),
+                     fmt_num(r["p50_ms"]), fmt_num(r["p95_ms"]), fmt_num(r["max_ms"]), fmt_num(r["total_s"], 3),
+                     fmt_num(r.get("rows_out", float("nan")), 0), fmt_num(r.get("bytes_written", float("nan")) / 1e6, 2),
+                     fmt_num(r.get("http_ms", float("nan"))), fmt_num(tokens, 0), fmt_num(r.get("cost_usd", float("nan")), 4)])
+    scope = f"últimas {runs} execuções" if runs else f"últimos {days} dia(s)"
+    print(f"\nSpans por etapa ({scope}), ordenados pelo tempo total")
+    print(_table(headers, rows))
+    print()
+    return 0
+
+
+def view_history(currencies: list[str] | None, start: str | None, end: str | None, points: int,
+                 resolution: str | None, rebuild: bool) -> int:
+    from src import rollup
+    if rebuild:
+        rollup.update(rebuild=True)
+    currencies = [c.upper() for c in currencies] if currencies else None
+    res, df = rollup.history(currencies, start, end, points, resolution)
+    if df.empty:
+        print("Sem histórico para o período/moedas informados.")
+        return 1
+    rows = [[r.period, r.currency] + [_fmt_decimal(getattr(r, c)) for c in ("open", "high", "low", "close", "mean")]
+            + [str(r.n_obs)] for r in df.itertuples(index=False)]
+    label = {"day": "diário", "week": "semanal", "month": "mensal", "year": "anual"}[res]
+    print(f"\nHistórico {label} ({df['period'].nunique()} período(s))")
+    print(_table(["período", "moeda", "abertura", "máxima", "mínima", "fechamento", "média", "dias"], rows))
+    print()
+    return 0
+
+
+def view_convert(src: str, dst: str, amount: str, currency: str, timestamp: str, epoch: str | None,
+                 chunk_rows: int, workers: int) -> int:
+    from src.convert import convert_file
+    try:
+        r = convert_file(src, dst, amount, currency, timestamp, epoch, chunk_rows, workers)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Falha na conversão: {e}")
+        return 1
+    per_min = r["rows_per_s"] * 60 if r["rows_per_s"] else 0.0
+    print(f"\nConversão → {dst}")
+    print(_table(["linhas", "sem_taxa", "segundos", "linhas/min"], [[
+        f"{r['rows']:,}".replace(",", "."), f"{r['unmatched']:,}".replace(",", "."),
+        _fmt_decimal(r["seconds"], 2), f"{per_min:,.0f}".replace(",", "."),
+    ]]))
+    print()
+    return 0
+
 
 def compare_dates(date1: str, date2: str, layer: str, currencies: list[str] | None, top: int | None) -> int:
-    pattern = "exchange_rates_brl_base_{date}.parquet" if layer == "gold" else "{date}.parquet"
-    dirpath = GOLD_DIR if layer == "gold" else SILVER_DIR
-    p1 = _pick_file(dirpath, pattern, date1)
-    p2 = _pick_file(dirpath, pattern, date2)
-    if not p1 or not p2:
+    return compare_many([date1, date2], None, None, "consecutive", layer, currencies, top)
+
+def compare_many(dates: list[str], start: str | None, end: str | None, mode: str, layer: str,
+                 currencies: list[str] | None, top: int | None, fmt: str = "table", out: str | None = None) -> int:
+    import numpy as np
+    from src import compare
+    if layer == "gold" and fmt == "table" and len(dates) == 2 and not (start or end):
+        curr = ",".join(currencies) if currencies else None
+        resp = server.query("compare", {"date1": dates[0], "date2": dates[1], "currencies": curr, "top": top})
+        if resp is not None and "rows" in resp:
+            rows = resp["rows"]
+            chunk = {k: np.array([r[k] for r in rows]) for k in ("currency", "value1", "value2", "delta", "pct")}
+            chunk.update(date1=np.full(len(rows), dates[0]), date2=np.full(len(rows), dates[1]))
+            compare.print_tables([chunk], layer)
+            return 0
+
+    from src.cube import RateCube
+    cube = RateCube.open(layer)
+    if any(d not in cube.date_index for d in dates):
         print("Arquivo(s) não encontrado(s) para as datas informadas.")
         return 1
-    d1 = _load_layer_row(layer, p1)
-    d2 = _load_layer_row(layer, p2)
-    df = d1.merge(d2, on="currency", how="inner", suffixes=(f"_{date1}", f"_{date2}"))
-    df["delta"] = df[f"value_{date2}"] - df[f"value_{date1}"]
-    df["pct"] = (df["delta"] / df[f"value_{date1}"]) * 100.0
-    if currencies:
-        wanted = [c.upper() for c in currencies]
-        df = df[df["currency"].str.upper().isin(wanted)]
-    df = df.sort_values("pct", key=lambda s: s.abs(), ascending=False)
-    if top:
-        df = df.head(top)
-    df_form = df.copy()
-    df_form[f"value_{date1}"] = df_form[f"value_{date1}"].map(lambda x: _fmt_decimal(x, 6))
-    df_form[f"value_{date2}"] = df_form[f"value_{date2}"].map(lambda x: _fmt_decimal(x, 6))
-    df_form["delta"] = df_form["delta"].map(lambda x: _fmt_decimal(x, 6))
-    df_form["pct"] = df_form["pct"].map(lambda x: f"{x:+.2f}%".replace(".", ","))
-    header = "GOLD (BRL)" if layer == "gold" else "SILVER (base USD)"
-    print(f"\nComparação {header}\n  {p1.name}  →  {p2.name}")
-    cols = ["currency", f"value_{date1}", f"value_{date2}", "delta", "pct"]
-    print(df_form[cols].to_string(index=False))
-    print()
+    picked = compare.select_dates(cube, dates, start, end)
+    if len(picked) < 2:
+        print("São necessárias ao menos duas datas com dados para comparar.")
+        return 1
+    chunks = compare.iter_chunks(cube, picked, mode, currencies, top)
+    if fmt == "table":
+        compare.print_tables(chunks, layer)
+    else:
+        compare.write_stream(chunks, fmt, out)
     return 0
 
 def main():
     parser = argparse.ArgumentParser("FX Pipeline")
     sub = parser.add_subparsers(dest="cmd", required=True)
 
-    sub.add_parser("ingest")
+    p_ingest = sub.add_parser("ingest")
+    p_ingest.add_argument("--intraday", action="store_true", help="acrescenta um tick em data/ticks em vez de sobrescrever a raw do dia")
+    p_ingest.add_argument("--close", metavar="DATE", help="consolida os ticks do dia (UTC) na raw/silver/gold")
+
+    p_ticks = sub.add_parser("ticks")
+    p_ticks.add_argument("--at", default=None, help="instante UTC (ISO ou unix); padrão: último tick")
+    p_ticks.add_argument("--curr", nargs="*")
     sub.add_parser("transform")
     sub.add_parser("load")
 
@@ -113,13 +291,35 @@ def main():
     p_enrich.add_argument("--date")
     p_enrich.add_argument("--start")
     p_enrich.add_argument("--end")
+    p_enrich.add_argument("--concurrency", type=int, default=4)
+    p_enrich.add_argument("--mode", choices=["live", "replay", "stub", "template"], default=None,
+                          help="template: resumo por regras, sem LLM")
+    p_enrich.add_argument("--retries", type=int, default=8)
+    p_enrich.add_argument("--llm-above", type=float, metavar="PCT",
+                          help="resumo por regras em todos os dias e LLM só onde USD/EUR variaram >= PCT%%")
+    p_enrich.add_argument("--llm-max", type=int, help="no máximo N dias ao LLM (os de maior variação)")
+    p_enrich.add_argument("--force", action="store_true", help="regrava resumos existentes com o template")
+    p_enrich.add_argument("--model", help="modelo do LLM (padrão: ENRICH_MODEL ou gpt-4o-mini)")
+    p_enrich.add_argument("--max-tokens", type=int, help="tokens de saída por dia (padrão: ENRICH_MAX_TOKENS ou 300)")
+    p_enrich.add_argument("--prompt-budget", type=int, metavar="TOKENS",
+                          help="orçamento estimado do prompt por pedido (padrão: ENRICH_PROMPT_BUDGET ou 700)")
+    p_enrich.add_argument("--batch", type=int, metavar="N", help="até N dias por pedido ao LLM (padrão: ENRICH_BATCH ou 1)")
 
-    sub.add_parser("all")
+    p_analytics = sub.add_parser("analytics")
+    p_analytics.add_argument("--rebuild", action="store_true")
+
+    p_all = sub.add_parser("all")
+    p_all.add_argument("--date")
+    p_all.add_argument("--start")
+    p_all.add_argument("--end")
+    p_all.add_argument("--workers", type=int, default=1, help="processos para partições de datas independentes")
+    p_all.add_argument("--force", action="store_true", help="ignora o skip-if-fresh")
 
     p_view = sub.add_parser("view")
     p_view.add_argument("--date", default=None)
     p_view.add_argument("--curr", nargs="*")
     p_view.add_argument("--top", type=int)
+    p_view.add_argument("--base", default="BRL", help="moeda base (cross-rate derivada da silver)")
 
     p_view_s = sub.add_parser("view-silver")
     p_view_s.add_argument("--date", default=None)
@@ -127,36 +327,151 @@ def main():
     p_view_s.add_argument("--top", type=int)
 
     p_cmp = sub.add_parser("compare")
-    p_cmp.add_argument("date1")
-    p_cmp.add_argument("date2")
+    p_cmp.add_argument("dates", nargs="*", help="duas ou mais datas (ou use --start/--end)")
+    p_cmp.add_argument("--start")
+    p_cmp.add_argument("--end")
+    p_cmp.add_argument("--mode", choices=["consecutive", "pairwise", "window"], default="consecutive",
+                       help="pares consecutivos, todos contra todos ou início→fim (top movers da janela)")
     p_cmp.add_argument("--layer", choices=["gold", "silver"], default="gold")
     p_cmp.add_argument("--curr", nargs="*")
     p_cmp.add_argument("--top", type=int)
+    p_cmp.add_argument("--format", choices=["table", "csv", "arrow"], default="table")
+    p_cmp.add_argument("--out", help="arquivo de saída para csv/arrow (padrão: stdout)")
+
+    p_serve = sub.add_parser("serve")
+    p_serve.add_argument("--host", default=server.DEFAULT_HOST)
+    p_serve.add_argument("--port", type=int, default=server.DEFAULT_PORT)
+    p_serve.add_argument("--poll", type=float, default=server.POLL_SECONDS, help="segundos entre checagens de novas partições")
+
+    p_gaps = sub.add_parser("gaps", help="lista dias faltantes na gold e opcionalmente os preenche")
+    p_gaps.add_argument("--start")
+    p_gaps.add_argument("--end")
+    p_gaps.add_argument("--fill", choices=["ffill", "linear"], help="materializa os dias faltantes com esse método")
+    p_gaps.add_argument("--limit", type=int, help="não preenche lacunas com mais de N dias")
+    p_gaps.add_argument("--force", action="store_true", help="regrava também os dias já preenchidos")
+
+    p_stats = sub.add_parser("stats", help="p50/p95 por etapa a partir dos spans gravados em data/traces")
+    p_stats.add_argument("--days", type=int, default=7, help="janela de arquivos diários lidos (padrão: 7)")
+    p_stats.add_argument("--stage", help="prefixo do span (ex.: http, cli.view, load)")
+    p_stats.add_argument("--runs", type=int, help="só as N execuções mais recentes")
+    p_stats.add_argument("--format", choices=["table", "openmetrics"], default="table")
+    p_stats.add_argument("--out", help="arquivo de saída para openmetrics (padrão: stdout)")
+
+    p_hist = sub.add_parser("history", help="série longa com OHLC por semana/mês/ano (rollups da gold)")
+    p_hist.add_argument("--curr", nargs="*", default=["USD", "EUR"])
+    p_hist.add_argument("--start")
+    p_hist.add_argument("--end")
+    p_hist.add_argument("--points", type=int, default=600, help="máximo de períodos; escolhe a resolução (padrão: 600)")
+    p_hist.add_argument("--resolution", choices=["day", "week", "month", "year"], help="força a resolução")
+    p_hist.add_argument("--rebuild", action="store_true", help="recalcula todos os rollups antes da consulta")
+
+    p_convert = sub.add_parser("convert", help="converte um arquivo de transações (CSV/Parquet) para BRL pela taxa da data")
+    p_convert.add_argument("src", help="arquivo de entrada (.csv ou .parquet)")
+    p_convert.add_argument("dst", help="arquivo de saída; o formato segue a extensão")
+    p_convert.add_argument("--amount-col", default="amount")
+    p_convert.add_argument("--currency-col", default="currency")
+    p_convert.add_argument("--time-col", default="timestamp")
+    p_convert.add_argument("--epoch", choices=["s", "ms"], help="timestamp numérico (epoch) nessa unidade")
+    p_convert.add_argument("--chunk-rows", type=int, default=1_000_000, help="linhas por lote (padrão: 1.000.000)")
+    p_convert.add_argument("--workers", type=int, help="lotes convertidos em paralelo (padrão: núcleos, até 8)")
+
+    p_quality = sub.add_parser("quality", help="relatório de qualidade de um dia ou recálculo do histórico")
+    p_quality.add_argument("--date", help="YYYY-MM-DD (padrão: último relatório)")
+    p_quality.add_argument("--rebuild", action="store_true", help="recalcula relatórios e estado a partir da gold")
+
+    p_compact = sub.add_parser("compact")
+    p_compact.add_argument("--layer", choices=["gold", "silver"], default="gold")
+
+    p_fmt = sub.add_parser("gold-format", help="converte a gold diária entre os formatos de armazenamento")
+    p_fmt.add_argument("--to", choices=["parquet", "compact", "delta"], required=True)
+
+    p_bench = sub.add_parser("bench")
+    p_bench.add_argument("--days", type=int, default=3650, help="dias sintéticos (padrão: 10 anos)")
+    p_bench.add_argument("--currencies", type=int, default=170)
+    p_bench.add_argument("--only", nargs="*", help="casos a medir (padrão: todos)")
+    p_bench.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    p_bench.add_argument("--save", help="grava os resultados como baseline JSON")
+    p_bench.add_argument("--tolerance", type=float, default=0.2, help="queda de vazão aceita antes de falhar")
 
     args = parser.parse_args()
+    setup_logging()
 
+    # cada comando vira um span (cli.view, cli.compare, ...): `cli stats` mostra a latência vista pelo usuário
+    with telemetry.span(f"cli.{args.cmd}"):
+        _dispatch(args, parser)
+
+
+def _dispatch(args, parser):
     if args.cmd == "ingest":
-        ingest_main()
+        from src.ingest import main as ingest_main
+        ingest_main(args.intraday, args.close)
+    elif args.cmd == "ticks":
+        raise SystemExit(view_ticks(args.at, args.curr))
     elif args.cmd == "transform":
+        from src.transform import main as transform_main
         transform_main()
     elif args.cmd == "load":
+        from src.load import main as load_main
         load_main()
     elif args.cmd == "enrich":
-        enrich_main(args.date, args.start, args.end)
+        from src.enrich import main as enrich_main
+        enrich_main(args.date, args.start, args.end, args.concurrency, args.mode, args.retries,
+                    args.llm_above, args.llm_max, args.force, args.model, args.max_tokens,
+                    args.prompt_budget, args.batch)
+    elif args.cmd == "analytics":
+        from src.analytics import update as analytics_update
+        analytics_update(args.rebuild)
     elif args.cmd == "all":
-        ingest_main(); transform_main(); load_main(); enrich_main(None, None, None)
+        from src.pipeline import days_between, run_pipeline
+        if args.start and args.end:
+            days = days_between(args.start, args.end)
+        else:
+            days = [args.date or datetime.now().strftime("%Y-%m-%d")]
+        run_pipeline(days, args.workers, args.force)
     elif args.cmd == "view":
         if args.curr is None and args.top is None:
             args.curr = ["USD", "EUR", "BRL", "GBP", "JPY"]
-        raise SystemExit(view_gold(args.date, args.curr, args.top))
+        raise SystemExit(view_gold(args.date, args.curr, args.top, args.base))
     elif args.cmd == "view-silver":
         if args.curr is None and args.top is None:
             args.curr = ["USD", "EUR", "BRL", "GBP", "JPY"]
         raise SystemExit(view_silver(args.date, args.curr, args.top))
     elif args.cmd == "compare":
-        if args.curr is None and args.top is None:
+        if args.curr is None and args.top is None and args.format == "table":
             args.top = 10
-        raise SystemExit(compare_dates(args.date1, args.date2, args.layer, args.curr, args.top))
+        if len(args.dates) < 2 and not (args.start or args.end):
+            parser.error("compare: informe ao menos duas datas ou --start/--end")
+        raise SystemExit(compare_many(args.dates, args.start, args.end, args.mode, args.layer,
+                                      args.curr, args.top, args.format, args.out))
+    elif args.cmd == "bench":
+        from src.bench import main as bench_main
+        raise SystemExit(bench_main(args.days, args.currencies, args.only, args.baseline, args.save, args.tolerance))
+    elif args.cmd == "serve":
+        server.serve(args.host, args.port, args.poll)
+    elif args.cmd == "gold-format":
+        from src.goldformat import convert
+        r = convert(args.to)
+        print(f"\nGold → {r['format']}: {r['files']} arquivo(s)")
+        print(_table(["", "bytes", "load_ms"], [
+            ["antes", f"{r['bytes_before']:,}".replace(",", "."), f"{r['load_s_before'] * 1000:.1f}"],
+            ["depois", f"{r['bytes_after']:,}".replace(",", "."), f"{r['load_s_after'] * 1000:.1f}"],
+        ]))
+        print()
+    elif args.cmd == "gaps":
+        raise SystemExit(view_gaps(args.start, args.end, args.fill, args.limit, args.force))
+    elif args.cmd == "stats":
+        raise SystemExit(view_stats(args.days, args.stage, args.runs, args.format, args.out))
+    elif args.cmd == "history":
+        raise SystemExit(view_history(args.curr, args.start, args.end, args.points, args.resolution, args.rebuild))
+    elif args.cmd == "convert":
+        from src.convert import DEFAULT_WORKERS
+        raise SystemExit(view_convert(args.src, args.dst, args.amount_col, args.currency_col, args.time_col,
+                                      args.epoch, args.chunk_rows, args.workers or DEFAULT_WORKERS))
+    elif args.cmd == "quality":
+        raise SystemExit(view_quality(args.date, args.rebuild))
+    elif args.cmd == "compact":
+        from src.store import compact
+        compact(args.layer)
 
 if __name__ == "__main__":
     main()
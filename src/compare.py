@@ -0,0 +1,200 @@
+"""
+Comparação entre N datas sobre a matriz do RateCube. Os pares (consecutivos, todos contra
+todos ou início→fim da janela) viram índices de linha e as variações saem de uma única
+operação vetorial por lote; ranking por argpartition e formatação feita sobre arrays.
+"""
+import sys
+import numpy as np
+from src.cube import RateCube
+
+MODES = ("consecutive", "pairwise", "window")
+CHUNK_PAIRS = 256
+
+
+def pairs_for(n: int, mode: str) -> tuple[np.ndarray, np.ndarray]:
+    """Índices (a, b) dos pares de datas, a < b, em ordem cronológica."""
+    if n < 2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    if mode == "consecutive":
+        a = np.arange(n - 1)
+        return a, a + 1
+    if mode == "pairwise":
+        return np.triu_indices(n, k=1)
+    if mode == "window":
+        return np.array([0]), np.array([n - 1])
+    raise ValueError(f"Modo inválido: {mode} (use {', '.join(MODES)})")
+
+
+def deltas(block: np.ndarray, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(v1, v2, delta, pct), cada um (pares × moedas), para as linhas a→b da matriz."""
+    v1, v2 = block[a], block[b]
+    delta = v2 - v1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = delta / v1 * 100.0
+    return v1, v2, delta, pct
+
+
+def top_movers(pct: np.ndarray, k: int | None) -> np.ndarray:
+    """
+    Colunas ordenadas por |pct| decrescente em cada linha (NaN por último), cortadas em k.
+    Com k pequeno usa argpartition: O(moedas) por par em vez de ordenar tudo.
+    """
+    key = np.where(np.isnan(pct), -np.inf, np.abs(pct))
+    n = key.shape[1]
+    if k and k < n:
+        part = np.argpartition(-key, k - 1, axis=1)[:, :k]
+        sub = np.take_along_axis(key, part, axis=1)
+        order = np.argsort(-sub, axis=1, kind="stable")
+        return np.take_along_axis(part, order, axis=1)
+    return np.argsort(-key, axis=1, kind="stable")
+
+
+def _fmt_scalar(v: float, places: int, group: bool, plus: bool) -> str:
+    s = f"{v:{'+' if plus else ''}{',' if group else ''}.{places}f}"
+    return s.replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _fmt_column(x: np.ndarray, places: int, group: bool, plus: bool = False) -> np.ndarray:
+    """
+    Formata um array numérico como coluna alinhada à direita (largura comum), montando os
+    dígitos com aritmética inteira numa matriz de bytes em vez de formatar célula a célula.
+    Valores fora da faixa exata do int64 ou a um ulp de um empate de arredondamento
+    passam pelo formatador escalar, então o texto é idêntico ao de f"{v:,.6f}". NaN → ''.
+    """
+    x = np.asarray(x, dtype="float64").ravel()
+    n = len(x)
+    nan = np.isnan(x)
+    ax = np.where(nan, 0.0, np.abs(x))
+    r = ax * 10.0 ** places
+    tie = np.abs(r - np.floor(r) - 0.5) <= 4e-16 * r + 1e-300
+    slow = ~nan & ((ax >= 1e12) | tie)
+    scaled = np.rint(np.where(slow, 0.0, r)).astype(np.int64)
+    ip, frac = np.divmod(scaled, 10 ** places)
+    ndig = np.floor(np.log10(np.maximum(ip, 1))).astype(np.int64) + 1
+    neg = np.signbit(x) & ~nan
+    sign = (neg | plus).astype(np.int64)
+    seps = (ndig - 1) // 3 if group else np.zeros(n, dtype=np.int64)
+    tail = places + 1 if places else 0
+    length = sign + ndig + seps + tail
+    width = int(length.max(initial=1))
+
+    chars = np.full((n, width), ord(" "), dtype=np.uint8)
+    for k in range(places):
+        chars[:, width - 1 - k] = (frac // 10 ** k) % 10 + ord("0")
+    if places:
+        chars[:, width - 1 - places] = ord(",")
+    int_end = width - 1 - tail
+    rows = np.arange(n)
+    for k in range(int(ndig.max(initial=1))):
+        pos = int_end - k - (k // 3 if group else 0)
+        live = ndig > k
+        chars[live, pos] = ((ip[live] // 10 ** k) % 10 + ord("0")).astype(np.uint8)
+        if group and k and k % 3 == 0:
+            chars[live, pos + 1] = ord(".")
+    first = int_end - (ndig - 1) - seps
+    has_sign = sign.astype(bool)
+    chars[rows[has_sign], first[has_sign] - 1] = np.where(neg[has_sign], ord("-"), ord("+"))
+
+    out = chars.view(f"S{width}").ravel().astype(f"U{width}")
+    if slow.any():
+        out = out.astype(object)
+        out[slow] = [_fmt_scalar(v, places, group, plus) for v in x[slow]]
+        out = out.astype(str)
+    out = np.where(nan, "", np.strings.lstrip(out))
+    return np.strings.rjust(out, int(np.strings.str_len(out).max(initial=0)))
+
+
+def fmt_decimal(x: np.ndarray, places: int = 6) -> np.ndarray:
+    """Versão vetorial de cli._fmt_decimal (milhar com '.', decimal com ',')."""
+    return _fmt_column(x, places, group=True)
+
+
+def fmt_pct(x: np.ndarray) -> np.ndarray:
+    """Versão vetorial de f"{x:+.2f}%" com vírgula decimal."""
+    body = _fmt_column(x, 2, group=False, plus=True)
+    return np.where(np.isnan(np.asarray(x, dtype="float64")), "", np.strings.add(np.strings.strip(body), "%"))
+
+
+def select_dates(cube: RateCube, dates: list[str] | None, start: str | None, end: str | None) -> list[str]:
+    """Datas pedidas (explícitas e/ou intervalo) que existem no cubo, em ordem."""
+    picked = set(d for d in (dates or []) if d in cube.date_index)
+    if start or end:
+        picked |= set(cube.dates[cube._rows(start, end)])
+    return sorted(picked)
+
+
+def iter_chunks(cube: RateCube, dates: list[str], mode: str, currencies: list[str] | None,
+                top: int | None, chunk: int = CHUNK_PAIRS):
+    """
+    Gera lotes de linhas longas (date1, date2, currency, value1, value2, delta, pct) como
+    dicionários de arrays; a memória fica limitada a `chunk` pares por vez.
+    """
+    rows = np.array([cube.date_index[d] for d in dates], dtype=np.intp)
+    cols = cube._cols([c.upper() for c in currencies] if currencies else None)
+    block = np.asarray(cube.values[rows][:, cols])
+    ccys = np.array(cube.currencies)[cols]
+    dates_arr = np.array(dates)
+    a_all, b_all = pairs_for(len(dates), mode)
+    for lo in range(0, len(a_all), chunk):
+        a, b = a_all[lo:lo + chunk], b_all[lo:lo + chunk]
+        v1, v2, delta, pct = deltas(block, a, b)
+        order = top_movers(pct, top)
+        take = lambda m: np.take_along_axis(m, order, axis=1).ravel()
+        keep = ~np.isnan(take(pct))
+        width = order.shape[1]
+        yield {
+            "date1": np.repeat(dates_arr[a], width)[keep],
+            "date2": np.repeat(dates_arr[b], width)[keep],
+            "currency": ccys[order].ravel()[keep],
+            "value1": take(v1)[keep],
+            "value2": take(v2)[keep],
+            "delta": take(delta)[keep],
+            "pct": take(pct)[keep],
+        }
+
+
+def print_tables(chunks, layer: str, out=None):
+    """Uma tabela por par, no layout histórico do `compare` (to_string sem índice)."""
+    out = out or sys.stdout
+    header = "GOLD (BRL)" if layer == "gold" else "SILVER (base USD)"
+    for c in chunks:
+        if not len(c["currency"]):
+            continue
+        cols = [c["currency"], fmt_decimal(c["value1"]), fmt_decimal(c["value2"]),
+                fmt_decimal(c["delta"]), fmt_pct(c["pct"])]
+        change = np.flatnonzero((c["date1"][1:] != c["date1"][:-1]) | (c["date2"][1:] != c["date2"][:-1])) + 1
+        starts = np.r_[0, change]
+        for s, e in zip(starts, np.r_[change, len(c["currency"])]):
+            d1, d2 = c["date1"][s], c["date2"][s]
+            headers = ["currency", f"value_{d1}", f"value_{d2}", "delta", "pct"]
+            lines, head = None, []
+            for h, col in zip(headers, cols):
+                col = np.strings.lstrip(col[s:e])
+                w = max(len(h), int(np.strings.str_len(col).max()))
+                col = np.strings.rjust(col, w)
+                lines = col if lines is None else np.strings.add(np.strings.add(lines, " "), col)
+                head.append(h.rjust(w))
+            out.write(f"\nComparação {header}\n  {d1}  →  {d2}\n" + " ".join(head) + "\n" + "\n".join(lines.tolist()) + "\n\n")
+
+
+def write_stream(chunks, fmt: str, path: str | None = None) -> int:
+    """Escreve os lotes em CSV ou Arrow IPC (stream) conforme são calculados. Retorna linhas."""
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    sink = pa.OSFile(path, "wb") if path else pa.PythonFile(sys.stdout.buffer, mode="w")
+    writer, total = None, 0
+    try:
+        for c in chunks:
+            batch = pa.record_batch({k: pa.array(v) for k, v in c.items()})
+            if writer is None:
+                writer = pacsv.CSVWriter(sink, batch.schema) if fmt == "csv" else pa.ipc.new_stream(sink, batch.schema)
+            writer.write_batch(batch)
+            total += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+        if path:
+            sink.close()
+        else:
+            sys.stdout.flush()
+    return total
@@ -0,0 +1,218 @@
+"""
+Conversão em massa de transações (valor, moeda, timestamp) para BRL com as taxas da gold.
+A entrada (CSV ou Parquet) é lida em lotes; cada lote faz um as-of join vetorizado contra o
+histórico: a taxa usada é a da última data da gold <= data da transação, por moeda (células
+ausentes num dia herdam o último valor). Em texto a data é a escrita no timestamp (sem
+conversão de fuso); timestamps tipados (Parquet) usam a data UTC. O índice de datas vira uma tabela densa
+dia→linha, então a junção é um gather O(1) por linha. Lotes independentes são convertidos em
+threads (NumPy/Arrow liberam o GIL) e gravados em ordem, com no máximo `workers × 2` lotes
+em memória.
+"""
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from src import gaps
+from src.cube import RateCube
+from src.telemetry import span
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+# bytes por linha assumidos para dimensionar o bloco do leitor CSV a partir de chunk_rows
+CSV_ROW_BYTES = 48
+PARQUET_SUFFIXES = (".parquet", ".pq")
+EPOCH_UNITS = {"s": 86_400, "ms": 86_400_000}
+OUTPUT_COLUMNS = ("rate_date", "rate_brl", "amount_brl")
+_TS_UNITS = {"s": 86_400, "ms": 86_400_000, "us": 86_400_000_000, "ns": 86_400_000_000_000}
+
+
+class AsOfRates:
+    """
+    Taxas em BRL (1 unidade da moeda) por dia da gold, com buracos preenchidos pelo último
+    valor conhecido da moeda, e tabela densa dia→linha entre o primeiro e o último dia.
+    """
+
+    def __init__(self, dates: list[str], currencies: list[str], values: np.ndarray):
+        self.dates = np.array(dates, dtype="datetime64[D]")
+        self.currencies = list(currencies)
+        self.index = {c: j for j, c in enumerate(self.currencies)}
+        n = len(self.dates)
+        values = np.asarray(values, dtype="float64")
+        self.values = gaps.fill_matrix(values, np.arange(n), n, "ffill")
+        self._flat = self.values.ravel()
+        # linha em que cada célula foi observada de fato (rate_date da saída)
+        t = np.arange(n, dtype=np.int32)[:, None]
+        self._source = np.maximum.accumulate(np.where(np.isnan(values), -1, t), axis=0).ravel()
+        days = self.dates.astype(np.int64)
+        self.first = int(days[0]) if n else 0
+        grid = np.arange(self.first, int(days[-1]) + 1 if n else 0)
+        self._row = (np.searchsorted(days, grid, side="right") - 1).astype(np.int32)
+
+    @classmethod
+    def from_gold(cls) -> "AsOfRates":
+        cube = RateCube.open("gold")
+        if cube.empty:
+            raise FileNotFoundError("Gold vazia: rode o pipeline ou o backfill antes de converter.")
+        return cls(cube.dates, cube.currencies, cube.values)
+
+    def columns_for(self, currencies: pa.Array) -> np.ndarray:
+        """Índice de coluna por linha (-1 para moeda desconhecida/nula); mapeia só o dicionário."""
+        if isinstance(currencies, pa.ChunkedArray):
+            currencies = currencies.combine_chunks()
+        if not pa.types.is_dictionary(currencies.type):
+            currencies = pc.dictionary_encode(currencies)
+        names = pc.utf8_upper(pc.utf8_trim_whitespace(currencies.dictionary.cast(pa.string()))).to_pylist()
+        lut = np.array([self.index.get(c, -1) for c in names] + [-1], dtype=np.intp)
+        codes = currencies.indices.fill_null(len(names)).to_numpy(zero_copy_only=False)
+        return lut[codes]
+
+    def rows_for(self, days: np.ndarray) -> np.ndarray:
+        """Linha da gold vigente em cada dia (última data <= dia); -1 antes do histórico."""
+        offset = days - self.first
+        last = len(self._row) - 1
+        rows = self._row[np.clip(offset, 0, max(last, 0))]
+        return np.where(offset < 0, -1, rows)
+
+    def lookup(self, days: np.ndarray, cols: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(taxa BRL, linha da gold em que a taxa foi observada) por transação; NaN/-1 sem taxa."""
+        rows = self.rows_for(days)
+        ok = (rows >= 0) & (cols >= 0)
+        idx = np.where(ok, rows.astype(np.intp) * len(self.currencies) + cols, 0)
+        rate = np.where(ok, self._flat[idx], np.nan)
+        return rate, np.where(ok, self._source[idx], -1)
+
+
+def _to_days(arr, epoch: str | None = None) -> np.ndarray:
+    """Dias desde 1970-01-01 (int64, divisão inteira exata); nulos caem antes de qualquer histórico."""
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    t = arr.type
+    if pa.types.is_string(t) or pa.types.is_large_string(t) or pa.types.is_dictionary(t):
+        arr = pc.utf8_slice_codeunits(arr.cast(pa.string()), 0, 10).cast(pa.date32())
+        t = arr.type
+    null = arr.is_null().to_numpy(zero_copy_only=False)
+    if pa.types.is_floating(t):
+        v = np.floor(arr.fill_null(0).to_numpy(zero_copy_only=False) / EPOCH_UNITS[epoch or "s"]).astype(np.int64)
+    else:
+        raw = arr.cast(pa.int32()) if pa.types.is_date32(t) else arr
+        ticks = raw.cast(pa.int64()).fill_null(0).to_numpy(zero_copy_only=False)
+        if pa.types.is_timestamp(t):
+            # o valor bruto já é UTC; o fuso do tipo é só metadado
+            v = ticks // _TS_UNITS[t.unit]
+        elif pa.types.is_date32(t):
+            v = ticks
+        elif pa.types.is_date64(t):
+            v = ticks // 86_400_000
+        else:
+            v = ticks // EPOCH_UNITS[epoch or "s"]
+    return np.where(null, np.iinfo(np.int32).min, v)
+
+
+def convert_batch(batch: pa.RecordBatch, rates: AsOfRates, amount: str = "amount", currency: str = "currency",
+                  timestamp: str = "timestamp", epoch: str | None = None) -> pa.RecordBatch:
+    """Acrescenta rate_date, rate_brl e amount_brl a um lote."""
+    days = _to_days(batch.column(timestamp), epoch)
+    cols = rates.columns_for(batch.column(currency))
+    rate, rows = rates.lookup(days, cols)
+    values = batch.column(amount).cast(pa.float64()).to_numpy(zero_copy_only=False)
+    used = np.where(rows >= 0, rates.dates[np.maximum(rows, 0)], np.datetime64("NaT"))
+    # colunas de saída já presentes (reconversão) são substituídas
+    keep = [i for i, n in enumerate(batch.schema.names) if n not in OUTPUT_COLUMNS]
+    out = [batch.column(i) for i in keep]
+    out = [c.cast(pa.string()) if pa.types.is_dictionary(c.type) else c for c in out]
+    out += [pa.array(used, type=pa.date32(), from_pandas=True), pa.array(rate, from_pandas=True),
+            pa.array(values * rate, from_pandas=True)]
+    return pa.RecordBatch.from_arrays(out, names=[batch.schema.names[i] for i in keep] + list(OUTPUT_COLUMNS))
+
+
+def _is_parquet(path) -> bool:
+    return str(path).lower().endswith(PARQUET_SUFFIXES)
+
+
+def iter_batches(path, chunk_rows: int = DEFAULT_CHUNK_ROWS, amount: str = "amount", currency: str = "currency",
+                 timestamp: str = "timestamp", epoch: str | None = None):
+    """Lotes da entrada em streaming (Parquet por row groups/lotes; CSV por blocos)."""
+    if _is_parquet(path):
+        yield from pq.ParquetFile(path).iter_batches(batch_size=chunk_rows)
+        return
+    types = {
+        amount: pa.float64(),
+        currency: pa.dictionary(pa.int32(), pa.string()),
+        # texto: a data da transação é a escrita (YYYY-MM-DD...), sem conversão de fuso
+        timestamp: pa.int64() if epoch else pa.string(),
+    }
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=max(1 << 20, chunk_rows * CSV_ROW_BYTES)),
+        convert_options=pacsv.ConvertOptions(column_types=types, strings_can_be_null=True),
+    )
+    yield from reader
+
+
+class _Writer:
+    def __init__(self, path, parquet: bool):
+        self.path = path
+        self.parquet = parquet
+        self._w = None
+
+    def write(self, batch: pa.RecordBatch):
+        if self._w is None:
+            if self.parquet:
+                self._w = pq.ParquetWriter(self.path, batch.schema, compression="zstd")
+            else:
+                self._w = pacsv.CSVWriter(self.path, batch.schema)
+        self._w.write_batch(batch)
+
+    def close(self):
+        if self._w is not None:
+            self._w.close()
+
+
+def convert_file(src, dst, amount: str = "amount", currency: str = "currency", timestamp: str = "timestamp",
+                 epoch: str | None = None, chunk_rows: int = DEFAULT_CHUNK_ROWS, workers: int = DEFAULT_WORKERS,
+                 rates: AsOfRates | None = None) -> dict:
+    """
+    Converte `src` (CSV/Parquet) para `dst` (formato pela extensão) em streaming.
+    Retorna linhas lidas, linhas sem taxa, segundos e linhas/s.
+    """
+    rates = rates or AsOfRates.from_gold()
+    tmp = Path(str(dst) + ".tmp")
+    writer = _Writer(tmp, _is_parquet(dst))
+    rows = unmatched = 0
+    t0 = time.perf_counter()
+    with span("convert", workers=workers, chunk_rows=chunk_rows) as s:
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                pending = deque()
+
+                def drain(limit):
+                    nonlocal rows, unmatched
+                    while len(pending) > limit:
+                        out = pending.popleft().result()
+                        writer.write(out)
+                        rows += out.num_rows
+                        unmatched += out.column("rate_brl").null_count
+
+                for batch in iter_batches(src, chunk_rows, amount, currency, timestamp, epoch):
+                    pending.append(pool.submit(convert_batch, batch, rates, amount, currency, timestamp, epoch))
+                    drain(max(1, workers) * 2)
+                drain(0)
+        finally:
+            writer.close()
+        if writer._w is None:
+            raise ValueError(f"Entrada vazia: {src}")
+        os.replace(tmp, dst)
+        secs = time.perf_counter() - t0
+        s.set(rows_in=rows, rows_out=rows, unmatched=unmatched,
+              bytes_read=os.path.getsize(src), bytes_written=os.path.getsize(dst))
+    if unmatched:
+        logging.warning(f"{unmatched} linha(s) sem taxa (moeda desconhecida ou data anterior ao histórico).")
+    logging.info(f"{rows} linha(s) convertidas para BRL em {secs:.2f}s → {dst}")
+    return {"rows": rows, "unmatched": unmatched, "seconds": secs, "rows_per_s": rows / secs if secs else None}
@@ -0,0 +1,79 @@
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from src.cube import RateCube
+
+
+class CrossRates:
+    """
+    Motor de taxas cruzadas a partir do vetor USD->moeda da silver.
+    1 unidade de X na base B = (USD->B) / (USD->X).
+    Vetores por base e a matriz N×N são materializados sob demanda e mantidos em cache.
+    """
+
+    def __init__(self, currencies: list[str], usd_rates: np.ndarray, last_update_utc: str | None = None):
+        self.currencies = list(currencies)
+        self.usd_rates = np.asarray(usd_rates, dtype=np.float64)
+        self.last_update_utc = last_update_utc
+        self.index = {c: i for i, c in enumerate(self.currencies)}
+        self._bases: dict[str, np.ndarray] = {}
+        self._matrix: np.ndarray | None = None
+
+    @classmethod
+    def from_silver(cls, df_silver: pd.DataFrame) -> "CrossRates":
+        last = df_silver["last_update_utc"].iloc[0] if len(df_silver) else None
+        return cls(df_silver["target_currency"].astype(str).tolist(), df_silver["rate"].to_numpy(dtype=float), last)
+
+    def base_vector(self, base: str) -> np.ndarray:
+        """Valor de 1 unidade de cada moeda na `base` (alinhado a `self.currencies`)."""
+        base = base.upper()
+        if base not in self._bases:
+            if base not in self.index:
+                raise KeyError(f"Moeda base '{base}' ausente nos dados.")
+            if self._matrix is not None:
+                vec = self._matrix[self.index[base]]
+            else:
+                vec = self.usd_rates[self.index[base]] / self.usd_rates
+                vec[self.index[base]] = 1.0
+            self._bases[base] = vec
+        return self._bases[base]
+
+    def matrix(self) -> np.ndarray:
+        """Matriz N×N: linha = base, coluna = moeda; M[b, x] = 1 x em b."""
+        if self._matrix is None:
+            self._matrix = np.divide.outer(self.usd_rates, self.usd_rates)
+            np.fill_diagonal(self._matrix, 1.0)
+        return self._matrix
+
+    def table(self, base: str) -> pd.DataFrame:
+        base = base.upper()
+        return pd.DataFrame({
+            "currency": self.currencies,
+            f"rate_{base.lower()}_base": self.base_vector(base),
+            "last_update_utc": self.last_update_utc,
+        })
+
+
+@lru_cache(maxsize=64)
+def for_date(date: str, version: str | None = None) -> CrossRates:
+    """
+    Motor de um dia a partir do cubo da silver; `version` entra na chave do cache.
+    Sem silver para a data, usa a gold: (BRL por X)^-1 é proporcional a USD->X.
+    """
+    cube = RateCube.open("silver")
+    if date in cube.date_index:
+        values = cube.cross_section(date)
+    else:
+        cube = RateCube.open("gold")
+        if date not in cube.date_index:
+            raise KeyError(f"Sem dados para {date}.")
+        values = 1.0 / cube.cross_section(date)
+    mask = ~np.isnan(values)
+    ccys = [c for c, ok in zip(cube.currencies, mask) if ok]
+    return CrossRates(ccys, values[mask], cube.updated[cube.date_index[date]])
+
+
+@lru_cache(maxsize=256)
+def cross_table(date: str, base: str, version: str | None = None) -> pd.DataFrame:
+    """Tabela de um dia em qualquer base, cacheada por (data, base)."""
+    return for_date(date, version).table(base)
@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from src import store
+
+VALUE_COLUMNS = {"gold": "rate_brl_base", "silver": "rate"}
+# snapshot Arrow IPC sem compressão: aberto com memory_map, os buffers apontam para o page cache
+SNAPSHOT_FILE = "rates.arrow"
+
+
+def cube_dir(layer: str = "gold") -> Path:
+    return store.LAYERS[layer]["dir"] / "cube"
+
+
+class RateCube:
+    """
+    Matriz densa (dias × moedas) float64 com índices data→linha e moeda→coluna.
+    Células ausentes ficam NaN. Persistida como um único arquivo Arrow IPC (coluna
+    fixed_size_list com a matriz em ordem de linhas) trocado atomicamente a cada build;
+    `load` o abre via memory-map sem cópia, então processos diferentes (workers do
+    dashboard, CLI, enrich) compartilham as mesmas páginas.
+    """
+
+    def __init__(self, values: np.ndarray, dates: list[str], currencies: list[str],
+                 updated: list[str] | None = None, version: str | None = None,
+                 stamps: list[int] | None = None, dataset: int = 0):
+        self.values = values
+        self.dates = list(dates)
+        self.currencies = list(currencies)
+        self.updated = list(updated) if updated is not None else [""] * len(self.dates)
+        self.version = version
+        # mtime_ns do arquivo diário de cada linha (0: só no dataset compactado) e do índice
+        # do dataset na build; `open` relê só os dias cujo carimbo mudou
+        self.stamps = list(stamps) if stamps is not None else [0] * len(self.dates)
+        self.dataset = dataset
+        self._date_arr = np.array(self.dates, dtype=str)
+        self.date_index = {d: i for i, d in enumerate(self.dates)}
+        self.ccy_index = {c: j for j, c in enumerate(self.currencies)}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, layer: str = "gold", version: str | None = None) -> "RateCube":
+        ccy_col = store.LAYERS[layer]["currency"]
+        dates, d_idx = np.unique(df["date"].to_numpy(dtype=str), return_inverse=True)
+        ccys, c_idx = np.unique(df[ccy_col].to_numpy(dtype=str), return_inverse=True)
+        values = np.full((len(dates), len(ccys)), np.nan)
+        values[d_idx, c_idx] = df[VALUE_COLUMNS[layer]].to_numpy(dtype=float)
+        updated = df.groupby("date")["last_update_utc"].first().reindex(dates).fillna("").astype(str)
+        return cls(values, dates.tolist(), ccys.tolist(), updated.tolist(), version)
+
+    @classmethod
+    def build(cls, layer: str = "gold", scan: tuple[dict[str, int], int] | None = None) -> "RateCube":
+        files, dataset = scan or store.stamps(layer)
+        cube = cls.from_frame(store.read_range(layer), layer, store.version(layer, (files, dataset)))
+        cube.stamps = [files.get(d, 0) for d in cube.dates]
+        cube.dataset = dataset
+        return cube
+
+    def patch(self, layer: str, scan: tuple[dict[str, int], int]) -> "RateCube":
+        """
+        Cubo atualizado relendo só os dias novos ou regravados (carimbo diferente) e tirando
+        os removidos; o resto da matriz é reaproveitado. Custa O(dias alterados) em leitura.
+        """
+        files, dataset = scan
+        old = dict(zip(self.dates, self.stamps))
+        changed = sorted(d for d, t in files.items() if old.get(d) != t)
+        # dias sem arquivo diário só continuam se ainda estão no dataset compactado
+        alive = set(files) | (set(store.list_dates(layer)) if dataset else set())
+        skip = set(changed)
+        keep = [i for i, d in enumerate(self.dates) if d in alive and d not in skip]
+        fresh = RateCube.from_frame(store.read_days(layer, changed), layer) if changed else None
+        if fresh is not None and fresh.empty:
+            fresh = None
+
+        ccys = sorted(set(self.currencies) | set(fresh.currencies if fresh is not None else ()))
+        dates = sorted({self.dates[i] for i in keep} | set(fresh.dates if fresh is not None else ()))
+        row = {d: i for i, d in enumerate(dates)}
+        col = {c: j for j, c in enumerate(ccys)}
+        values = np.full((len(dates), len(ccys)), np.nan)
+        updated = [""] * len(dates)
+        old_rows = np.array([row[self.dates[i]] for i in keep], dtype=np.intp)
+        values[np.ix_(old_rows, [col[c] for c in self.currencies])] = np.asarray(self.values)[keep]
+        for i in keep:
+            updated[row[self.dates[i]]] = self.updated[i]
+        if fresh is not None:
+            new_rows = np.array([row[d] for d in fresh.dates], dtype=np.intp)
+            values[np.ix_(new_rows, [col[c] for c in fresh.currencies])] = fresh.values
+            for d, u in zip(fresh.dates, fresh.updated):
+                updated[row[d]] = u
+        # moedas que só existiam nos dias removidos saem, como numa build completa
+        present = ~np.isnan(values).all(axis=0) if len(dates) else np.zeros(len(ccys), dtype=bool)
+        return RateCube(values[:, present], dates, [c for c, p in zip(ccys, present) if p], updated,
+                        store.version(layer, scan), [files.get(d, 0) for d in dates], dataset)
+
+    def to_arrow(self) -> pa.Table:
+        k = len(self.currencies)
+        flat = pa.array(np.ascontiguousarray(self.values, dtype=np.float64).ravel())
+        meta = {"fx.currencies": json.dumps(self.currencies), "fx.version": self.version or "",
+                "fx.dataset": str(self.dataset)}
+        return pa.table({
+            "date": pa.array(self.dates, pa.string()),
+            "updated": pa.array(self.updated, pa.string()),
+            "stamp": pa.array(self.stamps, pa.int64()),
+            "rates": pa.FixedSizeListArray.from_arrays(flat, k),
+        }).replace_schema_metadata(meta)
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table) -> "RateCube":
+        meta = table.schema.metadata or {}
+        currencies = json.loads(meta.get(b"fx.currencies", b"[]"))
+        col = table.column("rates")
+        rates = col.chunk(0) if col.num_chunks == 1 else col.combine_chunks()
+        # NaN não vira nulo (sem bitmap de validade): a matriz é uma visão do buffer, sem cópia
+        values = rates.flatten().to_numpy(zero_copy_only=True).reshape(len(table), len(currencies))
+        # snapshots anteriores aos carimbos: stamps vazios forçam uma build completa em `open`
+        stamps = table.column("stamp").to_pylist() if "stamp" in table.column_names else None
+        return cls(values, table.column("date").to_pylist(), currencies,
+                   table.column("updated").to_pylist(), meta.get(b"fx.version", b"").decode() or None,
+                   stamps, int(meta.get(b"fx.dataset", b"-1")))
+
+    def save(self, path: Path):
+        path.mkdir(parents=True, exist_ok=True)
+        table = self.to_arrow()
+        tmp = path / f"{SNAPSHOT_FILE}.{os.getpid()}.tmp"
+        with pa.OSFile(str(tmp), "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(1, len(table)))
+        try:
+            # leitores com o snapshot antigo mapeado continuam no inode anterior
+            os.replace(tmp, path / SNAPSHOT_FILE)
+            for old in ("rates.npy", "index.json"):  # formato anterior (.npy + índice)
+                (path / old).unlink(missing_ok=True)
+        except OSError as e:  # Windows: arquivo mapeado por outro processo não pode ser substituído
+            logging.warning(f"Snapshot do cubo não publicado ({e}); segue em memória.")
+            tmp.unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, path: Path) -> "RateCube":
+        source = pa.memory_map(str(path / SNAPSHOT_FILE), "r")
+        return cls.from_arrow(ipc.open_file(source).read_all())
+
+    @classmethod
+    def open(cls, layer: str = "gold") -> "RateCube":
+        """
+        Abre o cubo persistido. Se a camada mudou desde a última build, relê só os dias novos
+        ou regravados (`patch`); a build completa fica para snapshot ausente/antigo ou
+        dataset compactado alterado.
+        """
+        path = cube_dir(layer)
+        scan = store.stamps(layer)
+        current = store.version(layer, scan)
+        cube = None
+        if (path / SNAPSHOT_FILE).exists():
+            cube = cls.load(path)
+            if cube.version == current:
+                return cube
+        if cube is not None and cube.dataset == scan[1] and len(cube.stamps) == len(cube.dates):
+            cube = cube.patch(layer, scan)
+        else:
+            logging.info(f"Reconstruindo RateCube ({layer}).")
+            cube = cls.build(layer, scan)
+        if cube.dates:
+            cube.save(path)
+        return cube
+
+    @property
+    def empty(self) -> bool:
+        return not self.dates
+
+    def _rows(self, start: str | None = None, end: str | None = None) -> slice:
+        lo = np.searchsorted(self._date_arr, start, side="left") if start else 0
+        hi = np.searchsorted(self._date_arr, end, side="right") if end else len(self.dates)
+        return slice(int(lo), int(hi))
+
+    def _cols(self, currencies: list[str] | None) -> np.ndarray:
+        if currencies is None:
+            return np.arange(len(self.currencies))
+        return np.array([self.ccy_index[c] for c in currencies if c in self.ccy_index], dtype=np.intp)
+
+    def rate(self, date: str, currency: str) -> float:
+        i = self.date_index.get(date)
+        j = self.ccy_index.get(currency)
+        if i is None or j is None:
+            return float("nan")
+        return float(self.values[i, j])
+
+    def cross_section(self, date: str) -> np.ndarray:
+        """Todas as moedas em um dia (vetor alinhado a `self.currencies`)."""
+        return np.asarray(self.values[self.date_index[date]])
+
+    def series(self, currency: str, start: str | None = None, end: str | None = None) -> tuple[list[str], np.ndarray]:
+        rows = self._rows(start, end)
+        return self.dates[rows], np.asarray(self.values[rows, self.ccy_index[currency]])
+
+    def slice(self, currencies: list[str] | None = None, start: str | None = None,
+              end: str | None = None) -> tuple[list[str], list[str], np.ndarray]:
+        """Recorte (datas, moedas, matriz) em uma única operação de indexação."""
+        rows = self._rows(start, end)
+        cols = self._cols(currencies)
+        return self.dates[rows], [self.currencies[j] for j in cols], np.asarray(self.values[rows][:, cols])
+
+    def window(self, currencies: list[str] | None, last_n: int) -> tuple[list[str], list[str], np.ndarray]:
+        """Últimos `last_n` dias das moedas pedidas (ex.: sparklines)."""
+        start = self.dates[-last_n] if 0 < last_n <= len(self.dates) else None
+        return self.slice(currencies, start)
+
+    def to_frame(self, layer: str = "gold", start: str | None = None, end: str | None = None) -> pd.DataFrame:
+        """Formato da camada (date + colunas de store.LAYERS) a partir do cubo, sem ler Parquet."""
+        cfg = store.LAYERS[layer]
+        df = self.to_long(None, start, end).rename(columns={"currency": cfg["currency"], "value": VALUE_COLUMNS[layer]})
+        df["last_update_utc"] = df["date"].map(dict(zip(self.dates, self.updated)))
+        return df[["date"] + [c for c in cfg["columns"] if c in df]]
+
+    def to_long(self, currencies: list[str] | None = None, start: str | None = None,
+                end: str | None = None) -> pd.DataFrame:
+        """Formato longo (date, currency, value) sem células ausentes, para gráficos."""
+        dates, ccys, block = self.slice(currencies, start, end)
+        df = pd.DataFrame({
+            "date": np.repeat(dates, len(ccys)),
+            "currency": np.tile(ccys, len(dates)),
+            "value": block.ravel(),
+        })
+        return df.dropna(subset=["value"]).reset_index(drop=True)
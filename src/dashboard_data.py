@@ -0,0 +1,186 @@
+"""
+Camada de dados do dashboard: cubo da gold residente, caches LRU/TTL limitados e
+invalidação pela versão da camada (mtimes dos Parquet). Trocar de dia ou de moedas
+dentro da janela carregada não toca o disco.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from src import goldformat, rollup, store
+from src.analytics import ANALYTICS_DIR
+from src.cube import RateCube
+from src.telemetry import span
+
+VERSION_TTL = 5.0
+DAY_CACHE_SIZE = 64
+WINDOW_CACHE_SIZE = 16
+ANALYTICS_CACHE_SIZE = 32
+HISTORY_CACHE_SIZE = 16
+
+
+class LRUCache:
+    """Dicionário LRU com tamanho máximo e TTL opcional por entrada."""
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return default
+            value, stamp = hit
+            if self.ttl is not None and time.monotonic() - stamp > self.ttl:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+@dataclass
+class Window:
+    """Últimos N dias até `day` para todas as moedas, lidos de uma vez do cubo."""
+    dates: list[str]
+    currencies: list[str]
+    block: np.ndarray
+    sparklines: dict[str, pd.DataFrame] = field(default_factory=dict)
+
+    def history(self, currencies: list[str]) -> pd.DataFrame:
+        """Formato longo (date, currency, value) das moedas pedidas, sem nova leitura."""
+        parts = [self.sparklines[c].assign(currency=c) for c in currencies if c in self.sparklines]
+        if not parts:
+            return pd.DataFrame(columns=["date", "ds", "value", "currency"])
+        return pd.concat(parts, ignore_index=True)
+
+
+class DashboardData:
+    def __init__(self, version_ttl: float = VERSION_TTL):
+        self.version_ttl = version_ttl
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked = float("-inf")
+        self._cube: RateCube | None = None
+        self._filled: dict[str, str] = {}
+        self._days = LRUCache(DAY_CACHE_SIZE)
+        self._windows = LRUCache(WINDOW_CACHE_SIZE)
+        self._analytics = LRUCache(ANALYTICS_CACHE_SIZE)
+        self._histories = LRUCache(HISTORY_CACHE_SIZE)
+
+    def cube(self) -> RateCube:
+        """Cubo atual; a versão da gold é reconferida no máximo a cada `version_ttl` s."""
+        with self._lock:
+            now = time.monotonic()
+            if self._cube is None or now - self._checked >= self.version_ttl:
+                self._checked = now
+                current = store.version("gold")
+                if current != self._version:
+                    with span("dashboard.cube") as s:
+                        self._cube = RateCube.open("gold")
+                        self._filled = goldformat.filled_days(store.LAYERS["gold"]["dir"])
+                        s.set(rows_out=len(self._cube.dates))
+                    self._version = current
+                    self._days.clear()
+                    self._windows.clear()
+                    self._histories.clear()
+            return self._cube
+
+    @property
+    def version(self) -> str | None:
+        self.cube()
+        return self._version
+
+    def dates(self) -> list[str]:
+        return list(self.cube().dates)
+
+    def prev_day(self, day: str) -> str | None:
+        cube = self.cube()
+        i = cube.date_index.get(day)
+        return cube.dates[i - 1] if i else None
+
+    def provenance(self, day: str) -> str | None:
+        """Método de preenchimento se o dia foi materializado a partir de lacunas (ver gaps)."""
+        self.cube()
+        return self._filled.get(day)
+
+    def day_frame(self, day: str) -> pd.DataFrame:
+        """Gold de um dia (currency, rate_brl_base, last_update_utc) a partir do cubo."""
+        cube = self.cube()
+        key = (self._version, day)
+        df = self._days.get(key)
+        if df is None:
+            with span("dashboard.day_frame", day=day):
+                values = cube.cross_section(day)
+                mask = ~np.isnan(values)
+                df = pd.DataFrame({
+                    "currency": np.array(cube.currencies)[mask],
+                    "rate_brl_base": values[mask],
+                    "last_update_utc": cube.updated[cube.date_index[day]],
+                })
+            self._days.put(key, df)
+        return df
+
+    def window(self, day: str, last_n: int = 15) -> Window:
+        cube = self.cube()
+        key = (self._version, day, last_n)
+        win = self._windows.get(key)
+        if win is None:
+            with span("dashboard.window", day=day, last_n=last_n):
+                end = cube.date_index[day]
+                start = cube.dates[max(0, end - last_n + 1)]
+                dates, ccys, block = cube.slice(None, start, day)
+                ds = pd.to_datetime(pd.Series(dates))
+                date_col = pd.Series(dates)
+                sparklines = {}
+                for j, c in enumerate(ccys):
+                    col = block[:, j]
+                    ok = ~np.isnan(col)
+                    if ok.any():
+                        sparklines[c] = pd.DataFrame({"date": date_col[ok].to_numpy(), "ds": ds[ok].to_numpy(), "value": col[ok]})
+                win = Window(list(dates), ccys, block, sparklines)
+            self._windows.put(key, win)
+        return win
+
+    def history(self, currencies: list[str], start: str | None = None, end: str | None = None,
+                max_points: int = rollup.MAX_POINTS) -> tuple[str, pd.DataFrame]:
+        """Série longa (semana/mês/ano quando não cabe em `max_points` dias), ver rollup."""
+        cube = self.cube()
+        key = (self._version, tuple(currencies), start, end, max_points)
+        hit = self._histories.get(key)
+        if hit is None:
+            with span("dashboard.history", start=start, end=end, max_points=max_points) as s:
+                hit = rollup.history(currencies, start, end, max_points, cube=cube)
+                s.set(resolution=hit[0], rows_out=len(hit[1]))
+            self._histories.put(key, hit)
+        return hit
+
+    def analytics(self, day: str) -> pd.DataFrame | None:
+        p = ANALYTICS_DIR / f"analytics_{day}.parquet"
+        if not p.exists():
+            return None
+        key = (day, p.stat().st_mtime_ns)
+        df = self._analytics.get(key)
+        if df is None:
+            with span("dashboard.analytics", day=day, bytes_read=p.stat().st_size):
+                df = pd.read_parquet(p)
+            self._analytics.put(key, df)
+        return df
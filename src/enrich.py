@@ -1,16 +1,176 @@
 import os
 import argparse
+import hashlib
 import json
+import random
 import re
+import threading
+import time
 import unicodedata
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from pathlib import Path
 import logging
-from dotenv import load_dotenv
-from openai import OpenAI
+import numpy as np
+from src.runtime import load_env, setup_logging
+from src.cube import RateCube
+from src import prompts
+from src.prompts import LATAM_CURRENCIES
+from src.telemetry import span
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
-load_dotenv()
+
+MODEL = "gpt-4o-mini"
+TEMPERATURE = 0.4
+MAX_TOKENS = 300
+# US$ por 1M tokens (entrada, saída), para o custo estimado nos spans de telemetria
+PRICES = {"gpt-4o-mini": (0.15, 0.60)}
+CACHE_DIR = Path("data/cache/llm")
+# live: cache + API | replay: só cache (offline) | stub: cache ou resposta enlatada (offline)
+# template: resumo por regras a partir da gold, sem LLM
+MODES = ("live", "replay", "stub", "template")
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 8
+
+# resumo por regras: moedas citadas por parágrafo e a política de quais dias sobem para o LLM
+MAIN_CURRENCIES = ("USD", "EUR")
+OTHER_CURRENCIES = ("GBP", "JPY", "CHF", "CNY")
+CURRENCY_NAMES = {
+    "USD": "o dólar", "EUR": "o euro", "GBP": "a libra", "JPY": "o iene", "CHF": "o franco suíço",
+    "CNY": "o yuan", "ARS": "o peso argentino", "CLP": "o peso chileno", "COP": "o peso colombiano",
+    "MXN": "o peso mexicano", "PEN": "o sol peruano", "UYU": "o peso uruguaio", "PYG": "o guarani",
+    "BOB": "o boliviano",
+}
+STABLE_PCT = 0.005
+TOP_MOVERS = 2
+
+_client_lock = threading.Lock()
+_client_obj = None
+
+
+def _client():
+    """Cliente OpenAI compartilhado (pool de conexões reaproveitado entre chamadas e threads)."""
+    global _client_obj
+    with _client_lock:
+        if _client_obj is None:
+            load_env()
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY ausente no .env")
+            # SDK importado só aqui: backfill e resumos por regras não carregam o openai
+            from openai import OpenAI
+            _client_obj = OpenAI(api_key=api_key, max_retries=0)
+        return _client_obj
+
+
+def _retryable() -> tuple[type[Exception], ...]:
+    """Erros transitórios da API (avaliado só quando uma chamada falha)."""
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+    return (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+class RetryBudget:
+    """Orçamento de novas tentativas compartilhado por toda a execução (evita tempestade de retries)."""
+
+    def __init__(self, total: int):
+        self.left = total
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.left <= 0:
+                return False
+            self.left -= 1
+            return True
+
+
+def _cache_key(model, messages, temperature):
+    blob = json.dumps({"model": model, "messages": messages, "temperature": temperature}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _cache_get(key):
+    p = CACHE_DIR / key[:2] / f"{key}.json"
+    if not p.exists():
+        return None
+    return json.loads(p.read_text(encoding="utf-8"))["content"]
+
+
+def _cache_put(key, content):
+    p = CACHE_DIR / key[:2] / f"{key}.json"
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(f".{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps({"content": content}, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, p)
+
+
+def settings(model=None, max_tokens=None, prompt_budget=None, batch=None):
+    """Modelo, max_tokens por dia, orçamento de entrada e dias por pedido: argumento, ENRICH_* (.env) ou padrão."""
+    load_env()
+    return {
+        "model": model or os.getenv("ENRICH_MODEL", MODEL),
+        "max_tokens": max_tokens or int(os.getenv("ENRICH_MAX_TOKENS", MAX_TOKENS)),
+        "prompt_budget": prompt_budget or int(os.getenv("ENRICH_PROMPT_BUDGET", prompts.PROMPT_BUDGET)),
+        "batch": batch or int(os.getenv("ENRICH_BATCH", "1")),
+    }
+
+
+def _stub_payload(f):
+    return {
+        "title": f"Resumo Cambial - {_br(f.date)}",
+        "paragraphs": [f"Cotações do dia: {'; '.join(f'1 {c} = {_fmt_brl(v)}' for c, v in f.rates.items())}."],
+    }
+
+
+def _stub_response(payload):
+    latency = float(os.getenv("ENRICH_STUB_LATENCY", "0"))
+    if latency:
+        time.sleep(latency)
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def _complete(messages, mode, budget, stub, model=MODEL, max_tokens=MAX_TOKENS, **attrs):
+    """Resolve a resposta: cache endereçado por conteúdo, depois API (live) ou resposta enlatada (stub)."""
+    with span("llm", model=model, mode=mode, **attrs) as sp:
+        key = _cache_key(model, messages, TEMPERATURE)
+        cached = _cache_get(key)
+        if cached is not None:
+            sp.set(cache="hit")
+            return cached
+        if mode == "replay":
+            raise LookupError("resposta ausente no cache (modo replay)")
+        if mode == "stub":
+            sp.set(cache="stub")
+            return _stub_response(stub)
+        attempt = 0
+        while True:
+            try:
+                resp = _client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=TEMPERATURE,
+                    max_tokens=max_tokens
+                )
+                break
+            except _retryable() as e:
+                if budget is None or not budget.take():
+                    raise
+                delay = random.uniform(0, min(30.0, 0.5 * (2 ** attempt)))
+                logging.warning(f"Falha transitória no LLM ({type(e).__name__}); nova tentativa em {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            price_in, price_out = PRICES.get(model, (0.0, 0.0))
+            sp.set(tokens_in=usage.prompt_tokens, tokens_out=usage.completion_tokens,
+                   cost_usd=(usage.prompt_tokens * price_in + usage.completion_tokens * price_out) / 1e6)
+        sp.set(cache="miss", retries=attempt)
+        content = resp.choices[0].message.content or ""
+        # só respostas com JSON válido vão ao cache; as demais seriam reapresentadas a cada rerun
+        if _extract_json(content) is not None:
+            _cache_put(key, content)
+        else:
+            sp.set(cache="invalid")
+        return content
 
 def _fmt_brl(x):
     return f"R$ {x:,.4f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -40,95 +200,272 @@ def _extract_json(s):
         except Exception:
             return None
 
-def _generate_for_date(date_str):
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        logging.error("OPENAI_API_KEY ausente no .env")
-        return False
-    client = OpenAI(api_key=api_key)
-    gold_file_path = os.path.join("data", "gold", f"exchange_rates_brl_base_{date_str}.parquet")
-    if not os.path.exists(gold_file_path):
-        logging.warning(f"Gold ausente para {date_str}: {gold_file_path}")
+def _write_summary(date_str, title, paragraphs):
+    json_path = os.path.join("data", "gold", f"daily_summary_{date_str}.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({"title": title, "paragraphs": paragraphs}, f, ensure_ascii=False, indent=2)
+    md_path = os.path.join("data", "gold", f"daily_summary_{date_str}.md")
+    with open(md_path, "w", encoding="utf-8") as f:
+        f.write(title + "\n\n" + "\n\n".join(paragraphs))
+    return json_path, md_path
+
+def _generate_for_date(date_str, df=None, mode="live", budget=None, cfg=None):
+    if mode == "template":
+        return write_templates(date_str, date_str, force=True)[2] > 0
+    with span("enrich", day=date_str, mode=mode) as s:
+        ok = _generate(date_str, df, mode, budget, cfg)
+        s.set(generated=ok)
+        return ok
+
+def _generate(date_str, df=None, mode="live", budget=None, cfg=None):
+    feats = prompts.features([date_str])
+    if not feats and df is not None and not df.empty:
+        # dia ainda fora do snapshot: só as taxas do DataFrame, sem variações
+        feats = [prompts.from_frame(date_str, df)]
+    if not feats:
+        logging.warning(f"Gold ausente para {date_str}")
         return False
-    df = pd.read_parquet(gold_file_path)
-    key = ["USD", "EUR", "GBP", "JPY", "ARS"]
-    df_f = df[df["currency"].isin(key)].copy()
-    if df_f.empty:
-        df_f = df.sort_values("rate_brl_base", ascending=False).head(5).copy()
-    lines = [f"1 {r.currency} = {_fmt_brl(float(r.rate_brl_base))}" for r in df_f.itertuples()]
-    data_for_prompt = "\n".join(lines)
-    d = datetime.strptime(date_str, "%Y-%m-%d")
-    date_br = d.strftime("%d/%m/%Y")
-    prompt = f"""
-Você é um analista financeiro sênior no Brasil. Gere um resumo executivo do câmbio do dia a partir dos dados abaixo.
-Dados de {date_br}, valores em BRL para 1 unidade de cada moeda:
-{data_for_prompt}
-
-Responda SOMENTE em JSON válido, sem Markdown, no formato:
-{{
-  "title": "Resumo Cambial - {date_br}",
-  "paragraphs": [
-    "Parágrafo 1 curto, objetivo, em PT-BR.",
-    "Parágrafo 2 curto, objetivo, em PT-BR.",
-    "Parágrafo 3 curto, objetivo, em PT-BR."
-  ]
-}}
-Regras: frases curtas; destaque USD e EUR; cite moedas sul-americanas se relevante; sem itálico/negrito; sem caracteres invisíveis; sem emojis; sem quebras de palavra. Não inclua explicações fora do JSON.
-""".strip()
     try:
-        logging.info(f"Gerando resumo LLM (JSON) para {date_str}")
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Você é um analista financeiro útil e conciso."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.4,
-            max_tokens=300
-        )
-        content = resp.choices[0].message.content or ""
-        data = _extract_json(content)
-        if not data or "title" not in data or "paragraphs" not in data:
-            logging.warning("Resposta sem JSON válido. Salvando .md limpo como fallback.")
-            insight = _clean_text(content)
-            md_path = os.path.join("data", "gold", f"daily_summary_{date_str}.md")
-            with open(md_path, "w", encoding="utf-8") as f:
-                f.write(insight)
-            return True
-        title = str(data.get("title", f"Resumo Cambial - {date_br}")).strip()
-        paragraphs = [p for p in data.get("paragraphs", []) if isinstance(p, str) and p.strip()]
-        paragraphs = [_clean_text(p) for p in paragraphs][:3]
-        out_json = {"title": title, "paragraphs": paragraphs}
-        json_path = os.path.join("data", "gold", f"daily_summary_{date_str}.json")
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(out_json, f, ensure_ascii=False, indent=2)
-        md_text = title + "\n\n" + "\n\n".join(paragraphs)
-        md_path = os.path.join("data", "gold", f"daily_summary_{date_str}.md")
-        with open(md_path, "w", encoding="utf-8") as f:
-            f.write(md_text)
-        logging.info(f"Resumo salvo: {json_path} e {md_path}")
-        return True
+        return bool(_summarize(feats, mode, budget, cfg or settings()))
     except Exception as e:
         logging.error(f"Falha na geração para {date_str}: {e}")
         return False
 
-def main(date=None, start=None, end=None):
+def _summarize(feats, mode, budget, cfg):
+    """Um pedido ao LLM para um ou vários dias; grava os resumos válidos e devolve as datas gravadas."""
+    dates = [f.date for f in feats]
+    messages, est = prompts.build_messages(feats, cfg["prompt_budget"])
+    stub = {f.date: _stub_payload(f) for f in feats}
+    logging.info(f"Gerando resumo LLM (JSON) para {dates[0]}" + (f" a {dates[-1]} ({len(dates)} dias)" if len(dates) > 1 else ""))
+    content = _complete(messages, mode, budget, stub if len(feats) > 1 else stub[dates[0]], cfg["model"],
+                        cfg["max_tokens"] * len(feats), days=len(feats), tokens_est=est)
+    data = _extract_json(content)
+    if len(feats) == 1:
+        data = {dates[0]: data}
+    written = []
+    for day in dates:
+        item = data.get(day) if isinstance(data, dict) else None
+        if not isinstance(item, dict) or "title" not in item or "paragraphs" not in item:
+            continue
+        title = str(item.get("title") or f"Resumo Cambial - {_br(day)}").strip()
+        paragraphs = [p for p in item.get("paragraphs", []) if isinstance(p, str) and p.strip()]
+        paragraphs = [_clean_text(p) for p in paragraphs][:3]
+        json_path, md_path = _write_summary(day, title, paragraphs)
+        logging.info(f"Resumo salvo: {json_path} e {md_path}")
+        written.append(day)
+    if len(feats) == 1 and not written:
+        logging.warning("Resposta sem JSON válido. Salvando .md limpo como fallback.")
+        md_path = os.path.join("data", "gold", f"daily_summary_{dates[0]}.md")
+        with open(md_path, "w", encoding="utf-8") as f:
+            f.write(_clean_text(content))
+        return dates
+    return written
+
+def _run_llm(days, mode, budget, cfg, concurrency):
+    """
+    Resumos LLM de vários dias: features de uma vez sobre o cubo e pedidos de até cfg["batch"]
+    dias dentro do orçamento; dias que faltarem na resposta de um lote vão sozinhos.
+    """
+    feats = prompts.features(days)
+    for day in sorted(set(days) - {f.date for f in feats}):
+        logging.warning(f"Gold ausente para {day}")
+    groups = prompts.batches(feats, cfg["prompt_budget"], cfg["batch"])
+
+    def run(group):
+        with span("enrich", day=group[0].date, days=len(group), mode=mode) as s:
+            written = []
+            try:
+                written = _summarize(group, mode, budget, cfg)
+            except Exception as e:
+                logging.error(f"Falha na geração para {group[0].date}: {e}")
+            if len(group) > 1:
+                for f in group:
+                    if f.date in written:
+                        continue
+                    try:
+                        written += _summarize([f], mode, budget, cfg)
+                    except Exception as e:
+                        logging.error(f"Falha na geração para {f.date}: {e}")
+            s.set(generated=len(written))
+            return bool(written)
+
+    if len(groups) > 1:
+        logging.info(f"{len(feats)} dia(s) em {len(groups)} pedido(s) ao LLM.")
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        return any(list(pool.map(run, groups)))
+
+def _br(date_str):
+    return datetime.strptime(date_str, "%Y-%m-%d").strftime("%d/%m/%Y")
+
+def _pct(x):
+    return f"{x:+.2f}%".replace(".", ",")
+
+def _move(x, since=None):
+    if x != x:
+        return None
+    ref = f" ante {since}" if since else ""
+    if abs(x) < STABLE_PCT:
+        return f"estável{ref}"
+    return f"{'alta' if x > 0 else 'queda'} de {abs(x):.2f}%".replace(".", ",") + ref
+
+def _join(items):
+    return items[0] if len(items) == 1 else ", ".join(items[:-1]) + " e " + items[-1]
+
+def template_summaries(start=None, end=None, cube=None):
+    """
+    Resumos por regras ({"title", "paragraphs"}) de todos os dias da gold entre start e end.
+    Taxas, variações contra o dia anterior da gold e maiores altas/quedas saem de operações
+    sobre a matriz dias × moedas do cubo; por dia resta só montar as frases.
+    Devolve (datas, resumos, maior |variação %| entre MAIN_CURRENCIES por dia).
+    """
+    cube = cube or RateCube.open("gold")
+    rows = cube._rows(start, end)
+    n = rows.stop - rows.start
+    if n <= 0:
+        return [], [], np.empty(0)
+    lo = max(rows.start - 1, 0)
+    full = np.asarray(cube.values[lo:rows.stop])
+    prev = np.vstack([np.full((1, full.shape[1]), np.nan), full[:-1]])[-n:]
+    values = full[-n:]
+    dates = cube.dates[rows]
+    prev_dates = ([None] + cube.dates[lo:rows.stop - 1])[-n:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = (values / prev - 1.0) * 100.0
+
+    ccys = np.array(cube.currencies)
+    col = cube.ccy_index
+    quoted = ccys != "BRL"
+    moved = np.where(quoted, pct, np.nan)
+    ups = (moved > STABLE_PCT).sum(axis=1)
+    downs = (moved < -STABLE_PCT).sum(axis=1)
+    counts = (~np.isnan(values) & quoted).sum(axis=1)
+    top_up = np.argsort(np.where(np.isnan(moved), -np.inf, moved), axis=1)[:, ::-1][:, :TOP_MOVERS]
+    top_down = np.argsort(np.where(np.isnan(moved), np.inf, moved), axis=1)[:, :TOP_MOVERS]
+    main_idx = [col[c] for c in MAIN_CURRENCIES if c in col]
+    key_move = np.nanmax(np.abs(pct[:, main_idx]), axis=1, initial=0.0) if main_idx else np.zeros(n)
+    key_move = np.nan_to_num(key_move)
+
+    def quotes(i, codes, verb, since):
+        out = []
+        for c in codes:
+            j = col.get(c)
+            if j is None or values[i, j] != values[i, j]:
+                continue
+            mv = _move(pct[i, j], since if not out else None)
+            lead = f"{CURRENCY_NAMES[c]} {verb} em" if not out else f"{CURRENCY_NAMES[c]} em"
+            out.append(f"{lead} {_fmt_brl(values[i, j])}" + (f" ({mv})" if mv else ""))
+        return out
+
+    summaries = []
+    for i, day in enumerate(dates):
+        date_br = _br(day)
+        since = _br(prev_dates[i]) if prev_dates[i] else None
+        main = quotes(i, MAIN_CURRENCIES, "fechou", since)
+        paragraphs = [f"Em {date_br}, {_join(main)}." if main
+                      else f"Em {date_br}, a gold traz {counts[i]} moedas cotadas em reais."]
+        other = quotes(i, OTHER_CURRENCIES, "ficou", None)
+        p2 = [f"Entre outras referências, {_join(other)}."] if other else []
+        if since and ups[i] + downs[i]:
+            highs = [f"{ccys[j]} ({_pct(pct[i, j])})" for j in top_up[i] if moved[i, j] > STABLE_PCT]
+            lows = [f"{ccys[j]} ({_pct(pct[i, j])})" for j in top_down[i] if moved[i, j] < -STABLE_PCT]
+            p2.append(f"Das {counts[i]} moedas cotadas, {ups[i]} subiram frente ao real e {downs[i]} recuaram.")
+            if highs:
+                p2.append(f"Maiores altas: {_join(highs)}.")
+            if lows:
+                p2.append(f"Maiores quedas: {_join(lows)}.")
+        elif not since:
+            p2.append("Não há dia anterior na gold para comparar variações.")
+        if p2:
+            paragraphs.append(" ".join(p2))
+        latam = [(c, pct[i, col[c]]) for c in LATAM_CURRENCIES if c in col and pct[i, col[c]] == pct[i, col[c]]]
+        if latam and all(abs(x) < STABLE_PCT for _, x in latam):
+            paragraphs.append("Na América Latina, as moedas ficaram estáveis frente ao real.")
+        elif latam:
+            paragraphs.append(f"Na América Latina, as variações foram: {_join([f'{CURRENCY_NAMES[c]} {_pct(x)}' for c, x in latam])}.")
+        summaries.append({"title": f"Resumo Cambial - {date_br}", "paragraphs": paragraphs[:3]})
+    return dates, summaries, key_move
+
+def llm_days(dates, key_move, above, limit=None):
+    """Política de upgrade: dias com |variação| de USD/EUR >= `above` %, os maiores primeiro (até `limit`)."""
+    picked = np.flatnonzero(np.asarray(key_move) >= above)
+    picked = picked[np.argsort(-np.asarray(key_move)[picked], kind="stable")]
+    return [dates[i] for i in picked[:limit]]
+
+def write_templates(start=None, end=None, force=False, cube=None):
+    """
+    Grava os resumos por regras do intervalo. Sem `force`, dias que já têm qualquer resumo
+    (JSON ou o .md do fallback do LLM) são mantidos.
+    """
+    with span("enrich.template", start=start, end=end) as s:
+        dates, summaries, key_move = template_summaries(start, end, cube)
+        written = 0
+        for day, data in zip(dates, summaries):
+            if not force and any(os.path.exists(os.path.join("data", "gold", f"daily_summary_{day}.{ext}"))
+                                 for ext in ("json", "md")):
+                continue
+            _write_summary(day, data["title"], data["paragraphs"])
+            written += 1
+        s.set(rows_out=written)
+    return dates, key_move, written
+
+def resolve_mode(mode=None):
+    """Modo explícito ou ENRICH_MODE (do ambiente/.env); padrão: live."""
+    if mode:
+        return mode
+    load_env()
+    return os.getenv("ENRICH_MODE", "live")
+
+def main(date=None, start=None, end=None, concurrency=DEFAULT_CONCURRENCY, mode=None, retries=DEFAULT_RETRIES,
+         llm_above=None, llm_max=None, force=False, model=None, max_tokens=None, prompt_budget=None, batch=None):
+    """
+    Resumos de um dia ou intervalo. mode=template grava só os resumos por regras; com
+    `llm_above`, o intervalo recebe os resumos por regras e só os dias escolhidos pela
+    política (llm_days) vão ao LLM no modo indicado. Modelo, max_tokens por dia, orçamento
+    do prompt e dias por pedido vêm de `settings`.
+    """
+    mode = resolve_mode(mode)
+    budget = RetryBudget(retries)
+    cfg = settings(model, max_tokens, prompt_budget, batch)
+    if mode == "template" or llm_above is not None:
+        start, end = (start, end) if start and end else (date or datetime.now().strftime("%Y-%m-%d"),) * 2
+        t0 = time.perf_counter()
+        dates, key_move, written = write_templates(start, end, force)
+        logging.info(f"{written} resumo(s) por regras gravados em {time.perf_counter() - t0:.2f}s ({len(dates)} dia(s) na gold).")
+        if mode == "template":
+            return bool(dates)
+        days = llm_days(dates, key_move, llm_above, llm_max)
+        logging.info(f"{len(days)} dia(s) com variação de USD/EUR >= {llm_above}% enviados ao LLM.")
+        if not days:
+            return bool(dates)
+        return _run_llm(sorted(days), mode, budget, cfg, concurrency)
     if start and end:
         d0 = datetime.strptime(start, "%Y-%m-%d")
         d1 = datetime.strptime(end, "%Y-%m-%d")
+        days = []
         cur = d0
-        ok = False
         while cur <= d1:
-            ok = _generate_for_date(cur.strftime("%Y-%m-%d")) or ok
+            days.append(cur.strftime("%Y-%m-%d"))
             cur += timedelta(days=1)
-        return ok
+        return _run_llm(days, mode, budget, cfg, concurrency)
     target = date or datetime.now().strftime("%Y-%m-%d")
-    return _generate_for_date(target)
+    return _generate_for_date(target, None, mode, budget, cfg)
 
 if __name__ == "__main__":
+    setup_logging()
     p = argparse.ArgumentParser()
     p.add_argument("--date")
     p.add_argument("--start")
     p.add_argument("--end")
+    p.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    p.add_argument("--mode", choices=MODES)
+    p.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    p.add_argument("--llm-above", type=float)
+    p.add_argument("--llm-max", type=int)
+    p.add_argument("--force", action="store_true")
+    p.add_argument("--model")
+    p.add_argument("--max-tokens", type=int)
+    p.add_argument("--prompt-budget", type=int)
+    p.add_argument("--batch", type=int)
     a = p.parse_args()
-    main(a.date, a.start, a.end)
+    main(a.date, a.start, a.end, a.concurrency, a.mode, a.retries, a.llm_above, a.llm_max, a.force,
+         a.model, a.max_tokens, a.prompt_budget, a.batch)
@@ -0,0 +1,108 @@
+"""
+Lacunas no calendário da gold: dias corridos sem partição (erro da API, feriado, backfill
+interrompido). A detecção compara o índice de datas com a grade completa de dias e o
+preenchimento roda de uma vez sobre a matriz (dias × moedas) do RateCube: o último/próximo
+dia observado de cada célula sai de acumulados de índices (maximum/minimum.accumulate),
+sem laço por arquivo. Dias materializados levam provenance=ffill|linear (ver goldformat).
+"""
+import logging
+import numpy as np
+import pandas as pd
+from src import goldformat, store
+from src.cube import RateCube
+
+METHODS = ("ffill", "linear")
+
+
+def _days(values) -> np.ndarray:
+    return np.asarray(values, dtype="datetime64[D]")
+
+
+def missing_dates(dates: list[str], start: str | None = None, end: str | None = None) -> list[str]:
+    """Dias corridos entre start/end (padrão: primeira e última data) ausentes de `dates`."""
+    observed = np.unique(_days(dates))
+    if not len(observed) and not (start and end):
+        return []
+    lo = _days(start) if start else observed[0]
+    hi = _days(end) if end else observed[-1]
+    grid = np.arange(lo, hi + 1)
+    return grid[~np.isin(grid, observed)].astype(str).tolist()
+
+
+def fill_matrix(values: np.ndarray, rows: np.ndarray, n: int, method: str = "ffill",
+                limit: int | None = None) -> np.ndarray:
+    """
+    Espalha `values` (linhas observadas) nas posições `rows` de uma grade com `n` dias e
+    preenche as células vazias por coluna: ffill repete o último valor; linear interpola
+    entre o anterior e o próximo (sem extrapolar nas pontas). Com `limit`, lacunas com
+    mais de `limit` dias ficam NaN.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Método inválido: {method} (use {', '.join(METHODS)})")
+    grid = np.full((n, values.shape[1]), np.nan)
+    grid[rows] = values
+    valid = ~np.isnan(grid)
+    t = np.arange(n)[:, None]
+    cols = np.arange(grid.shape[1])
+    prev = np.maximum.accumulate(np.where(valid, t, -1), axis=0)
+    left = np.where(prev >= 0, grid[np.maximum(prev, 0), cols], np.nan)
+    if method == "ffill":
+        out, span = left, t - prev
+    else:
+        nxt = np.minimum.accumulate(np.where(valid, t, n)[::-1], axis=0)[::-1]
+        right = np.where(nxt < n, grid[np.minimum(nxt, n - 1), cols], np.nan)
+        with np.errstate(invalid="ignore"):
+            w = (t - prev) / np.maximum(nxt - prev, 1)
+        out, span = left + (right - left) * w, nxt - prev - 1
+    if limit is not None:
+        out = np.where(span > limit, np.nan, out)
+    return np.where(valid, grid, out)
+
+
+def repair(method: str = "ffill", start: str | None = None, end: str | None = None,
+           limit: int | None = None, force: bool = False, dry_run: bool = False) -> list[str]:
+    """
+    Materializa na gold os dias faltantes entre start e end. Dias já preenchidos contam
+    como lacuna (são recalculados a partir dos observados), mas só são regravados se o
+    método mudou ou com `force`. Retorna os dias gravados (ou que seriam, em dry_run).
+    """
+    cube = RateCube.open("gold")
+    filled = goldformat.filled_days(store.LAYERS["gold"]["dir"])
+    obs = np.array([i for i, d in enumerate(cube.dates) if d not in filled], dtype=np.intp)
+    if not len(obs):
+        logging.info("Gold vazia; nenhuma lacuna a preencher.")
+        return []
+    obs_days = _days(np.array(cube.dates)[obs])
+    lo = min(obs_days[0], _days(start)) if start else obs_days[0]
+    hi = max(obs_days[-1], _days(end)) if end else obs_days[-1]
+    n = int((hi - lo).astype(int)) + 1
+    rows = (obs_days - lo).astype(int)
+    out = fill_matrix(np.asarray(cube.values[obs]), rows, n, method, limit)
+
+    # último dia observado de cada posição da grade, para herdar o last_update_utc
+    src = np.maximum.accumulate(np.where(np.isin(np.arange(n), rows), np.arange(n), -1))
+    updated = np.full(n, "", dtype=object)
+    updated[rows] = np.array(cube.updated, dtype=object)[obs]
+
+    todo = [d for d in missing_dates(obs_days.astype(str).tolist(), start, end)
+            if force or filled.get(d) != method]
+    ccys = np.array(cube.currencies)
+    written = []
+    for day in todo:
+        i = int((_days(day) - lo).astype(int))
+        mask = ~np.isnan(out[i])
+        if not mask.any() or src[i] < 0:
+            continue
+        written.append(day)
+        if dry_run:
+            continue
+        df = pd.DataFrame({
+            "currency": ccys[mask],
+            "rate_brl_base": out[i][mask],
+            "last_update_utc": updated[src[i]],
+            "provenance": method,
+        })
+        goldformat.write(store.LAYERS["gold"]["dir"] / store.LAYERS["gold"]["pattern"].format(date=day), day, df)
+    if written and not dry_run:
+        logging.info(f"{len(written)} dia(s) preenchidos na gold por '{method}'.")
+    return written
@@ -0,0 +1,288 @@
+"""
+Formato compacto da gold diária. Em vez de repetir a string da moeda e o
+last_update_utc em toda linha, cada arquivo guarda:
+  - ccy_id (int16) apontando para um dicionário de moedas compartilhado (_currencies.json, ao lado);
+  - o timestamp uma única vez, como int64 nos metadados do Parquet;
+  - rate_brl_base em float64 ("compact") ou, no modo "delta", o XOR dos bits do float64
+    com a taxa do dia anterior (exato; taxas que não mudaram viram zero e o zstd as elimina).
+O arquivo mantém o nome de sempre; os leitores (store) detectam o formato pelos metadados.
+Dias sintéticos (lacunas preenchidas, ver gaps) levam a coluna/metadado `provenance` e
+ficam listados em _filled.json; uma gravação real do dia remove a marca.
+Cadeias de delta recomeçam a cada mês, então ler um dia decodifica no máximo ~30 arquivos.
+"""
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.runtime import file_lock
+
+
+GOLD_DIR = Path("data/gold")
+GOLD_PATTERN = "exchange_rates_brl_base_{date}.parquet"
+DICT_NAME = "_currencies.json"
+FORMATS = ("parquet", "compact", "delta")
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+META_FORMAT = b"fx.format"
+META_TS = b"fx.last_update_unix"
+META_REF = b"fx.ref"
+META_PROVENANCE = b"fx.provenance"
+FILLED_INDEX = "_filled.json"
+
+
+def gold_format() -> str:
+    """Formato de escrita da gold (env GOLD_FORMAT); padrão: Parquet tabular de sempre."""
+    fmt = os.getenv("GOLD_FORMAT", "parquet").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"GOLD_FORMAT inválido: {fmt} (use {', '.join(FORMATS)})")
+    return fmt
+
+
+def _path(root: Path, day: str) -> Path:
+    return root / GOLD_PATTERN.format(date=day)
+
+
+def _days(root: Path) -> list[str]:
+    prefix, suffix = GOLD_PATTERN.split("{date}")
+    return sorted(n[len(prefix):-len(suffix)] for n in os.listdir(root) if n.startswith(prefix) and n.endswith(suffix))
+
+
+def load_dictionary(root: Path = GOLD_DIR) -> list[str]:
+    p = Path(root) / DICT_NAME
+    if not p.exists():
+        return []
+    return json.loads(p.read_text(encoding="utf-8"))
+
+
+def filled_days(root: Path = GOLD_DIR) -> dict[str, str]:
+    """Dias da gold materializados pelo preenchimento de lacunas → método (ffill/linear)."""
+    p = Path(root) / FILLED_INDEX
+    if not p.exists():
+        return {}
+    return json.loads(p.read_text(encoding="utf-8"))
+
+
+def _mark_filled(root: Path, day: str, provenance: str | None):
+    if filled_days(root).get(day) == provenance:
+        return
+    with file_lock(root / "_currencies.lock"):
+        index = filled_days(root)
+        if provenance:
+            index[day] = provenance
+        else:
+            index.pop(day, None)
+        tmp = root / (FILLED_INDEX + ".tmp")
+        tmp.write_text(json.dumps(dict(sorted(index.items()))), encoding="utf-8")
+        os.replace(tmp, root / FILLED_INDEX)
+
+
+def _ids(root: Path, currencies: np.ndarray) -> np.ndarray:
+    """Ids estáveis no dicionário compartilhado; moedas novas entram no fim (append-only)."""
+    names = load_dictionary(root)
+    if not set(currencies) <= set(names):
+        with file_lock(root / "_currencies.lock"):
+            names = load_dictionary(root)
+            known = set(names)
+            names += sorted({c for c in currencies if c not in known})
+            tmp = root / (DICT_NAME + ".tmp")
+            tmp.write_text(json.dumps(names), encoding="utf-8")
+            os.replace(tmp, root / DICT_NAME)
+    pos = {c: i for i, c in enumerate(names)}
+    return np.array([pos[c] for c in currencies], dtype=np.int16)
+
+
+def _format_of(path: Path) -> str:
+    meta = pq.read_schema(path).metadata or {}
+    return meta.get(META_FORMAT, b"parquet").decode()
+
+
+def _dependents_of(root: Path, day: str, inserting: bool) -> list[str]:
+    """
+    Dias do mesmo mês cujo delta foi codificado contra `day` e precisam ser recodificados se
+    `day` mudar. Ao inserir um dia no meio da cadeia, o dia seguinte também é recodificado
+    contra ele, para a cadeia continuar linear (cada dia referencia só o anterior).
+    """
+    later = [d for d in _days(root) if d > day and d[:7] == day[:7]]
+    out = []
+    for i, d in enumerate(later):
+        meta = pq.read_schema(_path(root, d)).metadata or {}
+        ref = meta.get(META_REF, b"").decode()
+        if ref == day or (inserting and i == 0 and ref):
+            out.append(d)
+    return out
+
+
+def _encode(root: Path, day: str, df: pd.DataFrame, fmt: str) -> tuple[pa.Table, dict]:
+    ccy = df["currency"].to_numpy(dtype=str)
+    values = df["rate_brl_base"].to_numpy(dtype="float64")
+    ts = datetime.strptime(str(df["last_update_utc"].iloc[0]), TS_FORMAT).replace(tzinfo=timezone.utc)
+    meta = {META_FORMAT: fmt.encode(), META_TS: str(int(ts.timestamp())).encode()}
+    if "provenance" in df:
+        meta[META_PROVENANCE] = str(df["provenance"].iloc[0]).encode()
+    ids = _ids(root, ccy)
+    earlier = [d for d in _days(root) if d < day] if fmt == "delta" else []
+    prev = earlier[-1] if earlier else None
+    if prev and prev[:7] == day[:7]:
+        ref = read(_path(root, prev))
+        ref_values = dict(zip(ref["currency"], ref["rate_brl_base"]))
+        base = np.array([ref_values.get(c, 0.0) for c in ccy], dtype="float64")
+        xor = values.view(np.int64) ^ base.view(np.int64)
+        meta[META_REF] = prev.encode()
+        return pa.table({"ccy_id": ids, "rate_xor": xor}), meta
+    meta[META_FORMAT] = b"compact"
+    return pa.table({"ccy_id": ids, "rate_brl_base": values}), meta
+
+
+def _write_file(path: Path, day: str, df: pd.DataFrame, fmt: str):
+    path = Path(path)
+    tmp = path.with_suffix(".tmp")
+    uniform = df["last_update_utc"].nunique() <= 1
+    if fmt == "parquet" or df.empty or not uniform:
+        df.to_parquet(tmp, index=False)
+    else:
+        table, meta = _encode(path.parent, day, df, fmt)
+        pq.write_table(table.replace_schema_metadata(meta), tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def write(path: Path, day: str, df_gold: pd.DataFrame, fmt: str | None = None) -> Path:
+    """Grava a gold do dia no formato pedido, preservando as cadeias de delta que dependem dele."""
+    fmt = fmt or gold_format()
+    path = Path(path)
+    root = path.parent
+    root.mkdir(parents=True, exist_ok=True)
+    dependents = _dependents_of(root, day, inserting=not path.exists())
+    # decodifica os dependentes contra a versão atual do dia antes de trocá-la
+    dep_dfs = {d: read(_path(root, d)) for d in dependents}
+    _write_file(path, day, df_gold, fmt)
+    for d, dep_df in dep_dfs.items():
+        dep_path = _path(root, d)
+        _write_file(dep_path, d, dep_df, _format_of(dep_path))
+    provenance = str(df_gold["provenance"].iloc[0]) if "provenance" in df_gold and len(df_gold) else None
+    if provenance or (root / FILLED_INDEX).exists():
+        _mark_filled(root, day, provenance)
+    return path
+
+
+def read(path: Path) -> pd.DataFrame:
+    """Lê um arquivo gold diário em qualquer formato como (currency, rate_brl_base, last_update_utc)."""
+    st = Path(path).stat()
+    return _read_cached(str(path), st.st_ino, st.st_mtime_ns, st.st_size).copy()
+
+
+@lru_cache(maxsize=64)
+def _read_cached(path: str, ino: int, mtime_ns: int, size: int) -> pd.DataFrame:
+    table = pq.read_table(path)
+    meta = table.schema.metadata or {}
+    fmt = meta.get(META_FORMAT, b"parquet").decode()
+    if fmt == "parquet":
+        return table.to_pandas()
+    root = Path(path).parent
+    names = np.array(load_dictionary(root))
+    ccy = names[table.column("ccy_id").to_numpy().astype(np.intp)]
+    if fmt == "delta":
+        ref = read(_path(root, meta[META_REF].decode()))
+        ref_values = dict(zip(ref["currency"], ref["rate_brl_base"]))
+        base = np.array([ref_values.get(c, 0.0) for c in ccy], dtype="float64")
+        values = (table.column("rate_xor").to_numpy() ^ base.view(np.int64)).view("float64")
+    else:
+        values = table.column("rate_brl_base").to_numpy()
+    ts = datetime.fromtimestamp(int(meta[META_TS]), tz=timezone.utc).strftime(TS_FORMAT)
+    df = pd.DataFrame({"currency": ccy, "rate_brl_base": values, "last_update_utc": ts})
+    if META_PROVENANCE in meta:
+        df["provenance"] = meta[META_PROVENANCE].decode()
+    return df
+
+
+def read_many(files: dict[str, Path]) -> pd.DataFrame:
+    """
+    Lê vários dias de uma vez (date, currency, rate_brl_base, last_update_utc). Os arquivos
+    compactos são decodificados por ids e viram um único DataFrame no fim; os deltas usam o
+    dia anterior já decodificado no próprio lote.
+    """
+    plain, ids_parts, val_parts, day_parts, ts_parts = [], [], [], [], []
+    decoded: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+    names = None
+    for day, p in sorted(files.items()):
+        table = pq.read_table(p)
+        meta = table.schema.metadata or {}
+        fmt = meta.get(META_FORMAT, b"parquet").decode()
+        if fmt == "parquet":
+            df = table.to_pandas()
+            df.insert(0, "date", day)
+            plain.append(df)
+            continue
+        if names is None:
+            names = load_dictionary(Path(p).parent)
+        ids = table.column("ccy_id").to_numpy().astype(np.intp)
+        if fmt == "delta":
+            ref_day = meta[META_REF].decode()
+            if ref_day not in decoded:
+                ref = read(Path(p).parent / GOLD_PATTERN.format(date=ref_day))
+                pos = {c: i for i, c in enumerate(names)}
+                # referência em Parquet tabular pode ter moedas fora do dicionário: não entram no delta
+                ref_ids = np.array([pos.get(c, -1) for c in ref["currency"]], dtype=np.intp)
+                known = ref_ids >= 0
+                decoded[ref_day] = (ref_ids[known], ref["rate_brl_base"].to_numpy(dtype="float64")[known])
+            ref_ids, ref_vals = decoded[ref_day]
+            base = np.zeros(len(names), dtype="float64")
+            base[ref_ids] = ref_vals
+            values = (table.column("rate_xor").to_numpy() ^ base[ids].view(np.int64)).view("float64")
+        else:
+            values = table.column("rate_brl_base").to_numpy()
+        decoded[day] = (ids, values)
+        ids_parts.append(ids)
+        val_parts.append(values)
+        day_parts.append((day, len(ids)))
+        ts_parts.append(datetime.fromtimestamp(int(meta[META_TS]), tz=timezone.utc).strftime(TS_FORMAT))
+    frames = plain
+    if ids_parts:
+        counts = [n for _, n in day_parts]
+        frames.append(pd.DataFrame({
+            "date": np.repeat([d for d, _ in day_parts], counts),
+            "currency": np.array(names)[np.concatenate(ids_parts)],
+            "rate_brl_base": np.concatenate(val_parts),
+            "last_update_utc": np.repeat(ts_parts, counts),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["date", "currency", "rate_brl_base", "last_update_utc"])
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def convert(fmt: str, root: Path = GOLD_DIR) -> dict:
+    """
+    Regrava todos os arquivos gold diários no formato `fmt` (em ordem cronológica, para as
+    cadeias de delta) e devolve bytes em disco e tempo de leitura antes/depois.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato inválido: {fmt} (use {', '.join(FORMATS)})")
+    root = Path(root)
+    days = _days(root) if root.exists() else []
+
+    def measure() -> tuple[int, float]:
+        size = sum(_path(root, d).stat().st_size for d in days)
+        if any(_format_of(_path(root, d)) != "parquet" for d in days) and (root / DICT_NAME).exists():
+            size += (root / DICT_NAME).stat().st_size
+        best = float("inf")
+        for _ in range(3):
+            _read_cached.cache_clear()
+            t0 = time.perf_counter()
+            read_many({d: _path(root, d) for d in days})
+            best = min(best, time.perf_counter() - t0)
+        return size, best
+
+    before = measure()
+    frames = {d: read(_path(root, d)) for d in days}
+    for d in days:
+        _write_file(_path(root, d), d, frames[d], fmt)
+    after = measure()
+    logging.info(f"{len(days)} arquivo(s) gold convertidos para '{fmt}'.")
+    return {"files": len(days), "format": fmt,
+            "bytes_before": before[0], "bytes_after": after[0],
+            "load_s_before": before[1], "load_s_after": after[1]}
@@ -0,0 +1,382 @@
+"""
+Camada HTTP compartilhada por ingest e backfill: sessão requests com pool keep-alive,
+timeouts, retry com backoff, circuit breaker por host, requisições condicionais
+(ETag / Last-Modified) e cache em disco que respeita o time_next_update_unix da API —
+dentro da janela de atualização, repetir a ingestão não faz nenhuma chamada de rede.
+A variante assíncrona usa httpx quando instalado; sem ele, roda a sessão síncrona em threads.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from src.telemetry import span
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+DEFAULT_TIMEOUT = (5.0, 30.0)  # (conexão, leitura)
+POOL_SIZE = 32
+CACHE_DIR = Path("data/cache/http")
+# sem time_next_update_unix, um 304 vale por este tempo antes de revalidar
+NOT_MODIFIED_TTL = 300.0
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+RETRY_BACKOFF = 0.5
+RETRY_MAX_BACKOFF = 30.0
+
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 30.0
+
+
+class TokenBucket:
+    """
+    Limitador de taxa token-bucket (thread-safe).
+    Libera `rate` requisições por segundo, com rajada de até `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Consome um token se houver; senão devolve quanto esperar."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+    def acquire(self):
+        while (wait_s := self._take()) > 0:
+            time.sleep(wait_s)
+
+    async def acquire_async(self):
+        while (wait_s := self._take()) > 0:
+            await asyncio.sleep(wait_s)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Abre após `threshold` falhas seguidas (erros de rede/5xx) e recusa chamadas por
+    `reset_after` segundos; depois deixa uma tentativa passar (meio-aberto).
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, reset_after: float = BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def check(self, host: str = ""):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at >= self.reset_after:
+                self.opened_at = None  # meio-aberto: a próxima falha reabre
+                self.failures = self.threshold - 1
+                return
+        raise CircuitOpenError(f"Circuito aberto para {host}: muitas falhas seguidas; tente mais tarde.")
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+_session = None
+_session_lock = threading.Lock()
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def session() -> requests.Session:
+    """Sessão única com pool de conexões keep-alive (retries ficam por nossa conta)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+        return _session
+
+
+def breaker(url: str) -> CircuitBreaker:
+    host = urlsplit(url).netloc
+    with _session_lock:
+        return _breakers.setdefault(host, CircuitBreaker())
+
+
+def retry_delay(attempt: int, retry_after: str | None) -> float:
+    if retry_after:
+        try:
+            return min(RETRY_MAX_BACKOFF, float(retry_after))
+        except ValueError:
+            pass
+    # backoff exponencial com "full jitter"
+    return random.uniform(0, min(RETRY_MAX_BACKOFF, RETRY_BACKOFF * (2 ** attempt)))
+
+
+def _label(url: str) -> str:
+    # a chave da API vai no caminho: nos logs aparece só o último segmento
+    return url.rsplit("/", 1)[-1]
+
+
+# --- cache em disco ---------------------------------------------------------------
+
+def _cache_path(url: str) -> Path:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return CACHE_DIR / key[:2] / f"{key}.json"
+
+
+def _cache_get(url: str) -> dict | None:
+    p = _cache_path(url)
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_put(url: str, entry: dict):
+    p = _cache_path(url)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(f".{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(entry), encoding="utf-8")
+    os.replace(tmp, p)
+
+
+def _entry(body: dict, headers) -> dict | None:
+    """Entrada de cache se a resposta tiver validador ou prazo; senão não vale guardar."""
+    etag, modified = headers.get("ETag"), headers.get("Last-Modified")
+    expires = body.get("time_next_update_unix") if isinstance(body, dict) else None
+    if not (etag or modified or expires):
+        return None
+    return {"body": body, "etag": etag, "last_modified": modified,
+            "expires": float(expires) if expires else None, "fetched": time.time()}
+
+
+def _fresh(entry: dict | None) -> bool:
+    return bool(entry and entry.get("expires") and time.time() < entry["expires"])
+
+
+def _conditional(entry: dict | None) -> dict:
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def _revalidated(url: str, entry: dict) -> dict:
+    entry = dict(entry, fetched=time.time())
+    if not _fresh(entry):
+        entry["expires"] = time.time() + NOT_MODIFIED_TTL
+    _cache_put(url, entry)
+    return entry["body"]
+
+
+# --- núcleo comum ----------------------------------------------------------------
+
+def _exchange(url: str, cache: bool, retries: int, sp):
+    """
+    Cache em disco, circuit breaker, revalidação (304) e decisão de retry, sem I/O de rede:
+    compartilhado por get_json e _aget_json, que só executam os passos gerados —
+    ("acquire", None) antes de cada tentativa (limitador), ("get", cabeçalhos), que recebe a
+    resposta ou a exceção de transporte, e ("sleep", segundos). O retorno do gerador é o JSON.
+    """
+    entry = _cache_get(url) if cache else None
+    if _fresh(entry):
+        logging.info(f"Cache HTTP válido para {_label(url)}; sem chamada de rede.")
+        sp.set(cache="fresh")
+        return entry["body"]
+    cb = breaker(url)
+    for attempt in range(retries + 1):
+        cb.check(urlsplit(url).netloc)
+        yield "acquire", None
+        retry_after = None
+        sp.set(attempts=attempt + 1)
+        t0 = time.perf_counter()
+        r = yield "get", _conditional(entry)
+        sp.add("http_ms", (time.perf_counter() - t0) * 1000)
+        if isinstance(r, Exception):
+            cb.failure()
+            if attempt == retries:
+                raise r
+        else:
+            sp.set(http_status=r.status_code)
+            if r.status_code == 304 and entry:
+                cb.success()
+                sp.set(cache="revalidated")
+                return _revalidated(url, entry)
+            if r.status_code >= 500:
+                cb.failure()
+            if r.status_code not in RETRY_STATUS or attempt == retries:
+                r.raise_for_status()
+                cb.success()
+                data = r.json()
+                sp.set(cache="miss", bytes_read=len(r.content))
+                new = _entry(data, r.headers) if cache else None
+                if new:
+                    _cache_put(url, new)
+                return data
+            retry_after = r.headers.get("Retry-After")
+        delay = retry_delay(attempt, retry_after)
+        logging.warning(f"Tentativa {attempt + 1} falhou para {_label(url)}; nova tentativa em {delay:.2f}s")
+        yield "sleep", delay
+
+
+# --- cliente síncrono -------------------------------------------------------------
+
+def get_json(url: str, limiter: TokenBucket | None = None, cache: bool = True,
+             timeout=DEFAULT_TIMEOUT, retries: int = MAX_RETRIES) -> dict:
+    """
+    GET com JSON na resposta. Com `cache`, respostas ainda dentro do time_next_update_unix
+    voltam do disco sem rede e as demais são revalidadas (304 reaproveita o corpo salvo).
+    """
+    with span("http", host=urlsplit(url).netloc) as sp:
+        steps, reply = _exchange(url, cache, retries, sp), None
+        while True:
+            try:
+                step, arg = steps.send(reply)
+            except StopIteration as done:
+                return done.value
+            reply = None
+            if step == "acquire" and limiter:
+                limiter.acquire()
+            elif step == "sleep":
+                time.sleep(arg)
+            elif step == "get":
+                try:
+                    reply = session().get(url, timeout=timeout, headers=arg)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    reply = e
+
+
+# --- variante assíncrona ----------------------------------------------------------
+
+async def _aget_json(client, url: str, limiter: TokenBucket | None, cache: bool, retries: int) -> dict:
+    # cada tarefa asyncio tem sua cópia do contexto: spans concorrentes não se misturam
+    with span("http", host=urlsplit(url).netloc, client="httpx") as sp:
+        steps, reply = _exchange(url, cache, retries, sp), None
+        while True:
+            try:
+                step, arg = steps.send(reply)
+            except StopIteration as done:
+                return done.value
+            reply = None
+            if step == "acquire" and limiter:
+                await limiter.acquire_async()
+            elif step == "sleep":
+                await asyncio.sleep(arg)
+            elif step == "get":
+                try:
+                    reply = await client.get(url, headers=arg)
+                except (httpx.TransportError, httpx.TimeoutException) as e:
+                    reply = e
+
+
+async def fetch_all_async(urls: list[str], concurrency: int = 8, limiter: TokenBucket | None = None,
+                          cache: bool = True, retries: int = MAX_RETRIES):
+    """
+    Busca várias URLs com até `concurrency` em voo e gera (url, dados | exceção) conforme
+    terminam. Usa httpx.AsyncClient (HTTP/1.1 keep-alive) se disponível; senão a sessão síncrona
+    em threads via asyncio.to_thread.
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(client, url):
+        async with sem:
+            try:
+                if client is None:
+                    return url, await asyncio.to_thread(get_json, url, limiter, cache, DEFAULT_TIMEOUT, retries)
+                return url, await _aget_json(client, url, limiter, cache, retries)
+            except Exception as e:
+                return url, e
+
+    async def run(client):
+        for fut in asyncio.as_completed([one(client, u) for u in urls]):
+            yield await fut
+
+    if httpx is None:
+        async for item in run(None):
+            yield item
+        return
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(DEFAULT_TIMEOUT[1], connect=DEFAULT_TIMEOUT[0])
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        async for item in run(client):
+            yield item
+
+
+def iter_json(urls: list[str], concurrency: int = 8, limiter: TokenBucket | None = None,
+              cache: bool = True, buffer: int | None = None):
+    """
+    Ponte síncrona para fetch_all_async: o laço de eventos roda numa thread e os resultados
+    chegam por uma fila limitada (backpressure), para quem processa os dados em sequência.
+    Se o consumidor parar de iterar, a thread é avisada, para de buscar e fecha o cliente.
+    """
+    q: queue.Queue = queue.Queue(maxsize=buffer or concurrency * 2)
+    done = object()
+    stop = threading.Event()
+
+    def offer(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def worker():
+        async def pump():
+            results = fetch_all_async(urls, concurrency, limiter, cache)
+            try:
+                async for item in results:
+                    if not await asyncio.to_thread(offer, item):
+                        break
+            finally:
+                await results.aclose()
+        try:
+            asyncio.run(pump())
+        finally:
+            offer(done)
+
+    t = threading.Thread(target=worker, daemon=True)
+    t.start()
+    try:
+        while (item := q.get()) is not done:
+            yield item
+    finally:
+        stop.set()
+    t.join()
@@ -1,63 +1,95 @@
 import os
 import requests
-import json
 from datetime import datetime
 import logging
-from dotenv import load_dotenv
+from src.httpclient import get_json
+from src.runtime import load_env, setup_logging
+from src.telemetry import span
+from src.transform import dump_raw_json, validate_raw
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 
 
-load_dotenv()
-logging.info("Variáveis de ambiente carregadas.")
+RAW_DATA_PATH = os.path.join('data', 'raw')
+BASE_CURRENCY = "USD"
+DEFAULT_API_URL = "https://v6.exchangerate-api.com/v6"
 
-def main():
+
+def api_url() -> str:
+    """Base da ExchangeRate API: EXCHANGERATE_API_URL (ambiente ou .env) ou o endereço público."""
+    load_env()
+    return os.getenv("EXCHANGERATE_API_URL", DEFAULT_API_URL)
+
+
+def fetch_latest(cache: bool = True) -> dict:
     """
-    Função principal para executar o pipeline de ingestão de dados.
+    Busca as cotações mais recentes (/latest) e valida o payload.
     """
-    logging.info("Iniciando o processo de ingestão de dados.")
-
-   
+    load_env()
     api_key = os.getenv("EXCHANGERATE_API_KEY")
     if not api_key:
-        logging.error("A chave da API (EXCHANGERATE_API_KEY) não foi encontrada. Verifique seu arquivo .env.")
-        return 
-
-   
-    base_currency = "USD"
-    url = f"https://v6.exchangerate-api.com/v6/{api_key}/latest/{base_currency}"
-
-
-    try:
-        logging.info(f"Buscando cotações para a moeda base: {base_currency}")
-        response = requests.get(url)
-        response.raise_for_status()  
+        raise RuntimeError("A chave da API (EXCHANGERATE_API_KEY) não foi encontrada. Verifique seu arquivo .env.")
+    url = f"{api_url()}/{api_key}/latest/{BASE_CURRENCY}"
+    logging.info(f"Buscando cotações para a moeda base: {BASE_CURRENCY}")
+    # cache HTTP: até o time_next_update_unix da API, rodar de novo não vai à rede
+    data = get_json(url, cache=cache)
+    logging.info("Dados recebidos da API com sucesso.")
+    validate_raw(data)
+    return data
 
-        data = response.json()
-        logging.info("Dados recebidos da API com sucesso.")
 
-        
-        today_str = datetime.now().strftime('%Y-%m-%d')
-        file_name = f"{today_str}.json"
+def run(day: str | None = None) -> dict:
+    """
+    Busca e grava data/raw/{day}.json. Devolve o payload para as etapas seguintes.
+    """
+    day = day or datetime.now().strftime('%Y-%m-%d')
+    with span("ingest", day=day) as s:
+        data = fetch_latest()
+        os.makedirs(RAW_DATA_PATH, exist_ok=True)
+        file_path = os.path.join(RAW_DATA_PATH, f"{day}.json")
+        dump_raw_json(data, file_path)
+        s.set(rows_out=len(data["conversion_rates"]), bytes_written=os.path.getsize(file_path))
+    logging.info(f"Dados brutos salvos com sucesso em: {file_path}")
+    return data
 
-        raw_data_path = os.path.join('data', 'raw')
-        os.makedirs(raw_data_path, exist_ok=True)
-        
-        file_path = os.path.join(raw_data_path, file_name)
 
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+def run_intraday() -> bool:
+    """
+    Modo intradiário: acrescenta o snapshot ao tick store em vez de sobrescrever a raw do dia.
+    """
+    from src.ticks import TickStore
+    with span("ingest.intraday") as s:
+        added = TickStore().append(fetch_latest())
+        s.set(appended=added)
+    if not added:
+        logging.info("Cotações inalteradas desde o último tick; nada gravado.")
+    return added
 
-        logging.info(f"Dados brutos salvos com sucesso em: {file_path}")
 
+def main(intraday: bool = False, close: str | None = None):
+    """
+    Função principal para executar o pipeline de ingestão de dados.
+    `intraday` grava um tick; `close` consolida os ticks de um dia na raw/silver/gold.
+    """
+    setup_logging()
+    logging.info("Iniciando o processo de ingestão de dados.")
+    try:
+        if close:
+            from src.ticks import TickStore
+            TickStore().close_day(close)
+        elif intraday:
+            run_intraday()
+        else:
+            run()
+    except FileNotFoundError as e:
+        logging.error(str(e))
+    except RuntimeError as e:
+        logging.error(str(e))
     except requests.exceptions.RequestException as e:
         logging.error(f"Erro ao fazer a requisição à API: {e}")
+    except ValueError as e:
+        logging.error(f"Payload da API fora do esquema esperado: {e}")
     except Exception as e:
         logging.error(f"Ocorreu um erro inesperado: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,45 +2,55 @@ import os
 import pandas as pd
 from datetime import datetime
 import logging
+from src.crossrate import CrossRates
+from src.runtime import setup_logging
+from src.telemetry import span
+from src import goldformat, viewcache
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 
 SILVER_DATA_PATH = os.path.join('data', 'silver')
 GOLD_DATA_PATH = os.path.join('data', 'gold')
 
 
+def to_gold_df(df_silver: pd.DataFrame, base: str = "BRL") -> pd.DataFrame:
+    """
+    Converte a tabela silver (base USD) para qualquer moeda base via motor de cross-rates:
+    1 moeda X na base B = (USD->B) / (USD->X)
+    Garante base = 1.0.
+    """
+    return CrossRates.from_silver(df_silver).table(base)
+
+
 def to_gold_brl_df(df_silver: pd.DataFrame) -> pd.DataFrame:
     """
     Converte a tabela silver (base USD) para BRL:
     1 moeda X em BRL = (USD->BRL) / (USD->X)
     Garante BRL = 1.0.
     """
-    
-    brl_vs_usd = df_silver.loc[df_silver['target_currency'] == 'BRL', 'rate'].iloc[0]
+    return to_gold_df(df_silver, "BRL")
 
-    out = df_silver.copy()
-    out['rate_brl_base'] = brl_vs_usd / out['rate']  
 
-    df_gold = (
-        out[['target_currency', 'rate_brl_base', 'last_update_utc']]
-        .rename(columns={'target_currency': 'currency'})
-        .reset_index(drop=True)
-    )
+def run(day: str, df_silver: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Gera a gold (BRL) de um dia. Usa `df_silver` em memória quando fornecido; senão lê a silver do disco.
+    """
+    with span("load", day=day) as s:
+        if df_silver is None:
+            silver_file_path = os.path.join(SILVER_DATA_PATH, f"{day}.parquet")
+            if not os.path.exists(silver_file_path):
+                raise FileNotFoundError(f"Arquivo da camada Silver não encontrado: {silver_file_path}")
+            logging.info(f"Carregando dados de {silver_file_path}")
+            df_silver = pd.read_parquet(silver_file_path)
+            s.set(bytes_read=os.path.getsize(silver_file_path))
 
-    
-    if (df_gold['currency'] == 'BRL').any():
-        df_gold.loc[df_gold['currency'] == 'BRL', 'rate_brl_base'] = 1.0
-    else:
-        df_gold = pd.concat([df_gold, pd.DataFrame([{
-            'currency': 'BRL',
-            'rate_brl_base': 1.0,
-            'last_update_utc': out['last_update_utc'].iloc[0]
-        }])], ignore_index=True)
+        df_gold = to_gold_brl_df(df_silver)
 
+        os.makedirs(GOLD_DATA_PATH, exist_ok=True)
+        gold_file_path = os.path.join(GOLD_DATA_PATH, f"exchange_rates_brl_base_{day}.parquet")
+        goldformat.write(gold_file_path, day, df_gold)
+        viewcache.write(day, df_gold["currency"], df_gold["rate_brl_base"], df_gold["last_update_utc"].iloc[0])
+        s.set(rows_in=len(df_silver), rows_out=len(df_gold), bytes_written=os.path.getsize(gold_file_path))
+    logging.info(f"Dataset Gold salvo com sucesso em: {gold_file_path}")
     return df_gold
 
 
@@ -48,30 +58,15 @@ def main():
     """
     Lê a camada silver, converte para base BRL e salva na gold.
     """
+    setup_logging()
     logging.info("Iniciando o processo de carga para a camada Gold.")
 
-    
     today_str = datetime.now().strftime('%Y-%m-%d')
-    silver_file_path = os.path.join(SILVER_DATA_PATH, f"{today_str}.parquet")
-
-    if not os.path.exists(silver_file_path):
-        logging.error(f"Arquivo da camada Silver não encontrado: {silver_file_path}")
-        return
-
-    # 2) carrega silver
-    logging.info(f"Carregando dados de {silver_file_path}")
-    df_silver = pd.read_parquet(silver_file_path)
-
     try:
-        df_gold = to_gold_brl_df(df_silver)
-
-        # 3) salva gold
-        os.makedirs(GOLD_DATA_PATH, exist_ok=True)
-        gold_file_path = os.path.join(GOLD_DATA_PATH, f"exchange_rates_brl_base_{today_str}.parquet")
-        df_gold.to_parquet(gold_file_path, index=False)
-        logging.info(f"Dataset Gold salvo com sucesso em: {gold_file_path}")
-
-    except IndexError:
+        run(today_str)
+    except FileNotFoundError as e:
+        logging.error(str(e))
+    except KeyError:
         logging.error("A moeda 'BRL' não foi encontrada nos dados. Não é possível criar o dataset final.")
     except Exception as e:
         logging.error(f"Ocorreu um erro inesperado durante a transformação para Gold: {e}")
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+
+MANIFEST_PATH = Path("data/manifest.sqlite")
+STAGES = ("raw", "silver", "gold")
+
+
+def hash_payload(data: dict) -> str:
+    """Hash estável do JSON bruto (independe da ordem das chaves)."""
+    blob = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def hash_frame(df: pd.DataFrame) -> str:
+    """Hash do conteúdo de um DataFrame (colunas + valores), sem depender do arquivo Parquet."""
+    h = hashlib.sha256(",".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+class Manifest:
+    """
+    Ledger SQLite com o status de cada (dia, camada):
+    hash do conteúdo gerado, hash da entrada usada e timestamp da API.
+    """
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stages (
+                day TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                status TEXT NOT NULL,
+                content_hash TEXT,
+                input_hash TEXT,
+                api_ts INTEGER,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (day, stage)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get(self, day: str, stage: str) -> dict | None:
+        cur = self.conn.execute(
+            "SELECT status, content_hash, input_hash, api_ts, updated_at FROM stages WHERE day = ? AND stage = ?",
+            (day, stage),
+        )
+        row = cur.fetchone()
+        if not row:
+            return None
+        return dict(zip(("status", "content_hash", "input_hash", "api_ts", "updated_at"), row))
+
+    def record(self, day: str, stage: str, content_hash: str | None = None, input_hash: str | None = None,
+               api_ts: int | None = None, status: str = "done"):
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        self.conn.execute(
+            "INSERT OR REPLACE INTO stages (day, stage, status, content_hash, input_hash, api_ts, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (day, stage, status, content_hash, input_hash, api_ts, now),
+        )
+        self.conn.commit()
+
+    def is_fresh(self, day: str, stage: str, path: Path, input_hash: str | None = None) -> bool:
+        """True se a camada está concluída, o arquivo existe e foi gerada a partir da mesma entrada."""
+        rec = self.get(day, stage)
+        if not rec or rec["status"] != "done" or not Path(path).exists():
+            return False
+        return input_hash is None or rec["input_hash"] == input_hash
+
+    def complete_days(self) -> set[str]:
+        cur = self.conn.execute(
+            "SELECT day FROM stages WHERE status = 'done' GROUP BY day HAVING COUNT(DISTINCT stage) = ?",
+            (len(STAGES),),
+        )
+        return {r[0] for r in cur.fetchall()}
+
+    def last_good_day(self) -> str | None:
+        days = self.complete_days()
+        return max(days) if days else None
+
+    def close(self):
+        self.conn.close()
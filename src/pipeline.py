@@ -0,0 +1,251 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+import pandas as pd
+from src import analytics, enrich, ingest, load, quality, rollup, transform
+from src.cube import SNAPSHOT_FILE, RateCube, cube_dir
+from src.runtime import setup_logging
+from src.telemetry import traced
+
+
+
+class Task:
+    """
+    Nó do DAG: `fn(day, *valores_das_dependências)` devolve o resultado em memória.
+    `inputs`/`outputs` mapeiam o dia para arquivos e alimentam o skip-if-fresh.
+    """
+
+    def __init__(self, name, fn, deps=(), inputs=None, outputs=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.inputs = inputs or (lambda day: [])
+        self.outputs = outputs or (lambda day: [])
+
+
+def _raw(day):
+    return [Path(transform.RAW_DATA_PATH) / f"{day}.json"]
+
+def _silver(day):
+    return [Path(transform.SILVER_DATA_PATH) / f"{day}.parquet"]
+
+def _gold(day):
+    return [Path(load.GOLD_DATA_PATH) / f"exchange_rates_brl_base_{day}.parquet"]
+
+def _summary(day):
+    return [Path(load.GOLD_DATA_PATH) / f"daily_summary_{day}.json"]
+
+def _analytics(day):
+    return [analytics.ANALYTICS_DIR / f"analytics_{day}.parquet"]
+
+def _snapshot(day):
+    return [cube_dir("gold") / SNAPSHOT_FILE]
+
+def _rollups(day):
+    return [rollup.rollup_path(r) for r in rollup.STORED]
+
+
+def _ingest(day):
+    if day != datetime.now().strftime('%Y-%m-%d'):
+        raise RuntimeError(f"Sem raw para {day}; /latest só cobre hoje (use src.backfill).")
+    return ingest.run(day)
+
+def _transform(day, data):
+    # partições terminam fora de ordem: a qualidade roda depois, em ordem de data (_quality_in_order)
+    return transform.run(day, data, check=False)
+
+def _enrich(day, df_gold):
+    if not enrich._generate_for_date(day, df_gold, enrich.resolve_mode()):
+        raise RuntimeError(f"Resumo não gerado para {day}.")
+
+
+INGEST = Task("ingest", _ingest, outputs=_raw)
+TRANSFORM = Task("transform", _transform, ["ingest"], _raw, _silver)
+LOAD = Task("load", load.run, ["transform"], _silver, _gold)
+# publica o snapshot Arrow da gold antes dos consumidores (dashboard, view/compare, enrich)
+SNAPSHOT = Task("snapshot", lambda day, _: RateCube.open("gold"), ["load"], _gold, _snapshot)
+ANALYTICS = Task("analytics", lambda day, _: analytics.update(), ["load"], _gold, _analytics)
+ROLLUP = Task("rollup", lambda day, _: rollup.update(), ["load"], _gold, _rollups)
+ENRICH = Task("enrich", _enrich, ["load"], _gold, _summary)
+
+# partições independentes por data (podem rodar em processos separados)
+PARTITION_TASKS = [INGEST, TRANSFORM, LOAD]
+# estado global/incremental: roda uma vez, na ordem das datas
+GLOBAL_TASKS = [SNAPSHOT, ANALYTICS, ROLLUP]
+# por data, depois do estado global
+POST_TASKS = [ENRICH]
+
+
+def toposort(tasks: list[Task]) -> list[Task]:
+    by_name = {t.name: t for t in tasks}
+    order, seen, active = [], set(), set()
+
+    def visit(t):
+        if t.name in seen:
+            return
+        if t.name in active:
+            raise ValueError(f"Ciclo no DAG envolvendo '{t.name}'.")
+        active.add(t.name)
+        for d in t.deps:
+            if d in by_name:
+                visit(by_name[d])
+        active.discard(t.name)
+        seen.add(t.name)
+        order.append(t)
+
+    for t in tasks:
+        visit(t)
+    return order
+
+
+def _is_fresh(task: Task, day: str) -> bool:
+    outs = task.outputs(day)
+    if not outs or not all(p.exists() for p in outs):
+        return False
+    ins = [p for p in task.inputs(day) if p.exists()]
+    newest_in = max((p.stat().st_mtime for p in ins), default=0.0)
+    return min(p.stat().st_mtime for p in outs) >= newest_in
+
+
+def _plan(tasks: list[Task], day: str, force: bool) -> set[str]:
+    """
+    Decide quais tarefas precisam rodar (semântica tipo make):
+    - uma tarefa está atualizada se suas saídas são mais novas que as entradas e as
+      dependências estão atualizadas ou foram podadas (saídas ausentes, ex.: raw antigo apagado);
+    - roda quem não está atualizado e é terminal no DAG ou alimenta uma tarefa que vai rodar.
+    """
+    by_name = {t.name: t for t in tasks}
+    fresh = {}
+    for t in tasks:
+        own = _is_fresh(t, day)
+        upstream = all(
+            fresh[d] or not all(p.exists() for p in by_name[d].outputs(day))
+            for d in t.deps if d in by_name
+        )
+        fresh[t.name] = own and upstream
+    dependents = {t.name: [c.name for c in tasks if t.name in c.deps] for t in tasks}
+    needed = set()
+    for t in reversed(tasks):
+        if force:
+            needed.add(t.name)
+        elif not fresh[t.name] and (not dependents[t.name] or any(c in needed for c in dependents[t.name])):
+            needed.add(t.name)
+    return needed
+
+
+def run_dag(tasks: list[Task], day: str, force: bool = False, results: dict | None = None) -> tuple[dict, list[dict]]:
+    """
+    Executa as tarefas na ordem topológica para um dia, passando resultados em memória.
+    Tarefas atualizadas (ou não necessárias) são puladas; falhas bloqueiam as dependentes.
+    """
+    results = dict(results or {})
+    tasks = toposort(tasks)
+    needed = _plan(tasks, day, force)
+    status = {}
+    timings = []
+    for task in tasks:
+        t0 = time.perf_counter()
+        if any(status.get(d) in ("error", "blocked") for d in task.deps):
+            state = "blocked"
+        elif task.name not in needed:
+            state = "skipped"
+        else:
+            try:
+                results[task.name] = task.fn(day, *[results.get(d) for d in task.deps])
+                state = "ok"
+            except Exception as e:
+                logging.error(f"[dag] {task.name} {day}: {e}")
+                state = "error"
+        status[task.name] = state
+        secs = time.perf_counter() - t0
+        timings.append({"task": task.name, "day": day, "status": state, "seconds": secs})
+        logging.info(f"[dag] {task.name:<9} {day} {state:<7} {secs * 1000:9.1f} ms")
+    return results, timings
+
+
+def _run_partition(args):
+    setup_logging()
+    day, force = args
+    results, timings = run_dag(PARTITION_TASKS, day, force)
+    return day, results.get("transform"), results.get("load"), timings
+
+
+def _quality_in_order(days: list[str], silvers: dict, golds: dict):
+    """
+    Qualidade das silvers geradas nesta execução, em ordem de data, com o estado em memória
+    semeado da gold anterior ao primeiro dia novo (como no backfill). Dias pulados no meio só
+    avançam o estado; um dia com quarentena tem a silver e a gold regravadas sem as linhas.
+    """
+    todo = sorted(d for d in days if silvers.get(d) is not None)
+    if not todo:
+        return
+    state = quality.seed(RateCube.open("gold"), todo[0])
+    for day in sorted(d for d in days if d >= todo[0]):
+        df = silvers.get(day)
+        if df is None:
+            path = _silver(day)[0]
+            if path.exists():
+                quality.observe(state, day, pd.read_parquet(path))
+            continue
+        checked = quality.check(day, df, state)
+        if len(checked) < len(df):
+            checked.to_parquet(_silver(day)[0], index=False)
+            golds[day] = load.run(day, checked)
+    quality.commit(state)
+
+
+@traced("pipeline")
+def run_pipeline(days: list[str], workers: int = 1, force: bool = False, with_enrich: bool = True) -> list[dict]:
+    """
+    Pipeline completo: partições (ingest→transform→load) por data, em processos quando workers > 1;
+    depois a qualidade em ordem de data, snapshot/analytics/rollups (globais) e enrich por data.
+    Devolve o tempo de cada tarefa.
+    """
+    timings = []
+    golds = {}
+    jobs = [(d, force) for d in days]
+    if workers > 1 and len(days) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_run_partition, jobs))
+    else:
+        parts = [_run_partition(j) for j in jobs]
+    silvers = {}
+    for day, silver, gold, t in parts:
+        silvers[day], golds[day] = silver, gold
+        timings += t
+    _quality_in_order(days, silvers, golds)
+
+    # os globais leem a gold inteira: ficam velhos se qualquer dia da execução foi regravado
+    every_gold = lambda _: [p for d in days for p in _gold(d)]
+    global_tasks = [Task(t.name, t.fn, t.deps, every_gold, t.outputs) for t in GLOBAL_TASKS]
+    last = days[-1]
+    _, t = run_dag(global_tasks, last, force, {"load": golds.get(last)})
+    timings += t
+
+    if with_enrich:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, enrich.DEFAULT_CONCURRENCY))) as pool:
+            for _, t in pool.map(lambda d: run_dag(POST_TASKS, d, force, {"load": golds.get(d)}), days):
+                timings += t
+
+    report(timings)
+    return timings
+
+
+def report(timings: list[dict]):
+    agg = {}
+    for t in timings:
+        a = agg.setdefault(t["task"], {"ok": 0, "skipped": 0, "error": 0, "blocked": 0, "seconds": 0.0})
+        a[t["status"]] += 1
+        a["seconds"] += t["seconds"]
+    logging.info("[dag] resumo por tarefa:")
+    for name, a in agg.items():
+        logging.info(f"[dag]   {name:<9} {a['seconds']:8.3f}s  ok={a['ok']} skip={a['skipped']} erro={a['error']} bloq={a['blocked']}")
+
+
+def days_between(start: str, end: str) -> list[str]:
+    d0 = datetime.strptime(start, "%Y-%m-%d")
+    d1 = datetime.strptime(end, "%Y-%m-%d")
+    return [(d0 + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((d1 - d0).days + 1)]
@@ -0,0 +1,168 @@
+"""
+Prompts do enrich: features compactas por dia (variação no dia, em 7 e 30 dias, maiores
+altas/quedas e cesta da América Latina) calculadas de uma vez sobre o RateCube e encaixadas
+num orçamento de tokens estimado localmente (tiktoken, se instalado; senão ~4 caracteres
+por token). Vários dias podem ir no mesmo pedido, com resposta JSON indexada pela data.
+"""
+import math
+from dataclasses import dataclass, field
+from datetime import datetime
+import numpy as np
+from src.cube import RateCube
+
+try:
+    import tiktoken
+except ImportError:  # sem tiktoken: estimativa por caracteres
+    tiktoken = None
+
+KEY_CURRENCIES = ("USD", "EUR", "GBP", "JPY", "ARS")
+LATAM_CURRENCIES = ("ARS", "CLP", "COP", "MXN", "PEN", "UYU", "PYG", "BOB")
+# dias corridos; a referência é o último dia da gold <= data - h
+HORIZONS = {"d": 1, "s": 7, "m": 30}
+TOP_MOVERS = 3
+PROMPT_BUDGET = 700
+CHARS_PER_TOKEN = 4.0
+
+SYSTEM = "Você é um analista financeiro útil e conciso."
+RULES = ("Regras: frases curtas; destaque USD e EUR e as variações relevantes; cite moedas "
+         "sul-americanas se relevante; sem itálico/negrito; sem caracteres invisíveis; sem emojis; "
+         "sem quebras de palavra. Não inclua explicações fora do JSON.")
+LEGEND = "Valores em BRL por 1 unidade; variações em %: d = dia, s = 7 dias, m = 30 dias."
+
+_encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class DayFeatures:
+    date: str
+    rates: dict[str, float]
+    changes: dict[str, dict[str, float]]
+    up: list[tuple[str, float]] = field(default_factory=list)
+    down: list[tuple[str, float]] = field(default_factory=list)
+    latam: dict[str, float] = field(default_factory=dict)
+
+
+def features(days: list[str], cube: RateCube | None = None) -> list[DayFeatures]:
+    """Features dos dias pedidos que existem na gold (matrizes dias × moedas, sem laço por moeda)."""
+    cube = cube or RateCube.open("gold")
+    days = [d for d in days if d in cube.date_index]
+    if not days:
+        return []
+    idx = np.array([cube.date_index[d] for d in days], dtype=np.intp)
+    all_days = np.array(cube.dates, dtype="datetime64[D]")
+    values = np.asarray(cube.values)
+    now = values[idx]
+    ccys = np.array(cube.currencies)
+    quoted = ccys != "BRL"
+    latam = np.isin(ccys, LATAM_CURRENCIES)
+    pct, basket = {}, {}
+    for h, n in HORIZONS.items():
+        ref = np.searchsorted(all_days, all_days[idx] - np.timedelta64(n, "D"), side="right") - 1
+        then = np.where((ref >= 0)[:, None], values[np.maximum(ref, 0)], np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct[h] = (now / then - 1.0) * 100.0
+            logret = np.log(now[:, latam] / then[:, latam])
+        ok = np.isfinite(logret)
+        with np.errstate(invalid="ignore"):
+            basket[h] = (np.expm1(np.where(ok, logret, 0.0).sum(axis=1) / ok.sum(axis=1))) * 100.0
+    day_move = np.where(quoted, pct["d"], np.nan)
+    order = np.argsort(np.where(np.isnan(day_move), np.inf, day_move), axis=1)
+    valid = (~np.isnan(day_move)).sum(axis=1)
+
+    key_cols = [(c, cube.ccy_index[c]) for c in KEY_CURRENCIES if c in cube.ccy_index]
+    out = []
+    for i, day in enumerate(days):
+        keys = [(c, j) for c, j in key_cols if now[i, j] == now[i, j]]
+        ranked = order[i, :valid[i]]
+        out.append(DayFeatures(
+            date=day,
+            rates={c: float(now[i, j]) for c, j in keys},
+            changes={c: {h: float(pct[h][i, j]) for h in HORIZONS} for c, j in keys},
+            up=[(str(ccys[j]), float(day_move[i, j])) for j in ranked[::-1][:TOP_MOVERS] if day_move[i, j] > 0],
+            down=[(str(ccys[j]), float(day_move[i, j])) for j in ranked[:TOP_MOVERS] if day_move[i, j] < 0],
+            latam={h: float(basket[h][i]) for h in HORIZONS if basket[h][i] == basket[h][i]},
+        ))
+    return out
+
+
+def from_frame(date: str, df) -> DayFeatures:
+    """Só as taxas do dia (gold em DataFrame), quando o dia ainda não está no cubo."""
+    picked = df[df["currency"].isin(KEY_CURRENCIES)]
+    if picked.empty:
+        picked = df.nlargest(len(KEY_CURRENCIES), "rate_brl_base")
+    rates = dict(zip(picked["currency"], picked["rate_brl_base"].astype(float)))
+    return DayFeatures(date, rates, {c: {h: float("nan") for h in HORIZONS} for c in rates})
+
+
+def _num(x: float, places: int) -> str:
+    return f"{x:,.{places}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _chg(x: float) -> str:
+    return "n/d" if x != x else f"{x:+.2f}".replace(".", ",")
+
+
+def render(f: DayFeatures, movers: int = TOP_MOVERS, latam: bool = True) -> str:
+    """Bloco de texto de um dia; `movers`/`latam` controlam as seções opcionais."""
+    lines = [f"{datetime.strptime(f.date, '%Y-%m-%d').strftime('%d/%m/%Y')}:"]
+    for c, v in f.rates.items():
+        ch = f.changes[c]
+        lines.append(f"{c} {_num(v, 4)} | " + " | ".join(f"{h} {_chg(ch[h])}" for h in HORIZONS))
+    if movers and (f.up or f.down):
+        up = ", ".join(f"{c} {_chg(x)}" for c, x in f.up[:movers]) or "-"
+        down = ", ".join(f"{c} {_chg(x)}" for c, x in f.down[:movers]) or "-"
+        lines.append(f"Altas no dia: {up}; quedas: {down}")
+    if latam and f.latam:
+        lines.append("Cesta América Latina: " + " | ".join(f"{h} {_chg(x)}" for h, x in f.latam.items()))
+    return "\n".join(lines)
+
+
+def _frame(dates: list[str]) -> tuple[str, str]:
+    """(abertura, formato da resposta) para um dia ou um lote de dias."""
+    br = [datetime.strptime(d, "%Y-%m-%d").strftime("%d/%m/%Y") for d in dates]
+    head = "Você é um analista financeiro sênior no Brasil. Gere um resumo executivo do câmbio"
+    if len(dates) == 1:
+        return (f"{head} do dia a partir dos dados abaixo.",
+                "Responda SOMENTE em JSON válido, sem Markdown, no formato:\n"
+                f'{{"title": "Resumo Cambial - {br[0]}", "paragraphs": ["até 3 parágrafos curtos, objetivos, em PT-BR"]}}')
+    shape = ", ".join(f'"{d}": {{"title": "Resumo Cambial - {b}", "paragraphs": [...]}}' for d, b in zip(dates, br))
+    return (f"{head} para cada um dos {len(dates)} dias abaixo, com até 3 parágrafos curtos em PT-BR por dia.",
+            f"Responda SOMENTE em JSON válido, sem Markdown, com uma chave por data:\n{{{shape}}}")
+
+
+# seções opcionais removidas em ordem até caber no orçamento
+_LEVELS = [(TOP_MOVERS, True), (1, True), (0, True), (0, False)]
+
+
+def build_messages(feats: list[DayFeatures], budget: int = PROMPT_BUDGET) -> tuple[list[dict], int]:
+    """Mensagens do pedido (um ou vários dias) e tokens de entrada estimados."""
+    intro, shape = _frame([f.date for f in feats])
+    for movers, latam in _LEVELS:
+        data = "\n\n".join(render(f, movers, latam) for f in feats)
+        prompt = f"{intro}\n{LEGEND}\n\n{data}\n\n{shape}\n{RULES}"
+        est = estimate_tokens(SYSTEM) + estimate_tokens(prompt)
+        if est <= budget:
+            break
+    return [{"role": "system", "content": SYSTEM}, {"role": "user", "content": prompt}], est
+
+
+def batches(feats: list[DayFeatures], budget: int = PROMPT_BUDGET, max_days: int = 1) -> list[list[DayFeatures]]:
+    """Agrupa dias consecutivos em pedidos com até `max_days` dias cujo prompt cabe no orçamento."""
+    out, cur = [], []
+    for f in feats:
+        if cur and (len(cur) >= max_days or build_messages(cur + [f], budget)[1] > budget):
+            out.append(cur)
+            cur = []
+        cur.append(f)
+    if cur:
+        out.append(cur)
+    return out
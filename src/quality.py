@@ -0,0 +1,301 @@
+"""
+Qualidade dos dados: cada (dia, moeda) recebe um z-score robusto do log-retorno da taxa
+USD->moeda contra a mediana/MAD dos últimos WINDOW retornos. Outliers são sinalizados
+(flag) ou postos em quarentena (fora da silver/gold, gravados em data/quarantine), a
+mudança no conjunto de moedas é registrada e cada dia ganha um relatório JSON.
+Inline no pipeline o custo é O(moedas) por dia (janela fixa); `rebuild` recalcula todo
+o histórico de forma vetorizada sobre a matriz do cubo.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from src.runtime import file_lock
+from src.telemetry import traced
+
+
+QUALITY_DIR = Path("data/gold/quality")
+QUARANTINE_DIR = Path("data/quarantine")
+WINDOW = 60
+MIN_HISTORY = 10
+MAD_SCALE = 1.4826
+# piso do MAD em log-retorno: moedas com paridade fixa teriam MAD ~0 e qualquer ruído viraria outlier
+MAD_FLOOR = 1e-4
+Z_FLAG = 6.0
+Z_QUARANTINE = 12.0
+MIN_QUARANTINE_MOVE = 0.10
+# saltos acima de 5× (log ~1.6) vão para quarentena mesmo sem histórico suficiente
+MAX_JUMP = float(np.log(5.0))
+DRIFT_WARN = 0.05
+REQUIRED = ("BRL",)
+REBUILD_CHUNK = 256
+
+
+def _mode() -> str:
+    """QUALITY_MODE=flag só sinaliza; o padrão (quarantine) tira os outliers da silver/gold."""
+    return os.getenv("QUALITY_MODE", "quarantine").lower()
+
+
+def classify(r: np.ndarray, z: np.ndarray) -> np.ndarray:
+    """Status por moeda a partir do log-retorno e do z robusto."""
+    az, ar = np.abs(z), np.abs(r)
+    quarantine = (ar >= MAX_JUMP) | ((az >= Z_QUARANTINE) & (ar >= MIN_QUARANTINE_MOVE))
+    flag = az >= Z_FLAG
+    return np.where(quarantine, "quarantine", np.where(flag, "flag", "ok"))
+
+
+def _median_sorted(s: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Mediana de janelas já ordenadas (NaN ao fim, `n` valores válidos por janela)."""
+    lo = np.take_along_axis(s, np.maximum((n - 1) // 2, 0)[..., None], axis=-1)[..., 0]
+    hi = np.take_along_axis(s, np.maximum(n // 2, 0)[..., None], axis=-1)[..., 0]
+    return np.where(n > 0, (lo + hi) / 2.0, np.nan)
+
+
+def robust_z(r: np.ndarray, window: np.ndarray) -> np.ndarray:
+    """z de `r` contra a janela (..., W) de retornos anteriores; NaN sem histórico mínimo."""
+    # np.sort manda NaN para o fim: a mediana sai por índice, bem mais rápido que nanmedian
+    n = np.sum(np.isfinite(window), axis=-1)
+    s = np.sort(window, axis=-1)
+    med = _median_sorted(s, n)
+    dev = np.sort(np.abs(s - med[..., None]), axis=-1)
+    mad = _median_sorted(dev, n)
+    scale = MAD_SCALE * np.fmax(mad, MAD_FLOOR)
+    z = (r - med) / scale
+    return np.where(n >= MIN_HISTORY, z, np.nan)
+
+
+class QualityState:
+    """Último log-nível aceito e anel com os últimos WINDOW log-retornos, por moeda."""
+
+    def __init__(self):
+        self.currencies: list[str] = []
+        self._col: dict[str, int] = {}
+        self.last_date: str | None = None
+        self.last_set: list[str] = []
+        self.pos = 0
+        self.level = np.empty(0)
+        self.ring = np.empty((WINDOW, 0))
+
+    def _extend(self, currencies):
+        new = [c for c in currencies if c not in self._col]
+        for c in new:
+            self._col[c] = len(self.currencies)
+            self.currencies.append(c)
+        if new:
+            self.level = np.concatenate([self.level, np.full(len(new), np.nan)])
+            self.ring = np.concatenate([self.ring, np.full((WINDOW, len(new)), np.nan)], axis=1)
+
+    def score(self, currencies: list[str], rates: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(log_return, z, status) de um dia, sem alterar o estado."""
+        self._extend(currencies)
+        idx = np.array([self._col[c] for c in currencies], dtype=np.intp)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.log(rates) - self.level[idx]
+        z = robust_z(r, self.ring[:, idx].T)
+        status = classify(np.where(np.isfinite(r), r, 0.0), np.where(np.isfinite(z), z, 0.0))
+        return r, z, status
+
+    def accept(self, date: str, currencies: list[str], rates: np.ndarray, ok: np.ndarray):
+        """Incorpora ao estado só as taxas aceitas (quarentenadas não contaminam a linha de base)."""
+        idx = np.array([self._col[c] for c in currencies], dtype=np.intp)
+        x = np.full(len(self.currencies), np.nan)
+        x[idx[ok]] = np.log(rates[ok])
+        r = x - self.level
+        self.ring[self.pos % WINDOW] = np.where(np.isfinite(r), r, np.nan)
+        self.pos += 1
+        self.level = np.where(np.isfinite(x), x, self.level)
+        self.last_date = date
+        self.last_set = sorted(currencies)
+
+    def save(self, path: Path = QUALITY_DIR):
+        path.mkdir(parents=True, exist_ok=True)
+        np.savez(path / "state.tmp.npz", level=self.level, ring=self.ring)
+        os.replace(path / "state.tmp.npz", path / "state.npz")
+        meta = {"currencies": self.currencies, "last_date": self.last_date, "last_set": self.last_set, "pos": self.pos}
+        (path / "state.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path = QUALITY_DIR) -> "QualityState":
+        st = cls()
+        if not (path / "state.json").exists():
+            return st
+        meta = json.loads((path / "state.json").read_text(encoding="utf-8"))
+        st.currencies = meta["currencies"]
+        st._col = {c: j for j, c in enumerate(st.currencies)}
+        st.last_date, st.last_set, st.pos = meta["last_date"], meta["last_set"], meta["pos"]
+        with np.load(path / "state.npz") as z:
+            st.level, st.ring = z["level"], z["ring"]
+        return st
+
+
+def _drift(previous: list[str], current: list[str]) -> dict:
+    prev, cur = set(previous), set(current)
+    missing, new = sorted(prev - cur), sorted(cur - prev)
+    ratio = (len(missing) + len(new)) / max(1, len(prev))
+    return {"missing": missing, "new": new, "ratio": round(ratio, 4)}
+
+
+def build_report(day: str, currencies, rates, r, z, status, previous: list[str]) -> dict:
+    currencies = np.asarray(currencies)
+    bad = status != "ok"
+    drift = _drift(previous, currencies.tolist()) if previous else {"missing": [], "new": [], "ratio": 0.0}
+    absent = [c for c in REQUIRED if c not in set(currencies.tolist())]
+    quarantined = currencies[status == "quarantine"].tolist()
+    errors = [f"{c} ausente" for c in absent] + [f"{c} em quarentena" for c in REQUIRED if c in quarantined]
+    level = "error" if errors else ("warn" if bad.any() or drift["ratio"] >= DRIFT_WARN else "ok")
+    order = np.argsort(-np.abs(np.nan_to_num(z[bad], nan=np.inf)), kind="stable")
+    outliers = [
+        {"currency": str(c), "rate": float(v), "log_return": None if not np.isfinite(lr) else round(float(lr), 6),
+         "z": None if not np.isfinite(zz) else round(float(zz), 2), "status": str(s)}
+        for c, v, lr, zz, s in zip(currencies[bad][order], rates[bad][order], r[bad][order], z[bad][order], status[bad][order])
+    ]
+    return {
+        "date": day, "status": level, "errors": errors, "currencies": int(len(currencies)),
+        "flagged": int((status == "flag").sum()), "quarantined": len(quarantined),
+        "drift": drift, "outliers": outliers,
+    }
+
+
+def write_report(report: dict):
+    QUALITY_DIR.mkdir(parents=True, exist_ok=True)
+    (QUALITY_DIR / f"quality_{report['date']}.json").write_text(
+        json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+@traced("quality")
+def check(day: str, df_silver: pd.DataFrame, state: QualityState | None = None) -> pd.DataFrame:
+    """
+    Etapa inline do transform: pontua o dia contra o estado, grava o relatório e devolve a
+    silver sem as linhas em quarentena. Dias anteriores ao estado (reprocessamento fora de
+    ordem) só são pontuados; o estado avança apenas com dias novos. Com `state` (backfill,
+    dias em ordem de data) o estado fica em memória, sem lock nem arquivo; veja `seed`/`commit`.
+    """
+    if state is not None:
+        currencies, rates, r, z, status, report = _score_day(state, day, df_silver)
+        quarantined = status == "quarantine"
+        if state.last_date is None or day > state.last_date:
+            state.accept(day, currencies, rates, ~quarantined)
+    else:
+        # transform avulso e outras execuções podem concorrer: carregar→avançar→salvar o estado é exclusivo
+        with file_lock(QUALITY_DIR / "state.lock"):
+            state = QualityState.load()
+            currencies, rates, r, z, status, report = _score_day(state, day, df_silver)
+            quarantined = status == "quarantine"
+            if state.last_date is None or day > state.last_date:
+                state.accept(day, currencies, rates, ~quarantined)
+                state.save()
+
+    if quarantined.any():
+        logging.warning(f"Qualidade {day}: {quarantined.sum()} taxa(s) fora do padrão: "
+                        + ", ".join(o["currency"] for o in report["outliers"] if o["status"] == "quarantine"))
+    if report["errors"]:
+        logging.error(f"Qualidade {day}: {'; '.join(report['errors'])}")
+    if report["drift"]["ratio"] >= DRIFT_WARN:
+        logging.warning(f"Qualidade {day}: conjunto de moedas mudou (saíram {report['drift']['missing']}, "
+                        f"entraram {report['drift']['new']}).")
+
+    keep = ~quarantined if _mode() == "quarantine" else np.ones(len(status), dtype=bool)
+    if not keep.all():
+        QUARANTINE_DIR.mkdir(parents=True, exist_ok=True)
+        df_silver[~keep].assign(z=z[~keep]).to_parquet(QUARANTINE_DIR / f"{day}.parquet", index=False)
+        df_silver = df_silver[keep].reset_index(drop=True)
+    return df_silver
+
+
+def observe(state: QualityState, day: str, df_silver: pd.DataFrame):
+    """Avança o estado em memória com uma silver já verificada (sem pontuar nem gravar relatório)."""
+    currencies = df_silver["target_currency"].to_numpy(dtype=str).tolist()
+    rates = df_silver["rate"].to_numpy(dtype="float64")
+    state._extend(currencies)
+    if state.last_date is None or day > state.last_date:
+        state.accept(day, currencies, rates, np.ones(len(rates), dtype=bool))
+
+
+def seed(cube, before: str) -> QualityState:
+    """
+    Estado em memória com os WINDOW+1 dias da gold anteriores a `before` (taxas USD->moeda),
+    para pontuar dias de um backfill contra o seu passado e não contra o estado mais recente.
+    """
+    state = QualityState()
+    if cube.empty or "USD" not in cube.ccy_index:
+        return state
+    hi = int(np.searchsorted(np.array(cube.dates), before, side="left"))
+    lo = max(0, hi - WINDOW - 1)
+    gold = np.asarray(cube.values[lo:hi])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = gold[:, [cube.ccy_index["USD"]]] / gold
+    ccys = np.array(cube.currencies)
+    state._extend(cube.currencies)
+    for i in range(hi - lo):
+        seen = np.isfinite(rates[i]) & (rates[i] > 0)
+        state.accept(cube.dates[lo + i], ccys[seen].tolist(), rates[i][seen], np.ones(int(seen.sum()), dtype=bool))
+    return state
+
+
+def commit(state: QualityState) -> bool:
+    """Grava o estado em memória se ele avançou além do estado salvo (backfill que chega ao presente)."""
+    if state.last_date is None:
+        return False
+    with file_lock(QUALITY_DIR / "state.lock"):
+        saved = QualityState.load()
+        if saved.last_date is not None and saved.last_date >= state.last_date:
+            return False
+        state.save()
+        return True
+
+
+def _score_day(state: QualityState, day: str, df_silver: pd.DataFrame):
+    currencies = df_silver["target_currency"].to_numpy(dtype=str).tolist()
+    rates = df_silver["rate"].to_numpy(dtype="float64")
+    r, z, status = state.score(currencies, rates)
+    report = build_report(day, currencies, rates, r, z, status, state.last_set)
+    write_report(report)
+    return currencies, rates, r, z, status, report
+
+
+def rebuild() -> int:
+    """
+    Recalcula relatórios e estado para todo o histórico da gold de uma vez: a matriz
+    (dias × moedas) vira taxas USD->moeda, os retornos ganham janelas deslizantes e
+    mediana/MAD saem vetorizadas por blocos de dias. Não altera a gold.
+    """
+    from src.cube import RateCube
+    cube = RateCube.open("gold")
+    if cube.empty or "USD" not in cube.ccy_index:
+        logging.info("Gold vazia ou sem USD; nada a avaliar.")
+        return 0
+    gold = np.asarray(cube.values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        levels = np.log(gold[:, [cube.ccy_index["USD"]]] / gold)
+    returns = np.diff(levels, axis=0, prepend=np.nan)
+    padded = np.vstack([np.full((WINDOW, returns.shape[1]), np.nan), returns])
+    windows = sliding_window_view(padded[:-1], WINDOW, axis=0)  # (dias, moedas, WINDOW), só dias anteriores
+    ccys = np.array(cube.currencies)
+    state = QualityState()
+    previous: list[str] = []
+    for lo in range(0, len(cube.dates), REBUILD_CHUNK):
+        hi = min(lo + REBUILD_CHUNK, len(cube.dates))
+        z = robust_z(returns[lo:hi], windows[lo:hi])
+        for i in range(lo, hi):
+            seen = np.isfinite(levels[i])
+            r_i, z_i = returns[i][seen], z[i - lo][seen]
+            status = classify(np.nan_to_num(r_i), np.nan_to_num(z_i))
+            current = ccys[seen].tolist()
+            write_report(build_report(cube.dates[i], current, np.exp(levels[i][seen]), r_i, z_i, status, previous))
+            previous = current
+    state._extend(cube.currencies)
+    state.level = np.array([col[np.isfinite(col)][-1] if np.isfinite(col).any() else np.nan for col in levels.T])
+    state.ring = padded[-WINDOW:].copy()
+    state.pos = 0
+    state.last_date, state.last_set = cube.dates[-1], previous
+    state.save()
+    logging.info(f"Qualidade recalculada para {len(cube.dates)} dia(s).")
+    return len(cube.dates)
+
+
+def load_report(day: str) -> dict | None:
+    p = QUALITY_DIR / f"quality_{day}.json"
+    return json.loads(p.read_text(encoding="utf-8")) if p.exists() else None
@@ -0,0 +1,177 @@
+"""
+Pirâmide de agregados da gold: semana (segunda a domingo), mês e ano com open/high/low/
+close/média por moeda, calculados sobre a matriz do RateCube com reduceat (sem ler os
+arquivos diários). A atualização é incremental: só os períodos a partir do primeiro dia
+novo, regravado ou removido são recalculados. Consultas de janelas longas escolhem a
+resolução mais fina que cabe em `max_points` pontos (10 anos → ~520 semanas).
+"""
+import json
+import logging
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src import store
+from src.cube import RateCube
+from src.runtime import file_lock
+from src.telemetry import traced
+
+
+ROLLUP_DIR = Path("data/gold/rollups")
+# da mais fina para a mais grossa; "day" é servida direto do cubo
+RESOLUTIONS = ("day", "week", "month", "year")
+STORED = RESOLUTIONS[1:]
+MAX_POINTS = 600
+# arquivos ordenados por moeda: as estatísticas dos row groups descartam as outras moedas na leitura
+ROW_GROUP_ROWS = 16_384
+COLUMNS = ["period", "currency", "open", "high", "low", "close", "mean", "n_obs"]
+
+
+def rollup_path(resolution: str) -> Path:
+    return ROLLUP_DIR / f"rollup_{resolution}.parquet"
+
+
+def period_start(days, resolution: str) -> np.ndarray:
+    """Primeiro dia do período (datetime64[D]) de cada data."""
+    d = np.asarray(days, dtype="datetime64[D]")
+    if resolution == "day":
+        return d
+    if resolution == "week":
+        # 1970-01-01 foi quinta-feira: +3 alinha o resto da divisão em segunda = 0
+        return d - ((d.astype(np.int64) + 3) % 7).astype("timedelta64[D]")
+    if resolution == "month":
+        return d.astype("datetime64[M]").astype("datetime64[D]")
+    if resolution == "year":
+        return d.astype("datetime64[Y]").astype("datetime64[D]")
+    raise ValueError(f"Resolução inválida: {resolution} (use {', '.join(RESOLUTIONS)})")
+
+
+def aggregate(dates: list[str], currencies: list[str], block: np.ndarray, resolution: str) -> pd.DataFrame:
+    """OHLC + média por (período, moeda) de uma matriz dias × moedas ordenada por data."""
+    if not len(dates):
+        return pd.DataFrame(columns=COLUMNS)
+    starts = period_start(dates, resolution)
+    bounds = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    block = np.asarray(block, dtype="float64")
+    valid = ~np.isnan(block)
+    t = np.arange(len(dates))[:, None]
+    cols = np.arange(block.shape[1])
+    first = np.minimum.reduceat(np.where(valid, t, len(dates)), bounds, axis=0)
+    last = np.maximum.reduceat(np.where(valid, t, -1), bounds, axis=0)
+    n_obs = np.add.reduceat(valid.astype(np.int32), bounds, axis=0)
+    seen = n_obs > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stats = {
+            "open": block[np.minimum(first, len(dates) - 1), cols],
+            "high": np.fmax.reduceat(block, bounds, axis=0),
+            "low": np.fmin.reduceat(block, bounds, axis=0),
+            "close": block[np.maximum(last, 0), cols],
+            "mean": np.add.reduceat(np.where(valid, block, 0.0), bounds, axis=0) / n_obs,
+        }
+    p_idx, c_idx = np.nonzero(seen)
+    out = {"period": starts[bounds].astype(str)[p_idx], "currency": np.array(currencies)[c_idx]}
+    out.update({k: v[p_idx, c_idx] for k, v in stats.items()})
+    out["n_obs"] = n_obs[p_idx, c_idx].astype(np.int32)
+    return pd.DataFrame(out, columns=COLUMNS)
+
+
+def _load_state() -> dict:
+    p = ROLLUP_DIR / "state.json"
+    return json.loads(p.read_text(encoding="utf-8")) if p.exists() else {}
+
+
+def _save_state(state: dict):
+    tmp = ROLLUP_DIR / "state.tmp.json"
+    tmp.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp, ROLLUP_DIR / "state.json")
+
+
+def _dirty_from(state: dict, dates: list[str], mtimes: dict[str, int]) -> str | None:
+    """Primeiro dia cujo agregado pode ter mudado (novo, removido ou regravado desde o último update)."""
+    if not state or any(not rollup_path(r).exists() for r in STORED):
+        return dates[0] if dates else None
+    changed = set(dates).symmetric_difference(state.get("dates", []))
+    stamp = state.get("stamp", 0)
+    changed.update(d for d, m in mtimes.items() if m > stamp)
+    return min(changed) if changed else None
+
+
+def _write(resolution: str, df: pd.DataFrame):
+    tmp = ROLLUP_DIR / f"rollup_{resolution}.tmp.parquet"
+    df.sort_values(["currency", "period"], ignore_index=True).to_parquet(tmp, index=False, row_group_size=ROW_GROUP_ROWS)
+    os.replace(tmp, rollup_path(resolution))
+
+
+@traced("rollup")
+def update(rebuild: bool = False, version: str | None = None) -> str | None:
+    """
+    Atualiza data/gold/rollups/rollup_{week,month,year}.parquet a partir do RateCube.
+    `version` (store.version da gold) evita recalcular a assinatura quando o chamador já a tem.
+    Retorna o primeiro dia recalculado (None se já estava em dia).
+    """
+    ROLLUP_DIR.mkdir(parents=True, exist_ok=True)
+    with file_lock(ROLLUP_DIR / "state.lock"):
+        version = version or store.version("gold")
+        state = {} if rebuild else _load_state()
+        if state.get("version") == version and all(rollup_path(r).exists() for r in STORED):
+            return None
+        # mtimes antes do cubo: um dia regravado durante o update fica para o próximo
+        mtimes = {d: p.stat().st_mtime_ns for d, p in store._daily_files("gold").items()}
+        cube = RateCube.open("gold")
+        dirty = _dirty_from(state, cube.dates, mtimes)
+        for res in STORED if dirty else ():
+            start = str(period_start([dirty], res)[0])
+            dates, ccys, block = cube.slice(None, start, None)
+            fresh = aggregate(dates, ccys, block, res)
+            p = rollup_path(res)
+            if state and p.exists():
+                old = pd.read_parquet(p, filters=[("period", "<", start)])
+                fresh = pd.concat([old, fresh], ignore_index=True) if len(old) else fresh
+            _write(res, fresh)
+        _save_state({"version": version, "dates": cube.dates,
+                     "stamp": max(mtimes.values(), default=state.get("stamp", 0))})
+    if dirty:
+        logging.info(f"Rollups semana/mês/ano recalculados a partir de {dirty}.")
+    return dirty
+
+
+def pick_resolution(start: str, end: str, max_points: int = MAX_POINTS) -> str:
+    """Resolução mais fina com no máximo `max_points` períodos entre start e end."""
+    for res in RESOLUTIONS:
+        a, b = period_start([start, end], res)
+        n = {"day": (b - a).astype(int) + 1,
+             "week": (b - a).astype(int) // 7 + 1,
+             "month": (b.astype("datetime64[M]") - a.astype("datetime64[M]")).astype(int) + 1,
+             "year": (b.astype("datetime64[Y]") - a.astype("datetime64[Y]")).astype(int) + 1}[res]
+        if n <= max_points:
+            return res
+    return RESOLUTIONS[-1]
+
+
+def history(currencies: list[str] | None = None, start: str | None = None, end: str | None = None,
+            max_points: int = MAX_POINTS, resolution: str | None = None,
+            cube: RateCube | None = None) -> tuple[str, pd.DataFrame]:
+    """
+    Série de `currencies` entre start e end na resolução escolhida (ou a pedida), em formato
+    longo com as colunas de COLUMNS; em "day", open=high=low=close=mean=valor do dia.
+    Os agregados são atualizados antes da leitura se a gold mudou (versão do `cube`, se dado).
+    """
+    cube = cube or RateCube.open("gold")
+    if cube.empty:
+        return resolution or "day", pd.DataFrame(columns=COLUMNS)
+    start, end = start or cube.dates[0], end or cube.dates[-1]
+    res = resolution or pick_resolution(start, end, max_points)
+    if res == "day":
+        df = cube.to_long(currencies, start, end)
+        out = pd.DataFrame({"period": df["date"], "currency": df["currency"]})
+        for c in ("open", "high", "low", "close", "mean"):
+            out[c] = df["value"]
+        out["n_obs"] = np.int32(1)
+        return res, out.sort_values(["currency", "period"], ignore_index=True)
+    update(version=cube.version)
+    # o primeiro período pode começar antes de `start` (ex.: semana iniciada no domingo anterior)
+    filters = [("period", ">=", str(period_start([start], res)[0])), ("period", "<=", end)]
+    if currencies is not None:
+        filters.append(("currency", "in", list(currencies)))
+    df = pd.read_parquet(rollup_path(res), filters=filters)
+    return res, df.sort_values(["currency", "period"], ignore_index=True)
@@ -0,0 +1,47 @@
+"""
+Configuração de processo feita sob demanda (e uma única vez), em vez de no import dos módulos:
+logging e carga do .env. Também o lock de arquivo entre processos usado pelos estados/índices.
+"""
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+_logging_ready = False
+_env_ready = False
+
+
+def setup_logging(level: int = logging.INFO):
+    global _logging_ready
+    if _logging_ready:
+        return
+    logging.basicConfig(
+        level=level,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    _logging_ready = True
+
+
+def load_env():
+    global _env_ready
+    if _env_ready:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    _env_ready = True
+    logging.info("Variáveis de ambiente carregadas.")
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Lock exclusivo entre processos sobre `path` (criado se preciso); no-op sem fcntl."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
@@ -0,0 +1,200 @@
+"""
+Servidor de consultas local sobre a gold: mantém o RateCube residente em memória,
+recarrega quando a camada muda e responde JSON com ETag/If-None-Match.
+O cliente (`query`) é só biblioteca padrão, para a CLI consultá-lo sem importar pandas.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from urllib.parse import parse_qs, urlencode, urlparse
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+POLL_SECONDS = 2.0
+CLIENT_TIMEOUT = 0.25
+RESPONSE_CACHE_SIZE = 1024
+
+
+def server_url() -> str | None:
+    """URL do servidor para a CLI; FX_SERVER_URL=off desliga a consulta."""
+    url = os.getenv("FX_SERVER_URL", f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    return None if url.lower() in ("", "off", "0") else url.rstrip("/")
+
+
+def query(endpoint: str, params: dict | None = None) -> dict | None:
+    """Consulta o servidor; None se ele não estiver rodando (a CLI então lê o disco)."""
+    base = server_url()
+    if not base:
+        return None
+    from urllib.error import URLError
+    from urllib.request import Request, urlopen
+    qs = urlencode({k: v for k, v in (params or {}).items() if v is not None})
+    try:
+        with urlopen(Request(f"{base}/{endpoint}?{qs}"), timeout=CLIENT_TIMEOUT) as r:
+            return json.loads(r.read().decode("utf-8"))
+    except (URLError, OSError, ValueError):
+        return None
+
+
+class GoldState:
+    """Estado residente: cubo da gold, versão atual e cache de respostas já serializadas."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cube = None
+        self.version = None
+        self.responses: dict[tuple, tuple[str, bytes]] = {}
+        self.reload()
+
+    def reload(self) -> bool:
+        from src import store
+        from src.cube import RateCube
+        current = store.version("gold")
+        if current == self.version:
+            return False
+        cube = RateCube.open("gold")
+        with self.lock:
+            self.cube, self.version, self.responses = cube, current, {}
+        logging.info(f"Gold carregada: {len(cube.dates)} dia(s), {len(cube.currencies)} moeda(s).")
+        return True
+
+    def watch(self, stop: threading.Event, poll: float = POLL_SECONDS):
+        while not stop.wait(poll):
+            try:
+                self.reload()
+            except Exception as e:
+                logging.error(f"Falha ao recarregar a gold: {e}")
+
+    def respond(self, endpoint: str, params: dict) -> tuple[int, str, bytes]:
+        key = (endpoint, tuple(sorted(params.items())))
+        with self.lock:
+            cube, version = self.cube, self.version
+            hit = self.responses.get(key)
+        if hit:
+            return 200, hit[0], hit[1]
+        status, payload = _handle(cube, endpoint, params)
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        etag = '"' + hashlib.sha1(f"{version}|{endpoint}|{key[1]}".encode("utf-8")).hexdigest()[:20] + '"'
+        if status == 200:
+            with self.lock:
+                if self.version == version:
+                    if len(self.responses) >= RESPONSE_CACHE_SIZE:
+                        self.responses.clear()
+                    self.responses[key] = (etag, body)
+        return status, etag, body
+
+
+def _currencies(params: dict) -> list[str] | None:
+    raw = params.get("currencies") or params.get("currency")
+    return [c.strip().upper() for c in raw.split(",") if c.strip()] if raw else None
+
+
+def _handle(cube, endpoint: str, params: dict) -> tuple[int, dict]:
+    import numpy as np
+    if cube is None or cube.empty:
+        return 404, {"error": "gold vazia"}
+    date = params.get("date") or cube.dates[-1]
+    if endpoint == "health":
+        return 200, {"dates": len(cube.dates), "first": cube.dates[0], "latest": cube.dates[-1],
+                     "currencies": len(cube.currencies)}
+    if endpoint == "rate":
+        if date not in cube.date_index:
+            return 404, {"error": f"sem dados para {date}"}
+        row = cube.cross_section(date)
+        wanted = _currencies(params)
+        rates = {c: float(v) for c, v in zip(cube.currencies, row)
+                 if v == v and (wanted is None or c in wanted)}
+        return 200, {"date": date, "updated": cube.updated[cube.date_index[date]], "rates": rates}
+    if endpoint == "series":
+        ccy = (params.get("currency") or "").upper()
+        if ccy not in cube.ccy_index:
+            return 404, {"error": f"moeda desconhecida: {ccy}"}
+        dates, values = cube.series(ccy, params.get("start"), params.get("end"))
+        ok = ~np.isnan(values)
+        return 200, {"currency": ccy, "dates": [d for d, k in zip(dates, ok) if k], "values": values[ok].tolist()}
+    if endpoint == "cross":
+        from src.crossrate import CrossRates
+        if date not in cube.date_index:
+            return 404, {"error": f"sem dados para {date}"}
+        row = cube.cross_section(date)
+        mask = ~np.isnan(row)
+        eng = CrossRates([c for c, k in zip(cube.currencies, mask) if k], 1.0 / row[mask])
+        base = (params.get("base") or "BRL").upper()
+        try:
+            vec = eng.base_vector(base)
+        except KeyError as e:
+            return 404, {"error": e.args[0]}
+        wanted = _currencies(params)
+        rates = {c: float(v) for c, v in zip(eng.currencies, vec) if wanted is None or c in wanted}
+        return 200, {"date": date, "base": base, "updated": cube.updated[cube.date_index[date]], "rates": rates}
+    if endpoint == "compare":
+        d1, d2 = params.get("date1"), params.get("date2")
+        if d1 not in cube.date_index or d2 not in cube.date_index:
+            return 404, {"error": "datas não encontradas"}
+        from src import compare
+        ok = np.ones(len(cube.currencies), dtype=bool)
+        wanted = _currencies(params)
+        if wanted:
+            ok = np.isin(np.array(cube.currencies), wanted)
+        rows_idx = np.array([cube.date_index[d1], cube.date_index[d2]])
+        block = np.asarray(cube.values[rows_idx])
+        block[:, ~ok] = np.nan
+        v1, v2, delta, pct = (m[0] for m in compare.deltas(block, np.array([0]), np.array([1])))
+        top = int(params["top"]) if params.get("top") else None
+        idx = compare.top_movers(pct[None, :], top)[0]
+        idx = idx[~np.isnan(pct[idx])]
+        rows = [{"currency": cube.currencies[j], "value1": float(v1[j]), "value2": float(v2[j]),
+                 "delta": float(delta[j]), "pct": float(pct[j])} for j in idx]
+        return 200, {"date1": d1, "date2": d2, "rows": rows}
+    return 404, {"error": f"endpoint desconhecido: {endpoint}"}
+
+
+def _handler(state: GoldState):
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            status, etag, body = state.respond(url.path.strip("/"), params)
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 200:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def make_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    """Servidor HTTP multithread + estado residente (porta 0 escolhe uma livre)."""
+    from http.server import ThreadingHTTPServer
+    state = GoldState()
+    return ThreadingHTTPServer((host, port), _handler(state)), state
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, poll: float = POLL_SECONDS):
+    srv, state = make_server(host, port)
+    stop = threading.Event()
+    threading.Thread(target=state.watch, args=(stop, poll), daemon=True).start()
+    logging.info(f"Servindo a gold em http://{host}:{srv.server_port} (Ctrl+C para parar)")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        srv.server_close()
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from src import goldformat
+
+
+LAYERS = {
+    "gold": {
+        "dir": Path("data/gold"),
+        "pattern": "exchange_rates_brl_base_{date}.parquet",
+        "currency": "currency",
+        "columns": ["currency", "rate_brl_base", "last_update_utc"],
+    },
+    "silver": {
+        "dir": Path("data/silver"),
+        "pattern": "{date}.parquet",
+        "currency": "target_currency",
+        "columns": ["base_currency", "target_currency", "rate", "last_update_utc"],
+    },
+}
+DATASET_NAME = "dataset"
+COMPACTED_INDEX = "_compacted.json"
+# grupos pequenos: com os dados ordenados por (moeda, data), as estatísticas de
+# cada row group cobrem poucas moedas e o filtro por moeda pula o resto
+ROW_GROUP_SIZE = 1024
+
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def dataset_dir(layer: str) -> Path:
+    return LAYERS[layer]["dir"] / DATASET_NAME
+
+
+def _daily_files(layer: str) -> dict[str, Path]:
+    cfg = LAYERS[layer]
+    prefix, suffix = cfg["pattern"].split("{date}")
+    out = {}
+    for p in cfg["dir"].glob(cfg["pattern"].format(date="*")):
+        day = p.name[len(prefix):len(p.name) - len(suffix)]
+        if _DATE_RE.fullmatch(day):
+            out[day] = p
+    return out
+
+
+def _compacted_dates(layer: str) -> set[str]:
+    p = dataset_dir(layer) / COMPACTED_INDEX
+    if not p.exists():
+        return set()
+    return set(json.loads(p.read_text(encoding="utf-8")))
+
+
+def _pending_files(layer: str, compacted: set[str]) -> dict[str, Path]:
+    """Arquivos diários ainda não compactados ou regravados depois da última compactação (ex.: backfill refeito)."""
+    index = dataset_dir(layer) / COMPACTED_INDEX
+    since = index.stat().st_mtime_ns if index.exists() else 0
+    return {d: p for d, p in _daily_files(layer).items() if d not in compacted or p.stat().st_mtime_ns > since}
+
+
+def list_dates(layer: str = "gold") -> list[str]:
+    """Datas disponíveis na camada (dataset compactado + arquivos diários ainda não compactados)."""
+    return sorted(_compacted_dates(layer) | set(_daily_files(layer)))
+
+
+def stamps(layer: str = "gold") -> tuple[dict[str, int], int]:
+    """mtime_ns de cada arquivo diário e do índice do dataset compactado (0 se não houver), numa varredura só."""
+    cfg = LAYERS[layer]
+    prefix, suffix = cfg["pattern"].split("{date}")
+    files = {}
+    if cfg["dir"].exists():
+        with os.scandir(cfg["dir"]) as entries:
+            for e in entries:
+                day = e.name[len(prefix):len(e.name) - len(suffix)]
+                if e.name.startswith(prefix) and e.name.endswith(suffix) and _DATE_RE.fullmatch(day):
+                    files[day] = e.stat().st_mtime_ns
+    index = dataset_dir(layer) / COMPACTED_INDEX
+    return files, index.stat().st_mtime_ns if index.exists() else 0
+
+
+def version(layer: str = "gold", scan: tuple[dict[str, int], int] | None = None) -> str:
+    """
+    Assinatura barata do conteúdo da camada (datas + mtimes), usada para invalidar caches.
+    `scan` reaproveita um `stamps(layer)` já feito pelo chamador.
+    """
+    files, dataset = scan or stamps(layer)
+    parts = [f"{d}:{t}" for d, t in sorted(files.items())]
+    if dataset:
+        parts.append(f"dataset:{dataset}")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _as_date(s: str):
+    return datetime.strptime(s, "%Y-%m-%d").date()
+
+
+def _read_daily(layer: str, files: dict[str, Path], currencies: list[str] | None) -> pd.DataFrame:
+    cfg = LAYERS[layer]
+    if layer == "gold":
+        # a gold pode estar no formato compacto (dicionário de moedas + deltas); ver goldformat
+        df = goldformat.read_many(files)[["date"] + cfg["columns"]]
+        if currencies:
+            df = df[df[cfg["currency"]].isin(currencies)]
+        return df.reset_index(drop=True)
+    frames = []
+    for day, p in sorted(files.items()):
+        df = pd.read_parquet(p)[cfg["columns"]]
+        if currencies:
+            df = df[df[cfg["currency"]].isin(currencies)]
+        df.insert(0, "date", day)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=["date"] + cfg["columns"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _read_dataset(layer: str, date_filter, currencies: list[str] | None) -> pd.DataFrame:
+    cfg = LAYERS[layer]
+    dset = ds.dataset(dataset_dir(layer), format="parquet", partitioning="hive",
+                      exclude_invalid_files=True)
+    flt = date_filter
+    if currencies:
+        cur = ds.field(cfg["currency"]).isin(currencies)
+        flt = cur if flt is None else flt & cur
+    table = dset.to_table(columns=["date"] + cfg["columns"], filter=flt)
+    df = table.to_pandas()
+    df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+    return df
+
+
+def _read(layer: str, wanted, date_filter, currencies: list[str] | None) -> pd.DataFrame:
+    cfg = LAYERS[layer]
+    if currencies:
+        currencies = [c.upper() for c in currencies]
+    compacted = _compacted_dates(layer)
+    # o arquivo diário vence a partição quando foi regravado depois da compactação
+    daily = {d: p for d, p in _pending_files(layer, compacted).items() if wanted(d)}
+    frames = [_read_daily(layer, daily, currencies)]
+    if any(wanted(d) and d not in daily for d in compacted):
+        rewritten = [_as_date(d) for d in compacted & set(daily)]
+        if rewritten:
+            skip = ~ds.field("date").isin(pa.array(rewritten, pa.date32()))
+            date_filter = skip if date_filter is None else date_filter & skip
+        frames.append(_read_dataset(layer, date_filter, currencies))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=["date"] + cfg["columns"])
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values(["date", cfg["currency"]]).reset_index(drop=True)
+
+
+def read_range(layer: str = "gold", start: str | None = None, end: str | None = None,
+               currencies: list[str] | None = None) -> pd.DataFrame:
+    """
+    Lê a camada no intervalo [start, end] (inclusive) como um único DataFrame com coluna `date`.
+    No dataset compactado os filtros de data e moeda são empurrados para o Parquet
+    (partições + estatísticas dos row groups).
+    """
+    flt = None
+    if start:
+        flt = ds.field("date") >= pa.scalar(_as_date(start), pa.date32())
+        flt = flt & (ds.field("year") >= int(start[:4]))
+    if end:
+        f_end = (ds.field("date") <= pa.scalar(_as_date(end), pa.date32())) & (ds.field("year") <= int(end[:4]))
+        flt = f_end if flt is None else flt & f_end
+    return _read(layer, lambda d: (not start or d >= start) and (not end or d <= end), flt, currencies)
+
+
+def read_days(layer: str, days: list[str], currencies: list[str] | None = None) -> pd.DataFrame:
+    """Lê apenas as datas informadas (ex.: as duas pontas de um `compare`)."""
+    wanted = set(days)
+    flt = ds.field("date").isin(pa.array([_as_date(d) for d in wanted], pa.date32()))
+    return _read(layer, wanted.__contains__, flt, currencies)
+
+
+def _write_partition(path: Path, df: pd.DataFrame):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE, compression="zstd", write_statistics=True)
+    os.replace(tmp, path)
+
+
+def compact(layer: str = "gold") -> int:
+    """
+    Consolida os Parquet diários da camada em um dataset Hive (year=/month=).
+    Só reescreve as partições que receberam dias novos. Retorna o número de dias compactados.
+    """
+    cfg = LAYERS[layer]
+    compacted = _compacted_dates(layer)
+    files = _pending_files(layer, compacted)
+    if not files:
+        logging.info(f"Nada a compactar em {cfg['dir']}.")
+        return 0
+    root = dataset_dir(layer)
+    new = _read_daily(layer, files, None)
+    new["date"] = pd.to_datetime(new["date"]).dt.date
+    new["year"] = [d.year for d in new["date"]]
+    new["month"] = [d.month for d in new["date"]]
+    for (year, month), part in new.groupby(["year", "month"]):
+        path = root / f"year={year}" / f"month={month:02d}" / "part-0.parquet"
+        part = part.drop(columns=["year", "month"])
+        if path.exists():
+            old = pq.read_table(path).to_pandas()
+            # dias regravados substituem as linhas antigas por inteiro (moedas removidas somem)
+            old = old[~pd.to_datetime(old["date"]).dt.date.isin(set(part["date"]))]
+            part = pd.concat([old, part], ignore_index=True)
+        part = (
+            part.drop_duplicates(subset=["date", cfg["currency"]], keep="last")
+            .sort_values([cfg["currency"], "date"])
+            .reset_index(drop=True)
+        )
+        _write_partition(path, part[["date"] + cfg["columns"]])
+    compacted |= set(files)
+    tmp = root / (COMPACTED_INDEX + ".tmp")
+    tmp.write_text(json.dumps(sorted(compacted)), encoding="utf-8")
+    os.replace(tmp, root / COMPACTED_INDEX)
+    logging.info(f"{len(files)} dia(s) compactados em {root}.")
+    return len(files)
@@ -0,0 +1,196 @@
+"""
+Instrumentação leve: spans com duração, status e contadores (linhas, bytes, latência HTTP,
+tokens/custo de LLM) gravados como JSON Lines em data/traces/spans-{dia}.jsonl — uma linha
+por span, em append (seguro entre processos do pipeline). `cli stats` agrega p50/p95 por
+etapa e exporta no formato OpenMetrics. FX_TRACE=off desliga a gravação.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+TRACE_DIR = Path("data/traces")
+# contadores somados por etapa no `stats` (demais atributos ficam só no JSONL)
+COUNTERS = ("rows_in", "rows_out", "bytes_read", "bytes_written", "http_ms",
+            "tokens_in", "tokens_out", "cost_usd")
+
+# somados também no span pai ao fechar (ex.: a etapa vê o total de HTTP/LLM que disparou)
+PROPAGATE = ("http_ms", "bytes_read", "tokens_in", "tokens_out", "cost_usd")
+
+_current: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("fx_span", default=None)
+
+
+def enabled() -> bool:
+    return os.getenv("FX_TRACE", "on").lower() not in ("off", "0", "")
+
+
+def run_id() -> str:
+    """Id da execução, herdado pelos processos filhos via ambiente."""
+    rid = os.environ.get("FX_RUN_ID")
+    if not rid:
+        rid = os.environ["FX_RUN_ID"] = uuid.uuid4().hex[:12]
+    return rid
+
+
+class Span:
+    __slots__ = ("name", "attrs", "parent", "start", "_t0")
+
+    def __init__(self, name: str, attrs: dict, parent: "Span | None"):
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key: str, n: float):
+        self.attrs[key] = self.attrs.get(key, 0) + n
+
+    def record(self, status: str, error: str | None = None) -> dict:
+        rec = {
+            "ts": round(self.start, 3),
+            "run": run_id(),
+            "pid": os.getpid(),
+            "span": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "ms": round((time.perf_counter() - self._t0) * 1000, 3),
+            "status": status,
+        }
+        if error:
+            rec["error"] = error
+        rec.update(self.attrs)
+        return rec
+
+
+def current() -> Span | None:
+    """Span ativo no contexto (para código interno somar contadores ao chamador)."""
+    return _current.get()
+
+
+def add(key: str, n: float):
+    """Soma `n` ao contador do span ativo, se houver."""
+    s = _current.get()
+    if s is not None:
+        s.add(key, n)
+
+
+def _export(rec: dict):
+    TRACE_DIR.mkdir(parents=True, exist_ok=True)
+    day = datetime.fromtimestamp(rec["ts"], tz=timezone.utc).strftime("%Y-%m-%d")
+    line = json.dumps(rec, ensure_ascii=False, default=str) + "\n"
+    # uma única write() em O_APPEND: linhas de processos diferentes não se misturam
+    fd = os.open(TRACE_DIR / f"spans-{day}.jsonl", os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    with span("transform", day=day) as s:
+        ...
+        s.set(rows_out=len(df))
+    """
+    s = Span(name, attrs, _current.get())
+    token = _current.set(s)
+    status, error = "ok", None
+    try:
+        yield s
+    except SystemExit as e:
+        if e.code:
+            status, error = "error", f"SystemExit({e.code})"
+        raise
+    except BaseException as e:
+        status, error = "error", type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        if s.parent is not None:
+            for k in PROPAGATE:
+                if k in s.attrs:
+                    s.parent.add(k, s.attrs[k])
+        if enabled():
+            try:
+                _export(s.record(status, error))
+            except OSError as e:
+                logging.debug(f"Falha ao gravar span {name}: {e}")
+
+
+def traced(name: str | None = None, **attrs):
+    """Decorador: cada chamada vira um span (nome padrão: módulo.função)."""
+    def wrap(fn):
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(label, **attrs):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def load_spans(days: int = 7, root: Path = TRACE_DIR):
+    """Spans dos últimos `days` dias (arquivos diários) como DataFrame."""
+    import pandas as pd
+    today = datetime.now(timezone.utc).date()
+    names = [f"spans-{today - timedelta(days=i)}.jsonl" for i in range(days)]
+    frames = [pd.read_json(root / n, lines=True) for n in sorted(names) if (root / n).exists()]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=["ts", "run", "span", "ms", "status"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def aggregate(df, prefix: str | None = None, last_runs: int | None = None):
+    """Por span: chamadas, erros, p50/p95/máx (ms) e somas dos contadores."""
+    import pandas as pd
+    if prefix:
+        df = df[df["span"].astype(str).str.startswith(prefix)]
+    if last_runs and not df.empty:
+        recent = df.groupby("run")["ts"].min().nlargest(last_runs).index
+        df = df[df["run"].isin(recent)]
+    if df.empty:
+        return pd.DataFrame()
+    g = df.groupby("span")
+    out = pd.DataFrame({
+        "calls": g.size(),
+        "errors": g["status"].apply(lambda s: int((s == "error").sum())),
+        "p50_ms": g["ms"].quantile(0.5),
+        "p95_ms": g["ms"].quantile(0.95),
+        "max_ms": g["ms"].max(),
+        "total_s": g["ms"].sum() / 1000.0,
+    })
+    for c in COUNTERS:
+        if c in df:
+            out[c] = g[c].sum(min_count=1)
+    return out.sort_values("total_s", ascending=False)
+
+
+def to_openmetrics(agg) -> str:
+    """Agregado em texto OpenMetrics (summary com quantis em segundos + contadores por etapa)."""
+    lines = ["# TYPE fx_span_duration_seconds summary", "# UNIT fx_span_duration_seconds seconds"]
+    for name, r in agg.iterrows():
+        lbl = f'span="{name}"'
+        lines.append(f'fx_span_duration_seconds{{{lbl},quantile="0.5"}} {r["p50_ms"] / 1000:.6f}')
+        lines.append(f'fx_span_duration_seconds{{{lbl},quantile="0.95"}} {r["p95_ms"] / 1000:.6f}')
+        lines.append(f"fx_span_duration_seconds_sum{{{lbl}}} {r['total_s']:.6f}")
+        lines.append(f"fx_span_duration_seconds_count{{{lbl}}} {int(r['calls'])}")
+    lines.append("# TYPE fx_span_errors counter")
+    lines += [f'fx_span_errors_total{{span="{n}"}} {int(r["errors"])}' for n, r in agg.iterrows()]
+    for c in COUNTERS:
+        if c not in agg:
+            continue
+        lines.append(f"# TYPE fx_{c} counter")
+        lines += [f'fx_{c}_total{{span="{n}"}} {r[c]:g}' for n, r in agg.iterrows() if r[c] == r[c]]
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,161 @@
+"""
+Tick store intradiário: cada snapshot do /latest vira um segmento Parquet (zstd)
+append-only em data/ticks/{dia}/{time_last_update_unix}.parquet. O nome do arquivo é
+o índice de tempo — ordenado, ele responde "taxa no instante T" com busca binária
+lendo um único segmento. O dia de um tick é a data UTC do seu timestamp; consultas só
+listam os diretórios dos dias que cobrem o intervalo pedido.
+"""
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+from src.transform import validate_raw
+
+TICK_DIR = Path("data/ticks")
+LAST_HASH = "_last.sha1"
+
+
+def _day_of(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _rates_hash(rates: dict) -> str:
+    return hashlib.sha1(repr(sorted(rates.items())).encode("utf-8")).hexdigest()
+
+
+def parse_time(value: str | int) -> int:
+    """Aceita unix (int/str) ou ISO 'YYYY-MM-DD[THH:MM[:SS]]' em UTC."""
+    if isinstance(value, int) or str(value).isdigit():
+        return int(value)
+    dt = datetime.fromisoformat(str(value))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+class TickStore:
+    def __init__(self, root: Path = TICK_DIR):
+        self.root = Path(root)
+
+    def _segment(self, ts: int) -> Path:
+        return self.root / _day_of(ts) / f"{ts}.parquet"
+
+    def days(self) -> list[str]:
+        """Dias com diretório de ticks, ordenados (só a listagem da raiz, sem abrir os dias)."""
+        if not self.root.exists():
+            return []
+        return sorted(e.name for e in os.scandir(self.root) if e.is_dir() and len(e.name) == 10)
+
+    def timestamps(self, day: str | None = None, days: list[str] | None = None) -> np.ndarray:
+        """Índice de tempo ordenado (int64) dos dias pedidos (padrão: todos), a partir dos nomes dos segmentos."""
+        days = [day] if day else (days if days is not None else self.days())
+        dirs = [self.root / d for d in days]
+        ts = [int(e.name[:-8]) for d in dirs if d.is_dir() for e in os.scandir(d)
+              if e.name.endswith(".parquet") and e.name[:-8].isdigit()]
+        return np.sort(np.array(ts, dtype=np.int64))
+
+    def append(self, data: dict) -> bool:
+        """
+        Grava o snapshot como novo segmento. Devolve False (sem escrever) quando a API
+        ainda não atualizou: mesmo time_last_update_unix ou taxas idênticas ao último tick.
+        """
+        validate_raw(data)
+        ts = int(data["time_last_update_unix"])
+        path = self._segment(ts)
+        if path.exists():
+            return False
+        rates = data["conversion_rates"]
+        digest = _rates_hash(rates)
+        marker = self.root / LAST_HASH
+        if marker.exists() and marker.read_text(encoding="utf-8") == digest:
+            return False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            values = np.fromiter(rates.values(), dtype="float64", count=len(rates))
+        except (TypeError, ValueError):
+            # nulos/strings em um payload válido viram NaN, como no transform
+            values = pd.to_numeric(pd.Series(list(rates.values()), dtype=object), errors="coerce").to_numpy(dtype="float64")
+        df = pd.DataFrame({"currency": pd.Categorical(list(rates)), "rate": values})
+        tmp = path.with_suffix(".tmp")
+        df.to_parquet(tmp, index=False, compression="zstd")
+        os.replace(tmp, path)
+        marker.write_text(digest, encoding="utf-8")
+        logging.info(f"Tick {ts} ({_day_of(ts)}) gravado com {len(rates)} moedas.")
+        return True
+
+    def read(self, ts: int) -> pd.Series:
+        """Taxas (base USD) de um segmento, indexadas por moeda."""
+        return _read_segment(str(self._segment(ts)), self._segment(ts).stat().st_mtime_ns)
+
+    def at(self, t: str | int, currencies: list[str] | None = None) -> tuple[int, pd.Series] | None:
+        """Último tick com timestamp <= T: busca binária no dia de T (ou no último dia anterior com ticks)."""
+        t = parse_time(t)
+        days = self.days()
+        for k in range(int(np.searchsorted(days, _day_of(t), side="right")) - 1, -1, -1):
+            index = self.timestamps(days[k])
+            i = int(np.searchsorted(index, t, side="right")) - 1
+            if i >= 0:
+                break
+        else:
+            return None
+        rates = self.read(int(index[i]))
+        if currencies:
+            rates = rates.reindex([c.upper() for c in currencies]).dropna()
+        return int(index[i]), rates
+
+    def history(self, currency: str, start: str | int | None = None, end: str | int | None = None) -> pd.DataFrame:
+        """Série intradiária (ts, rate) de uma moeda entre start e end, com os segmentos lidos em lote."""
+        lo = parse_time(start) if start is not None else None
+        hi = parse_time(end) if end is not None else None
+        days = [d for d in self.days()
+                if (lo is None or d >= _day_of(lo)) and (hi is None or d <= _day_of(hi))]
+        index = self.timestamps(days=days)
+        sel = index[(np.searchsorted(index, lo, side="left") if lo is not None else 0):
+                    (np.searchsorted(index, hi, side="right") if hi is not None else len(index))]
+        found = {}
+        if len(sel):
+            # uma varredura multithread sobre todos os segmentos, filtrando a moeda no Parquet
+            dset = ds.dataset([str(self._segment(int(ts))) for ts in sel], format="parquet")
+            for batch in dset.scanner(columns=["rate"], filter=ds.field("currency") == currency.upper()).scan_batches():
+                if batch.record_batch.num_rows:
+                    found[int(Path(batch.fragment.path).name[:-8])] = batch.record_batch.column(0)[0].as_py()
+        values = np.array([found.get(int(ts), np.nan) for ts in sel], dtype="float64")
+        return pd.DataFrame({"ts": sel, "rate": values})
+
+    def payload(self, ts: int) -> dict:
+        """Reconstrói o payload do /latest de um tick (para a rollup diária)."""
+        rates = self.read(ts)
+        return {
+            "base_code": "USD",
+            "time_last_update_unix": ts,
+            "conversion_rates": {str(c): float(v) for c, v in rates.items()},
+        }
+
+    def close_day(self, day: str) -> pd.DataFrame:
+        """
+        Fechamento: o último tick do dia vira a raw/silver/gold diárias, como se o
+        pipeline diário tivesse rodado com esse snapshot.
+        """
+        from src import load, transform
+        from src.transform import dump_raw_json
+        index = self.timestamps(day)
+        if not len(index):
+            raise FileNotFoundError(f"Nenhum tick encontrado para {day} em {self.root}")
+        data = self.payload(int(index[-1]))
+        os.makedirs(transform.RAW_DATA_PATH, exist_ok=True)
+        dump_raw_json(data, os.path.join(transform.RAW_DATA_PATH, f"{day}.json"))
+        df_silver = transform.run(day, data)
+        logging.info(f"Fechamento de {day}: {len(index)} tick(s), último em {index[-1]}.")
+        return load.run(day, df_silver)
+
+
+@lru_cache(maxsize=256)
+def _read_segment(path: str, mtime_ns: int) -> pd.Series:
+    df = pd.read_parquet(path)
+    return pd.Series(df["rate"].to_numpy(), index=df["currency"].astype(str).to_numpy())
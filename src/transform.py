@@ -1,43 +1,116 @@
 import os
+import numpy as np
 import pandas as pd
 import json
 from datetime import datetime, timezone
 import logging
+from src import quality
+from src.runtime import setup_logging
+from src.telemetry import span
+
+try:
+    import orjson
+except ImportError:  # serializador rápido é opcional
+    orjson = None
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 
 RAW_DATA_PATH = os.path.join('data', 'raw')
 SILVER_DATA_PATH = os.path.join('data', 'silver')
 
 
+# Esquema declarado do payload da ExchangeRate API usado pelo pipeline (chave -> tipos aceitos).
+RAW_SCHEMA = {
+    "base_code": (str,),
+    "time_last_update_unix": (int, float),
+    "conversion_rates": (dict,),
+}
+
+
+def validate_raw(data: dict) -> None:
+    """
+    Valida o JSON bruto contra RAW_SCHEMA. Levanta ValueError descrevendo o problema.
+    Valores de taxa inválidos não são erro de esquema: caem no filtro de qualidade.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Payload bruto não é um objeto JSON.")
+    for key, types in RAW_SCHEMA.items():
+        if key not in data:
+            raise ValueError(f"Payload bruto sem o campo obrigatório '{key}'.")
+        value = data[key]
+        if isinstance(value, bool) or not isinstance(value, types):
+            raise ValueError(f"Campo '{key}' com tipo inválido: {type(value).__name__}.")
+    if not all(isinstance(c, str) for c in data["conversion_rates"]):
+        raise ValueError("Campo 'conversion_rates' com código de moeda inválido.")
+
+
+def dump_raw_json(data: dict, path) -> None:
+    """Grava o JSON bruto (orjson quando disponível, senão json da stdlib)."""
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
 def to_silver_df(data: dict) -> pd.DataFrame:
     """
     Converte o JSON bruto da API em um DataFrame normalizado (silver).
     Aplica qualidade: remove nulos/<=0.
+    As taxas vão direto para arrays NumPy e o filtro é uma única máscara vetorizada.
     """
-    base_currency = data.get("base_code")
-    rates = data.get("conversion_rates", {})
-    last_update_unix = data.get("time_last_update_unix")
-    last_update_utc = datetime.fromtimestamp(last_update_unix, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
-
-    rows = [
-        {"base_currency": base_currency, "target_currency": cur, "rate": rate, "last_update_utc": last_update_utc}
-        for cur, rate in rates.items()
-    ]
-    df = pd.DataFrame(rows)
-
-    df['rate'] = pd.to_numeric(df['rate'], errors='coerce')
-    initial_rows = len(df)
-    df = df.dropna(subset=['rate'])
-    df = df[df['rate'] > 0]
-    removed = initial_rows - len(df)
+    validate_raw(data)
+    base_currency = data["base_code"]
+    rates = data["conversion_rates"]
+    last_update_utc = datetime.fromtimestamp(data["time_last_update_unix"], tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+    n = len(rates)
+    currencies = np.fromiter(rates.keys(), dtype=object, count=n)
+    try:
+        values = np.fromiter(rates.values(), dtype=np.float64, count=n)
+    except (TypeError, ValueError):
+        # caminho lento só quando há nulos/strings no payload
+        values = pd.to_numeric(pd.Series(list(rates.values()), dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+    keep = values > 0  # NaN > 0 é False: cobre nulos e não positivos de uma vez
+    removed = n - int(keep.sum())
     if removed > 0:
         logging.warning(f"{removed} registros removidos por qualidade (nulos/<=0).")
 
+    return pd.DataFrame({
+        "base_currency": base_currency,
+        "target_currency": currencies[keep],
+        "rate": values[keep],
+        "last_update_utc": last_update_utc,
+    })
+
+
+def run(day: str, data: dict | None = None, check: bool = True) -> pd.DataFrame:
+    """
+    Gera a silver de um dia. Usa `data` em memória quando fornecido; senão lê data/raw/{day}.json.
+    Sem `check` a qualidade fica com o chamador (o pipeline a aplica em ordem de data).
+    """
+    with span("transform", day=day) as s:
+        if data is None:
+            raw_file_path = os.path.join(RAW_DATA_PATH, f"{day}.json")
+            if not os.path.exists(raw_file_path):
+                raise FileNotFoundError(f"Arquivo de dados brutos não encontrado: {raw_file_path}")
+            logging.info(f"Carregando dados de {raw_file_path}")
+            with open(raw_file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            s.set(bytes_read=os.path.getsize(raw_file_path))
+
+        df = to_silver_df(data)
+        logging.info(f"Dados transformados em DataFrame com {len(df)} registros.")
+        if check:
+            df = quality.check(day, df)
+
+        os.makedirs(SILVER_DATA_PATH, exist_ok=True)
+        silver_file_path = os.path.join(SILVER_DATA_PATH, f"{day}.parquet")
+        df.to_parquet(silver_file_path, index=False)
+        s.set(rows_in=len(data.get("conversion_rates") or ()), rows_out=len(df),
+              bytes_written=os.path.getsize(silver_file_path))
+    logging.info(f"Dados transformados e salvos com sucesso em: {silver_file_path}")
     return df
 
 
@@ -45,27 +118,14 @@ def main():
     """
     Transforma os dados brutos da raw em silver (parquet).
     """
+    setup_logging()
     logging.info("Iniciando o processo de transformação de dados.")
 
     today_str = datetime.now().strftime('%Y-%m-%d')
-    raw_file_path = os.path.join(RAW_DATA_PATH, f"{today_str}.json")
-
-    if not os.path.exists(raw_file_path):
-        logging.error(f"Arquivo de dados brutos não encontrado para hoje: {raw_file_path}")
-        return
-
-    logging.info(f"Carregando dados de {raw_file_path}")
-    with open(raw_file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-
-    df = to_silver_df(data)
-    logging.info(f"Dados transformados em DataFrame com {len(df)} registros.")
-
-    os.makedirs(SILVER_DATA_PATH, exist_ok=True)
-    silver_file_path = os.path.join(SILVER_DATA_PATH, f"{today_str}.parquet")
-    df.to_parquet(silver_file_path, index=False)
-    logging.info(f"Dados transformados e salvos com sucesso em: {silver_file_path}")
+    try:
+        run(today_str)
+    except FileNotFoundError as e:
+        logging.error(str(e))
 
 
 if __name__ == "__main__":
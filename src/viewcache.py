@@ -0,0 +1,62 @@
+"""
+Cache compacto da gold para o `view`: um JSON pequeno por dia (moeda -> taxa BRL),
+lido só com a biblioteca padrão para responder sem importar pandas/pyarrow.
+Cada entrada guarda a assinatura (datas + mtimes) dos arquivos gold do mês até o dia:
+um delta é decodificado contra os dias anteriores do mês, então regravar qualquer um
+deles (ou apagar o próprio dia) invalida a entrada.
+"""
+import json
+import os
+from pathlib import Path
+
+GOLD_DIR = Path("data/gold")
+CACHE_DIR = GOLD_DIR / "view_cache"
+GOLD_PATTERN = "exchange_rates_brl_base_{date}.parquet"
+
+
+def _gold_files() -> dict[str, os.DirEntry]:
+    if not GOLD_DIR.exists():
+        return {}
+    prefix, suffix = GOLD_PATTERN.split("{date}")
+    with os.scandir(GOLD_DIR) as entries:
+        return {e.name[len(prefix):-len(suffix)]: e for e in entries
+                if e.name.startswith(prefix) and e.name.endswith(suffix)}
+
+
+def _source(day: str) -> str | None:
+    """Assinatura dos arquivos gold de que o dia depende; None se o dia não tem arquivo gold."""
+    files = _gold_files()
+    if day not in files:
+        return None
+    return "|".join(f"{d}:{e.stat().st_mtime_ns}" for d, e in sorted(files.items()) if d[:7] == day[:7] and d <= day)
+
+
+def write(day: str, currencies, values, last_update_utc: str):
+    source = _source(day)
+    if source is None:
+        return
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    rates = {str(c): float(v) for c, v in zip(currencies, values) if v == v}
+    tmp = CACHE_DIR / f"{day}.tmp"
+    tmp.write_text(json.dumps({"date": day, "updated": last_update_utc, "rates": rates, "source": source}),
+                   encoding="utf-8")
+    os.replace(tmp, CACHE_DIR / f"{day}.json")
+
+
+def latest_date() -> str | None:
+    """Data mais recente entre os arquivos gold diários (entradas do cache sem gold não contam)."""
+    return max(_gold_files(), default=None)
+
+
+def read(day: str | None = None) -> dict | None:
+    """Entrada do cache para o dia (ou o mais recente); None se ausente ou se a gold mudou desde a gravação."""
+    day = day or latest_date()
+    if not day:
+        return None
+    p = CACHE_DIR / f"{day}.json"
+    if not p.exists():
+        return None
+    entry = json.loads(p.read_text(encoding="utf-8"))
+    if entry.get("source") is None or entry["source"] != _source(day):
+        return None
+    return entry
@@ -5,28 +5,18 @@ import altair as alt
 import unicodedata, re, json
 from pathlib import Path
 from datetime import datetime
+from src.dashboard_data import DashboardData
 
 st.set_page_config(page_title="FX — Gold (BRL)", layout="wide")
 
 GOLD_DIR = Path("data/gold")
-PATTERN = "exchange_rates_brl_base_{}.parquet"
 
-@st.cache_data
-def list_dates():
-    files = sorted(GOLD_DIR.glob(PATTERN.format("*")))
-    return [p.stem.replace("exchange_rates_brl_base_", "") for p in files]
+@st.cache_resource
+def data_layer() -> DashboardData:
+    # um único objeto por processo: caches LRU limitados, invalidados pela versão da gold
+    return DashboardData()
 
-@st.cache_data
-def load_gold(day: str) -> pd.DataFrame:
-    p = GOLD_DIR / PATTERN.format(day)
-    df = pd.read_parquet(p)[["currency", "rate_brl_base", "last_update_utc"]].drop_duplicates(subset=["currency"])
-    return df.reset_index(drop=True)
-
-def prev_day(days, current):
-    if current not in days:
-        return None
-    i = days.index(current)
-    return days[i-1] if i > 0 else None
+data = data_layer()
 
 def fmt_brl(x: float) -> str:
     return f"R$ {x:,.4f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -41,23 +31,10 @@ def sanitize_md(text: str) -> str:
     parts = [" ".join(p.strip().split()) for p in parts]
     return "\n\n".join(parts)
 
-@st.cache_data
-def history_for(currencies, days, last_n=15):
-    days = days[-last_n:]
-    rows = []
-    for d in days:
-        df = load_gold(d)
-        for c in currencies:
-            s = df[df["currency"] == c]
-            if not s.empty:
-                rows.append({"date": d, "currency": c, "value": float(s.iloc[0]["rate_brl_base"])})
-    return pd.DataFrame(rows)
-
-def sparkline(df: pd.DataFrame, ccy: str):
-    d = df[df["currency"] == ccy].copy()
-    if d.empty:
+def sparkline(window, ccy: str):
+    d = window.sparklines.get(ccy)
+    if d is None:
         return None
-    d["ds"] = pd.to_datetime(d["date"])
     chart = alt.Chart(d).mark_area(opacity=0.35).encode(
         x=alt.X("ds:T", axis=None),
         y=alt.Y("value:Q", axis=None),
@@ -83,7 +60,7 @@ h1, h2, h3 { letter-spacing: .2px }
 </style>
 """, unsafe_allow_html=True)
 
-days = list_dates()
+days = data.dates()
 if not days:
     st.error("Nenhum arquivo em data/gold. Rode `python -m src.cli all`.")
     st.stop()
@@ -95,7 +72,7 @@ with st.container():
     with colh2:
         day = st.selectbox("Dia", days, index=len(days)-1)
 
-df = load_gold(day)
+df = data.day_frame(day)
 default_pick = [c for c in ["USD","EUR","BRL","GBP","JPY"] if c in set(df["currency"])]
 pick = st.multiselect("Moedas", sorted(df["currency"].unique()), default_pick)
 
@@ -104,12 +81,16 @@ if df_view.empty:
     st.warning("Selecione ao menos uma moeda.")
     st.stop()
 
-pday = prev_day(days, day)
-hist = history_for(pick, days, last_n=15)
+pday = data.prev_day(day)
+window = data.window(day, last_n=15)
+if data.provenance(day):
+    st.caption(f"⚠️ {day} não foi observado: valores preenchidos por {data.provenance(day)} (`python -m src.cli gaps`).")
+elif pday and (pd.Timestamp(day) - pd.Timestamp(pday)).days > 1:
+    st.caption(f"⚠️ Sem dados entre {pday} e {day}; a variação cobre {(pd.Timestamp(day) - pd.Timestamp(pday)).days} dias.")
 
 kcols = st.columns(len(df_view) or 1)
 if pday:
-    prev = load_gold(pday)[["currency","rate_brl_base"]].rename(columns={"rate_brl_base":"prev"})
+    prev = data.day_frame(pday)[["currency","rate_brl_base"]].rename(columns={"rate_brl_base":"prev"})
     kdf = df_view.merge(prev, on="currency", how="left")
 else:
     kdf = df_view.copy()
@@ -124,11 +105,11 @@ for c, r in zip(kcols, kdf.itertuples()):
         html += f'<div class="badge {klass}">{dlt:+.2f}%</div>'
     html += "</div>"
     c.markdown(html, unsafe_allow_html=True)
-    sp = sparkline(hist, r.currency)
+    sp = sparkline(window, r.currency)
     if sp is not None:
         c.altair_chart(sp, use_container_width=True)
 
-tab_overview, tab_detail, tab_summary = st.tabs(["Visão Geral", "Tabela/Download", "Resumo LLM"])
+tab_overview, tab_history, tab_detail, tab_summary = st.tabs(["Visão Geral", "Histórico", "Tabela/Download", "Resumo LLM"])
 
 with tab_overview:
     left, right = st.columns([3,2])
@@ -182,10 +163,37 @@ with tab_overview:
         use_container_width=True
     )
 
+with tab_history:
+    RANGES = {"3 meses": 91, "1 ano": 365, "5 anos": 5 * 365, "10 anos": 10 * 365, "Tudo": None}
+    span_label = st.radio("Período", list(RANGES), index=1, horizontal=True)
+    n = RANGES[span_label]
+    start = None if n is None else max(days[0], (pd.Timestamp(day) - pd.Timedelta(days=n)).strftime("%Y-%m-%d"))
+    # janelas longas vêm dos agregados semana/mês/ano (rollups), não dos arquivos diários
+    res, hist = data.history(list(df_view["currency"]), start, day)
+    if hist.empty:
+        st.info("Sem histórico para as moedas selecionadas.")
+    else:
+        labels = {"day": "diária", "week": "semanal", "month": "mensal", "year": "anual"}
+        st.caption(f"Resolução {labels[res]} ({hist['period'].nunique()} pontos); linha = fechamento do período.")
+        hist = hist.assign(ds=pd.to_datetime(hist["period"]))
+        line = alt.Chart(hist).mark_line().encode(
+            x=alt.X("ds:T", title=""),
+            y=alt.Y("close:Q", title="Valor (BRL)", scale=alt.Scale(type="log") if logscale else alt.Scale(zero=False)),
+            color=alt.Color("currency:N", legend=alt.Legend(orient="bottom")),
+            tooltip=["currency:N", alt.Tooltip("ds:T", title="Início"), alt.Tooltip("open:Q", format=".4f"),
+                     alt.Tooltip("high:Q", format=".4f"), alt.Tooltip("low:Q", format=".4f"),
+                     alt.Tooltip("close:Q", format=".4f"), alt.Tooltip("mean:Q", format=".4f", title="média")]
+        ).properties(height=360)
+        st.altair_chart(line.configure_view(strokeOpacity=0), use_container_width=True)
+
 with tab_detail:
     st.dataframe(df_view, use_container_width=True)
     st.download_button("Baixar CSV (recorte atual)", data=df_view.to_csv(index=False).encode("utf-8"), file_name=f"gold_{day}.csv", mime="text/csv")
     st.download_button("Baixar Parquet (recorte atual)", data=df_view.to_parquet(index=False), file_name=f"gold_{day}.parquet", mime="application/octet-stream")
+    an = data.analytics(day)
+    if an is not None:
+        st.markdown("#### Analytics (retornos, volatilidade, EMAs, drawdown)")
+        st.dataframe(an[an["currency"].isin(pick)].reset_index(drop=True), use_container_width=True)
 
 with tab_summary:
     json_path = GOLD_DIR / f"daily_summary_{day}.json"
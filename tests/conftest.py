@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+import src.enrich as enrich
+from src import goldformat, store
+from src.cube import RateCube
+
+
+def _gold_path(day: str):
+    return store.LAYERS["gold"]["dir"] / store.LAYERS["gold"]["pattern"].format(date=day)
+
+
+@pytest.fixture
+def gold_path():
+    """Caminho do arquivo gold diário (relativo ao diretório de trabalho)."""
+    return _gold_path
+
+
+@pytest.fixture
+def write_gold(tmp_path, monkeypatch):
+    """
+    Entra em tmp_path e devolve `write(day, rates, fmt=None)`, que grava a gold do dia
+    (moeda -> taxa BRL) pelo goldformat e retorna o caminho do arquivo.
+    """
+    monkeypatch.chdir(tmp_path)
+
+    def write(day: str, rates: dict, fmt: str | None = None):
+        df = pd.DataFrame({"currency": list(rates), "rate_brl_base": list(rates.values()),
+                           "last_update_utc": f"{day} 00:00:01"})
+        return goldformat.write(_gold_path(day), day, df, fmt)
+
+    return write
+
+
+@pytest.fixture
+def make_cube():
+    """`make(dates, {moeda: valores por data}, version)`: RateCube em memória; NaN = moeda sem cotação no dia."""
+    def make(dates: list[str], values: dict, version: str = "v1") -> RateCube:
+        df = pd.DataFrame([{"date": d, "currency": c, "rate_brl_base": v[i], "last_update_utc": "x"}
+                           for c, v in values.items() for i, d in enumerate(dates) if not np.isnan(v[i])])
+        return RateCube.from_frame(df, "gold", version)
+
+    return make
+
+
+class FakeClient:
+    """Cliente OpenAI falso: `reply` é o texto da resposta ou uma função das mensagens; guarda os kwargs de cada chamada."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = self.reply(kwargs["messages"]) if callable(self.reply) else self.reply
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """`install(reply)`: troca o cliente do enrich por um FakeClient e o devolve."""
+    def install(reply) -> FakeClient:
+        fake = FakeClient(reply)
+        monkeypatch.setattr(enrich, "_client", lambda: fake)
+        return fake
+
+    return install
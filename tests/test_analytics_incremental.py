@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from src.analytics import AnalyticsState
+
+def test_incremental_matches_pandas_rolling(tmp_path):
+    rng = np.random.default_rng(0)
+    prices = 5.0 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(120, 2)), axis=0))
+    dates = [str(d.date()) for d in pd.date_range("2024-01-01", periods=120)]
+
+    st = AnalyticsState()
+    for i, d in enumerate(dates):
+        if i == 60:
+            # estado persistido e recarregado no meio do caminho
+            st.save(tmp_path)
+            st = AnalyticsState.load(tmp_path)
+        out = st.update(d, ["USD", "EUR"], prices[i])
+
+    ref = pd.DataFrame(prices, columns=["USD", "EUR"])
+    logret = np.log(ref / ref.shift(1))
+    for w in (7, 30, 90):
+        expected = logret.rolling(w).std().iloc[-1]
+        assert np.allclose(out.set_index("currency")[f"vol_{w}d"][["USD", "EUR"]], expected, rtol=1e-6)
+    ema = ref.ewm(span=30, adjust=False).mean().iloc[-1]
+    assert np.allclose(out.set_index("currency")["ema_30"][["USD", "EUR"]], ema)
+    dd = (ref / ref.cummax() - 1).iloc[-1]
+    assert np.allclose(out.set_index("currency")["drawdown"][["USD", "EUR"]], dd)
+
+
+def test_update_appends_new_days_and_rebuilds_on_rewrite(write_gold):
+    from src import analytics
+    write = lambda day, usd: write_gold(day, {"BRL": 1.0, "USD": usd})
+
+    for i in range(5):
+        write(f"2024-01-0{i + 1}", 5.0 + i / 10)
+    assert analytics.update() == 5
+    assert analytics.update() == 0
+    # estado em um único arquivo (meta dentro do .npz)
+    assert sorted(p.name for p in analytics.ANALYTICS_DIR.glob("state*")) == ["state.npz"]
+
+    write("2024-01-06", 5.6)
+    assert analytics.update() == 1
+    assert analytics.AnalyticsState.load(analytics.ANALYTICS_DIR).last_date == "2024-01-06"
+
+    # dia já processado regravado: reconstrução completa
+    write("2024-01-03", 9.0)
+    assert analytics.update() == 6
+    assert analytics.load_day("2024-01-03").set_index("currency").loc["USD", "value"] == 9.0
@@ -0,0 +1,111 @@
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+import pytest
+import src.backfill as bf
+from src import quality
+
+RATES = {"USD": 1.0, "BRL": 5.0, "EUR": 0.5}
+
+
+@pytest.fixture
+def stub_api(tmp_path, monkeypatch):
+    """
+    Entra em tmp_path e devolve `serve(reply)`: sobe uma ExchangeRate API falsa e retorna a URL base.
+    `reply(day)` devolve o payload JSON do dia ou um status HTTP de erro (respondido com Retry-After: 0).
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("EXCHANGERATE_API_KEY", "stub")
+    monkeypatch.setattr(bf, "MANIFEST_PATH", tmp_path / "manifest.sqlite")
+    servers = []
+
+    def serve(reply) -> str:
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                out = reply(self.path.rsplit("/", 1)[-1])
+                if isinstance(out, int):
+                    self.send_response(out)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(out).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        url = f"http://127.0.0.1:{srv.server_port}/v6"
+        monkeypatch.setenv("EXCHANGERATE_API_URL", url)
+        return url
+
+    yield serve
+    for srv in servers:
+        srv.shutdown()
+
+
+def test_concurrent_backfill_against_stub(tmp_path, monkeypatch, stub_api):
+    hits = Counter()
+
+    def reply(day):
+        hits[day] += 1
+        # primeira chamada de cada dia responde 429 para exercitar o retry
+        return 429 if hits[day] == 1 else {"base_code": "USD", "conversion_rates": RATES}
+
+    stub_api(reply)
+    for name in ("RAW_DIR", "SILVER_DIR", "GOLD_DIR"):
+        monkeypatch.setattr(bf, name, tmp_path / name.lower())
+    bf.backfill("2024-01-01", "2024-01-06", workers=4, rps=100)
+    golds = sorted((tmp_path / "gold_dir").glob("exchange_rates_brl_base_*.parquet"))
+    assert len(golds) == 6
+    assert all(n == 2 for n in hits.values())
+    gold = pd.read_parquet(golds[0]).set_index("currency")
+    assert abs(gold.loc["EUR", "rate_brl_base"] - 10.0) < 1e-9
+
+    # rerun: dias completos são pulados e um gold apagado é re-derivado do raw, sem API
+    golds[2].unlink()
+    bf.backfill("2024-01-01", "2024-01-07", workers=4, rps=100)
+    assert golds[2].exists()
+    assert sum(hits.values()) == 14
+
+    # cliente assíncrono: mesmo retry (429 → 200) e só o dia novo vai à API
+    bf.backfill("2024-01-01", "2024-01-08", workers=4, rps=100, use_async=True)
+    assert (tmp_path / "gold_dir" / "exchange_rates_brl_base_2024-01-08.parquet").exists()
+    assert sum(hits.values()) == 16
+
+
+def test_backfill_quarantines_spiked_day(tmp_path, stub_api):
+    # EUR 1000× maior em um dia (erro de unidade na fonte)
+    stub_api(lambda day: {"base_code": "USD",
+                          "conversion_rates": {**RATES, "EUR": 500.0} if day == "2024-02-03" else RATES})
+    bf.backfill("2024-02-01", "2024-02-06", workers=4, rps=100)
+    gold = lambda day: pd.read_parquet(tmp_path / f"data/gold/exchange_rates_brl_base_{day}.parquet").set_index("currency")
+    # o dia com salto fica sem EUR na gold; o seguinte (normal) volta a ter EUR
+    assert "EUR" not in gold("2024-02-03").index
+    assert (tmp_path / "data/quarantine/2024-02-03.parquet").exists()
+    assert abs(gold("2024-02-04").loc["EUR", "rate_brl_base"] - 10.0) < 1e-9
+    assert quality.QualityState.load().last_date == "2024-02-06"
+
+
+def test_force_bypasses_http_cache(stub_api):
+    hits = Counter()
+
+    def reply(day):
+        hits[day] += 1
+        # prazo no futuro: sem force, a resposta seria servida do cache em disco
+        return {"base_code": "USD", "time_next_update_unix": 4102444800, "conversion_rates": RATES}
+
+    stub_api(reply)
+    bf.backfill("2024-03-01", "2024-03-02")
+    assert sum(hits.values()) == 2
+    bf.backfill("2024-03-01", "2024-03-02", force=True)
+    bf.backfill("2024-03-01", "2024-03-02", workers=2, force=True)
+    bf.backfill("2024-03-01", "2024-03-02", workers=2, force=True, use_async=True)
+    assert sum(hits.values()) == 8
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+from src import viewcache
+
+# orçamento de import do src.cli (ms); pandas/pyarrow/openai sozinhos passam de 300 ms
+IMPORT_BUDGET_MS = 150
+ROOT = Path(__file__).resolve().parents[1]
+
+def _run(code, cwd):
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True,
+                         env={"PYTHONPATH": str(ROOT)}, check=True)
+    return out.stdout
+
+def test_cli_import_is_light():
+    code = (
+        "import sys, time\n"
+        "t = time.perf_counter()\n"
+        "import src.cli\n"
+        "ms = (time.perf_counter() - t) * 1000\n"
+        "heavy = [m for m in ('pandas', 'pyarrow', 'openai', 'requests', 'dotenv') if m in sys.modules]\n"
+        "print(ms, ','.join(heavy))\n"
+    )
+    ms, heavy = _run(code, ROOT).split(" ")
+    assert heavy.strip() == ""
+    assert float(ms) < IMPORT_BUDGET_MS
+
+def _gold(write_gold, day, usd):
+    rates = {"BRL": 1.0, "USD": usd, "EUR": 5.5}
+    write_gold(day, rates)
+    viewcache.write(day, rates, rates.values(), f"{day} 00:00:01")
+
+def test_view_answers_from_compact_cache_without_pandas(tmp_path, write_gold):
+    _gold(write_gold, "2024-01-02", 5.0)
+    code = (
+        "import sys\n"
+        "sys.argv = ['cli', 'view', '--curr', 'USD', 'EUR']\n"
+        "from src.cli import main\n"
+        "try:\n"
+        "    main()\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print('pandas' in sys.modules)\n"
+    )
+    out = _run(code, tmp_path)
+    assert "5,000000" in out and "5,500000" in out
+    assert out.strip().endswith("False")
+
+def test_view_cache_drops_stale_and_orphan_entries(write_gold, gold_path):
+    for day, usd in [("2024-01-01", 5.0), ("2024-01-02", 5.1), ("2024-01-03", 5.2)]:
+        _gold(write_gold, day, usd)
+    assert viewcache.read()["rates"]["USD"] == 5.2
+    # regravar o dia de referência do delta muda o dia seguinte sem tocar no arquivo dele
+    gold_path("2024-01-01").touch()
+    assert viewcache.read("2024-01-02") is None
+    # gold apagada: a entrada órfã não define a data mais recente nem é servida
+    gold_path("2024-01-03").unlink()
+    assert viewcache.latest_date() == "2024-01-02"
+    assert viewcache.read("2024-01-03") is None
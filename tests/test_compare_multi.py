@@ -0,0 +1,35 @@
+import io
+import numpy as np
+import pyarrow.csv as pacsv
+import pytest
+from src import compare
+from src.cli import _fmt_decimal
+
+@pytest.fixture
+def cube(make_cube):
+    return make_cube(["2024-01-01", "2024-01-02", "2024-01-03"],
+                     {"USD": [5.0, 5.1, 5.0], "EUR": [5.5, 5.5, 6.05], "JPY": [0.034, np.nan, 0.035]})
+
+def test_pairs_deltas_and_top_movers(cube):
+    assert [list(x) for x in compare.pairs_for(3, "pairwise")] == [[0, 0, 1], [1, 2, 2]]
+    chunks = list(compare.iter_chunks(cube, cube.dates, "consecutive", None, top=1))
+    c = chunks[0]
+    # par 01→02: USD +2% (JPY sem dado some); par 02→03: EUR +10%
+    assert c["currency"].tolist() == ["USD", "EUR"]
+    assert np.allclose(c["pct"], [2.0, 10.0])
+    w = next(compare.iter_chunks(cube, cube.dates, "window", ["jpy", "usd"], top=None))
+    assert w["date1"].tolist() == ["2024-01-01"] * 2 and w["currency"].tolist() == ["JPY", "USD"]
+
+def test_vector_formatter_matches_scalar():
+    rng = np.random.default_rng(0)
+    x = np.r_[rng.lognormal(0, 6, 2000) * rng.choice([-1, 1], 2000), 0.0, -0.0, 999.9999995, 1234567.5, 3e13]
+    assert np.strings.lstrip(compare.fmt_decimal(x)).tolist() == [_fmt_decimal(v) for v in x]
+    p = np.r_[rng.normal(0, 3, 500), -0.0, 0.005, 0.015, 1234.5]
+    assert compare.fmt_pct(p).tolist() == [f"{v:+.2f}%".replace(".", ",") for v in p]
+
+def test_stream_csv(tmp_path, cube):
+    out = tmp_path / "cmp.csv"
+    n = compare.write_stream(compare.iter_chunks(cube, cube.dates, "pairwise", None, None, chunk=1), "csv", str(out))
+    table = pacsv.read_csv(out)
+    assert n == table.num_rows == 7  # 3 pares × 3 moedas − 2 sem JPY
+    assert table.column_names == ["date1", "date2", "currency", "value1", "value2", "delta", "pct"]
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src import convert
+
+
+def _seed(write_gold):
+    # 2025-01-02 não existe; EUR falta em 2025-01-03
+    for day, rates in [("2025-01-01", {"BRL": 1.0, "USD": 5.0, "EUR": 6.0}),
+                       ("2025-01-03", {"BRL": 1.0, "USD": 5.2}),
+                       ("2025-01-04", {"BRL": 1.0, "USD": 5.4, "EUR": 6.4})]:
+        write_gold(day, rates)
+
+
+def test_csv_asof_roundtrip_parquet(tmp_path, write_gold):
+    _seed(write_gold)
+    (tmp_path / "tx.csv").write_text(
+        "id,amount,currency,timestamp\n"
+        "1,10,USD,2025-01-02T23:59:00\n"   # dia sem gold: usa 2025-01-01
+        "2,10, eur ,2025-01-03 12:00:00\n"  # moeda sem taxa no dia: último valor (6.0)
+        "3,2,usd,2025-03-01\n"             # depois do histórico: última taxa
+        "4,1,XYZ,2025-01-04\n"             # moeda desconhecida
+        "5,1,USD,2024-12-31\n"             # antes do histórico
+        "6,1,USD,\n",
+        encoding="utf-8")
+    r = convert.convert_file(tmp_path / "tx.csv", tmp_path / "out.parquet", chunk_rows=2, workers=2)
+    assert r["rows"] == 6 and r["unmatched"] == 3
+
+    df = pq.read_table(tmp_path / "out.parquet").to_pandas()
+    assert df["id"].tolist() == [1, 2, 3, 4, 5, 6]
+    assert df["rate_date"].astype(str).tolist()[:3] == ["2025-01-01", "2025-01-01", "2025-01-04"]
+    assert np.allclose(df["amount_brl"][:3], [50.0, 60.0, 10.8])
+    assert df["rate_brl"][3:].isna().all()
+
+    # reconversão: as colunas de saída são substituídas, não duplicadas
+    convert.convert_file(tmp_path / "out.parquet", tmp_path / "again.csv", workers=1)
+    again = pd.read_csv(tmp_path / "again.csv")
+    assert list(again.columns) == list(df.columns)
+    assert np.allclose(again["amount_brl"][:3], df["amount_brl"][:3])
+    assert not (tmp_path / "again.csv.tmp").exists()
+
+
+def test_epoch_and_typed_timestamps(tmp_path, write_gold):
+    _seed(write_gold)
+    # 2025-01-03T23:30 UTC e 2025-01-04T00:30 UTC
+    ms = [1_735_947_000_000, 1_735_950_600_000]
+    pq.write_table(pa.table({"v": [1.0, 1.0], "ccy": ["USD", "USD"], "ts": ms}), tmp_path / "e.parquet")
+    convert.convert_file(tmp_path / "e.parquet", tmp_path / "e_out.parquet",
+                         amount="v", currency="ccy", timestamp="ts", epoch="ms")
+    assert pq.read_table(tmp_path / "e_out.parquet")["rate_brl"].to_pylist() == [5.2, 5.4]
+
+    # timestamp tipado com fuso: a data é a UTC
+    ts = pa.array(ms, type=pa.int64()).cast(pa.timestamp("ms", tz="America/Sao_Paulo"))
+    pq.write_table(pa.table({"amount": [1.0, 1.0], "currency": ["USD", "USD"], "timestamp": ts}),
+                   tmp_path / "t.parquet")
+    convert.convert_file(tmp_path / "t.parquet", tmp_path / "t_out.parquet")
+    assert pq.read_table(tmp_path / "t_out.parquet")["rate_brl"].to_pylist() == [5.2, 5.4]
@@ -0,0 +1,59 @@
+import numpy as np
+from src.cube import RateCube
+
+def test_cube_lookup_slice_and_mmap_roundtrip(tmp_path, make_cube):
+    cube = make_cube(["2024-01-01", "2024-01-02", "2024-01-03"], {"USD": [5.0, 5.1, 5.2], "EUR": [6.0, np.nan, 6.2]})
+    assert cube.values.shape == (3, 2)
+    assert cube.rate("2024-01-02", "USD") == 5.1
+    assert np.isnan(cube.rate("2024-01-02", "EUR"))
+
+    dates, ccys, block = cube.slice(["USD", "EUR"], "2024-01-02")
+    assert dates == ["2024-01-02", "2024-01-03"] and ccys == ["USD", "EUR"]
+    assert block[1].tolist() == [5.2, 6.2]
+
+    cube.save(tmp_path)
+    loaded = RateCube.load(tmp_path)
+    # visão somente leitura sobre o buffer mapeado do Arrow IPC, sem cópia
+    assert not loaded.values.flags.writeable and not loaded.values.flags.owndata
+    assert loaded.version == "v1"
+    assert loaded.series("USD")[1].tolist() == [5.0, 5.1, 5.2]
+    assert loaded.to_frame()["rate_brl_base"].tolist() == [6.0, 5.0, 5.1, 6.2, 5.2]
+
+
+def test_snapshot_swap_keeps_open_readers(tmp_path, make_cube):
+    make_cube(["2024-01-01"], {"USD": [5.0]}, "v1").save(tmp_path)
+    old = RateCube.load(tmp_path)
+
+    make_cube(["2024-01-01", "2024-01-02"], {"USD": [5.0, 5.5]}, "v2").save(tmp_path)
+    new = RateCube.load(tmp_path)
+    # quem já tinha o snapshot mapeado continua lendo a versão anterior, inteira
+    assert old.version == "v1" and old.series("USD")[1].tolist() == [5.0]
+    assert new.version == "v2" and new.series("USD")[1].tolist() == [5.0, 5.5]
+    assert [p.name for p in tmp_path.iterdir()] == ["rates.arrow"]
+
+
+def test_open_patches_only_changed_days(tmp_path, monkeypatch, write_gold, gold_path):
+    from src import store
+
+    for i, day in enumerate(["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"]):
+        write_gold(day, {"USD": 5.0 + i, "EUR": 6.0 + i})
+    RateCube.open("gold")
+
+    # dia novo, dia do meio regravado com moeda nova e dia removido: sem reler o histórico
+    write_gold("2024-01-05", {"USD": 9.0, "EUR": 10.0})
+    write_gold("2024-01-02", {"USD": 5.5, "JPY": 0.03})
+    gold_path("2024-01-03").unlink()
+    read = []
+    real = store.read_days
+    monkeypatch.setattr(store, "read_days", lambda layer, days, *a: read.extend(days) or real(layer, days, *a))
+    monkeypatch.setattr(store, "read_range", lambda *a, **k: (_ for _ in ()).throw(AssertionError("releitura completa")))
+    cube = RateCube.open("gold")
+    assert read == ["2024-01-02", "2024-01-05"]
+
+    monkeypatch.undo()
+    monkeypatch.chdir(tmp_path)
+    full = RateCube.build("gold")
+    assert cube.dates == full.dates and cube.currencies == full.currencies == ["EUR", "JPY", "USD"]
+    assert np.array_equal(np.asarray(cube.values), np.asarray(full.values), equal_nan=True)
+    assert cube.version == full.version and cube.updated == full.updated
+    assert RateCube.open("gold").stamps == full.stamps
@@ -0,0 +1,30 @@
+import os
+from src.dashboard_data import DashboardData, LRUCache
+
+def test_lru_cache_is_bounded_and_expires():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1); cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)  # "b" é o menos usado
+    assert cache.get("b") is None and cache.get("a") == 1 and len(cache) == 2
+    ttl = LRUCache(maxsize=2, ttl=0.0)
+    ttl.put("a", 1)
+    assert ttl.get("a") is None
+
+def test_dashboard_window_and_invalidation(write_gold):
+    for i, day in enumerate(["2024-01-01", "2024-01-02", "2024-01-03"]):
+        write_gold(day, {"USD": 5.0 + i / 10, "EUR": 5.5 + i / 10})
+    data = DashboardData(version_ttl=0.0)
+    assert data.dates()[-1] == "2024-01-03" and data.prev_day("2024-01-01") is None
+
+    win = data.window("2024-01-03", last_n=2)
+    assert win.dates == ["2024-01-02", "2024-01-03"]
+    assert win.sparklines["USD"]["value"].tolist() == [5.1, 5.2]
+    assert data.window("2024-01-03", last_n=2) is win  # segunda chamada vem do cache
+    assert set(win.history(["EUR"])["currency"]) == {"EUR"}
+
+    # novo arquivo gold → nova versão, caches descartados, dia novo visível sem reiniciar
+    os.utime(write_gold("2024-01-04", {"USD": 5.3, "EUR": 5.8}), (2e9, 2e9))
+    assert data.dates()[-1] == "2024-01-04"
+    assert data.day_frame("2024-01-04").set_index("currency")["rate_brl_base"]["USD"] == 5.3
+    assert data.prev_day("2024-01-04") == "2024-01-03"
@@ -0,0 +1,32 @@
+import src.enrich as enrich
+
+SUMMARY = '{"title": "Resumo", "paragraphs": ["O dólar ficou estável."]}'
+
+def test_range_enrichment_is_served_from_cache_on_rerun(tmp_path, write_gold, fake_llm):
+    gold = tmp_path / "data" / "gold"
+    for day, usd in [("2024-01-01", 5.0), ("2024-01-02", 5.1)]:
+        write_gold(day, {"USD": usd, "BRL": 1.0})
+    fake = fake_llm(SUMMARY)
+
+    assert enrich.main(start="2024-01-01", end="2024-01-02", concurrency=2, mode="live")
+    assert len(fake.calls) == 2
+    assert (gold / "daily_summary_2024-01-02.json").exists()
+
+    # rerun e replay offline: nenhuma nova chamada à API
+    assert enrich.main(start="2024-01-01", end="2024-01-02", concurrency=2, mode="live")
+    assert enrich.main(start="2024-01-01", end="2024-01-02", mode="replay")
+    assert len(fake.calls) == 2
+
+
+def test_invalid_json_response_is_not_cached(tmp_path, monkeypatch, fake_llm):
+    monkeypatch.chdir(tmp_path)
+    fake = fake_llm("Desculpe, não consegui gerar o resumo.")
+    messages = [{"role": "user", "content": "resuma"}]
+
+    assert enrich._complete(messages, "live", None, None).startswith("Desculpe")
+    assert not list(enrich.CACHE_DIR.rglob("*.json"))
+    # rerun volta à API em vez de reapresentar a resposta inválida
+    fake.reply = SUMMARY
+    assert enrich._extract_json(enrich._complete(messages, "live", None, None))["title"] == "Resumo"
+    assert len(fake.calls) == 2
+    assert enrich._complete(messages, "replay", None, None) == SUMMARY
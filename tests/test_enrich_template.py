@@ -0,0 +1,62 @@
+import json
+import src.enrich as enrich
+
+
+def _seed(tmp_path, write_gold):
+    # USD: +0,2% no dia 2 e +3% no dia 3
+    for day, usd, eur, ars in [("2024-01-01", 5.0, 6.0, 0.005), ("2024-01-02", 5.01, 6.0, 0.0049),
+                               ("2024-01-03", 5.1603, 6.06, 0.0049)]:
+        write_gold(day, {"BRL": 1.0, "USD": usd, "EUR": eur, "ARS": ars})
+    return tmp_path / "data" / "gold"
+
+
+def _read(gold, day):
+    return json.loads((gold / f"daily_summary_{day}.json").read_text(encoding="utf-8"))
+
+
+def test_template_summaries_follow_llm_schema(tmp_path, write_gold):
+    gold = _seed(tmp_path, write_gold)
+    assert enrich.main(start="2024-01-01", end="2024-01-03", mode="template")
+
+    first, last = _read(gold, "2024-01-01"), _read(gold, "2024-01-03")
+    assert set(last) == {"title", "paragraphs"} and last["title"] == "Resumo Cambial - 03/01/2024"
+    assert last["paragraphs"][0] == ("Em 03/01/2024, o dólar fechou em R$ 5,1603 (alta de 3,00% ante 02/01/2024) "
+                                     "e o euro em R$ 6,0600 (alta de 1,00%).")
+    assert "2 subiram frente ao real e 0 recuaram" in last["paragraphs"][1]
+    assert "o peso argentino" in _read(gold, "2024-01-02")["paragraphs"][-1]
+    assert "Não há dia anterior" in first["paragraphs"][1]
+    assert (gold / "daily_summary_2024-01-03.md").read_text(encoding="utf-8").startswith("Resumo Cambial - 03/01/2024")
+
+
+def test_llm_only_for_days_selected_by_policy(tmp_path, write_gold, fake_llm):
+    gold = _seed(tmp_path, write_gold)
+    fake = fake_llm('{"title": "Resumo LLM", "paragraphs": ["O dólar disparou."]}')
+
+    assert enrich.main(start="2024-01-01", end="2024-01-03", mode="live", llm_above=1.0)
+    assert len(fake.calls) == 1
+    assert _read(gold, "2024-01-03")["title"] == "Resumo LLM"
+    assert _read(gold, "2024-01-02")["title"] == "Resumo Cambial - 02/01/2024"
+
+    # novo template no intervalo não sobrescreve o resumo do LLM (só com force)
+    enrich.main(start="2024-01-01", end="2024-01-03", mode="template")
+    assert _read(gold, "2024-01-03")["title"] == "Resumo LLM"
+    enrich.main(start="2024-01-01", end="2024-01-03", mode="template", force=True)
+    assert _read(gold, "2024-01-03")["title"] == "Resumo Cambial - 03/01/2024"
+
+
+def test_template_keeps_markdown_only_llm_fallback(tmp_path, write_gold):
+    gold = _seed(tmp_path, write_gold)
+    # fallback do LLM (resposta fora do JSON) grava só o .md
+    (gold / "daily_summary_2024-01-03.md").write_text("Texto livre do LLM", encoding="utf-8")
+    enrich.write_templates("2024-01-01", "2024-01-03")
+    assert (gold / "daily_summary_2024-01-03.md").read_text(encoding="utf-8") == "Texto livre do LLM"
+    assert not (gold / "daily_summary_2024-01-03.json").exists()
+    assert (gold / "daily_summary_2024-01-02.json").exists()
+
+
+def test_backfill_does_not_load_openai():
+    import subprocess
+    import sys
+    from pathlib import Path
+    code = "import sys, src.backfill, src.enrich; sys.exit('openai' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parents[1]).returncode == 0
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from src import gaps, goldformat, store
+from src.cube import RateCube
+
+
+def _rates(usd: float, eur: float) -> dict:
+    return {"BRL": 1.0, "EUR": eur, "USD": usd}
+
+
+def test_fill_matrix_ffill_linear_and_limit():
+    values = np.array([[1.0, 10.0], [4.0, np.nan], [7.0, 40.0]])
+    rows = np.array([0, 3, 6])
+    ff = gaps.fill_matrix(values, rows, 7, "ffill")
+    assert ff[:, 0].tolist() == [1, 1, 1, 4, 4, 4, 7]
+    # coluna 2: sem valor no dia 3, o ffill continua do dia 0
+    assert ff[5, 1] == 10.0
+    lin = gaps.fill_matrix(values, rows, 7, "linear")
+    assert np.allclose(lin[:, 0], [1, 2, 3, 4, 5, 6, 7])
+    assert np.allclose(lin[:, 1], [10, 15, 20, 25, 30, 35, 40])
+    # lacunas maiores que o limite ficam vazias
+    lim = gaps.fill_matrix(values, rows, 7, "linear", limit=2)
+    assert np.isnan(lim[1:6, 1]).all() and lim[1, 0] == 2.0
+
+
+def test_repair_marks_provenance_and_real_write_clears_it(write_gold, gold_path):
+    for day, usd in [("2025-01-01", 5.0), ("2025-01-04", 5.3), ("2025-01-05", 5.4)]:
+        write_gold(day, _rates(usd, 6.0))
+
+    assert gaps.missing_dates(store.list_dates("gold")) == ["2025-01-02", "2025-01-03"]
+    written = gaps.repair("linear")
+    assert written == ["2025-01-02", "2025-01-03"]
+    assert goldformat.filled_days(store.LAYERS["gold"]["dir"]) == {"2025-01-02": "linear", "2025-01-03": "linear"}
+
+    cube = RateCube.open("gold")
+    assert cube.dates == ["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-04", "2025-01-05"]
+    assert np.isclose(cube.rate("2025-01-02", "USD"), 5.1)
+    df = goldformat.read(gold_path("2025-01-03"))
+    assert set(df["provenance"]) == {"linear"}
+    assert set(df["last_update_utc"]) == {"2025-01-01 00:00:01"}
+
+    # nova execução com o mesmo método não regrava nada
+    assert gaps.repair("linear") == []
+
+    # o dia real chega (ex.: backfill): a marca some
+    write_gold("2025-01-02", _rates(5.05, 6.0))
+    assert goldformat.filled_days(store.LAYERS["gold"]["dir"]) == {"2025-01-03": "linear"}
+
+
+def test_repair_keeps_provenance_in_compact_format(monkeypatch, write_gold, gold_path):
+    monkeypatch.setenv("GOLD_FORMAT", "delta")
+    for day in ["2025-02-01", "2025-02-03"]:
+        write_gold(day, _rates(5.0, 6.0))
+    assert gaps.repair("ffill") == ["2025-02-02"]
+    df = goldformat.read(gold_path("2025-02-02"))
+    assert set(df["provenance"]) == {"ffill"}
+    assert np.allclose(df.sort_values("currency")["rate_brl_base"], [1.0, 6.0, 5.0])
+
+
+def test_filled_gap_keeps_delta_chain_after_rewrite(monkeypatch, write_gold, gold_path):
+    monkeypatch.setenv("GOLD_FORMAT", "delta")
+    for day, usd in [("2025-03-10", 5.0), ("2025-03-13", 5.3), ("2025-03-14", 5.4)]:
+        write_gold(day, _rates(usd, 6.1))
+    assert gaps.repair("ffill") == ["2025-03-11", "2025-03-12"]
+    # o dia observado após a lacuna passa a referenciar o último dia preenchido
+    meta = goldformat.pq.read_schema(gold_path("2025-03-13")).metadata
+    assert meta[goldformat.META_REF] == b"2025-03-12"
+    expected = {d: goldformat.read(gold_path(d)) for d in store.list_dates("gold")}
+
+    # backfill refeito do dia antes da lacuna: todos os outros dias continuam com os mesmos bits
+    write_gold("2025-03-10", _rates(4.9, 6.0))
+    for day, df in expected.items():
+        if day != "2025-03-10":
+            pd.testing.assert_frame_equal(goldformat.read(gold_path(day)), df)
+    assert goldformat.read(gold_path("2025-03-10")).set_index("currency").loc["USD", "rate_brl_base"] == 4.9
@@ -0,0 +1,48 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src import goldformat, store
+
+def test_delta_format_roundtrip_and_rewrite(write_gold):
+    root = Path("data/gold")
+    days = {
+        "2024-01-30": {"USD": 5.0, "EUR": 5.5},
+        "2024-01-31": {"USD": 5.0, "EUR": 5.6, "JPY": 0.034},  # moeda nova no meio da cadeia
+        "2024-02-01": {"USD": 5.1, "EUR": 5.6},
+    }
+    for day, rates in days.items():
+        write_gold(day, rates, "delta")
+
+    meta = lambda d: goldformat.pq.read_schema(root / f"exchange_rates_brl_base_{d}.parquet").metadata
+    assert meta("2024-01-31")[goldformat.META_REF] == b"2024-01-30"
+    assert goldformat.META_REF not in meta("2024-02-01")  # cadeia recomeça no mês
+
+    df = store.read_range("gold")
+    assert df.columns.tolist() == ["date", "currency", "rate_brl_base", "last_update_utc"]
+    got = {(r.date, r.currency): r.rate_brl_base for r in df.itertuples()}
+    assert got == {(d, c): v for d, rates in days.items() for c, v in rates.items()}  # bits exatos
+    assert df.loc[df["date"] == "2024-01-31", "last_update_utc"].iloc[0] == "2024-01-31 00:00:01"
+
+    # regravar o dia de referência recodifica o dependente, que continua decodificando certo
+    write_gold("2024-01-30", {"USD": 4.9, "EUR": 5.4}, "delta")
+    d31 = goldformat.read(root / "exchange_rates_brl_base_2024-01-31.parquet").set_index("currency")
+    assert np.allclose(d31["rate_brl_base"][["USD", "EUR", "JPY"]], [5.0, 5.6, 0.034])
+
+    # volta para o Parquet tabular sem mudar o conteúdo lido
+    before = store.read_range("gold")
+    report = goldformat.convert("parquet")
+    assert report["files"] == 3 and report["bytes_after"] > 0
+    pd.testing.assert_frame_equal(store.read_range("gold"), before, check_dtype=False)
+
+def test_delta_against_plain_parquet_reference(write_gold):
+    # GOLD_FORMAT trocado no meio do mês: a referência é Parquet tabular com moeda fora do dicionário
+    write_gold("2024-01-01", {"USD": 5.0, "EUR": 5.5, "JPY": 0.034}, "parquet")
+    write_gold("2024-01-02", {"USD": 5.1, "EUR": 5.5}, "delta")
+    write_gold("2024-01-03", {"USD": 5.2, "EUR": 5.6}, "delta")
+    df = store.read_range("gold")
+    got = {(r.date, r.currency): r.rate_brl_base for r in df.itertuples()}
+    assert got == {("2024-01-01", "USD"): 5.0, ("2024-01-01", "EUR"): 5.5, ("2024-01-01", "JPY"): 0.034,
+                   ("2024-01-02", "USD"): 5.1, ("2024-01-02", "EUR"): 5.5,
+                   ("2024-01-03", "USD"): 5.2, ("2024-01-03", "EUR"): 5.6}
+    single = goldformat.read(Path("data/gold/exchange_rates_brl_base_2024-01-02.parquet"))
+    assert dict(zip(single["currency"], single["rate_brl_base"])) == {"USD": 5.1, "EUR": 5.5}
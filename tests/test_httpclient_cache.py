@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src import httpclient
+
+class StubAPI(BaseHTTPRequestHandler):
+    hits = []
+
+    def do_GET(self):
+        StubAPI.hits.append((self.path, self.headers.get("If-None-Match")))
+        if self.path.startswith("/broken"):
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.path == "/etag" and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = {"path": self.path}
+        if self.path == "/latest":
+            body["time_next_update_unix"] = int(time.time()) + 3600
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        if self.path == "/etag":
+            self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(httpclient, "_breakers", {})
+    StubAPI.hits = []
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), StubAPI)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+
+def test_cache_window_and_conditional_requests(api):
+    # dentro do time_next_update_unix: segunda chamada não vai à rede
+    assert httpclient.get_json(f"{api}/latest")["path"] == "/latest"
+    assert httpclient.get_json(f"{api}/latest")["path"] == "/latest"
+    assert [p for p, _ in StubAPI.hits] == ["/latest"]
+
+    # só ETag: revalida com If-None-Match e reaproveita o corpo no 304
+    httpclient.get_json(f"{api}/etag")
+    httpclient.session().close()
+    assert httpclient.get_json(f"{api}/etag") == {"path": "/etag"}
+    assert StubAPI.hits[1:] == [("/etag", None), ("/etag", '"v1"')]
+
+def test_circuit_breaker_opens_after_failures(api, monkeypatch):
+    monkeypatch.setattr(httpclient, "retry_delay", lambda attempt, retry_after: 0.0)
+    with pytest.raises(Exception):
+        httpclient.get_json(f"{api}/broken", retries=httpclient.BREAKER_THRESHOLD - 1)
+    n = len(StubAPI.hits)
+    with pytest.raises(httpclient.CircuitOpenError):
+        httpclient.get_json(f"{api}/broken2")
+    assert len(StubAPI.hits) == n  # recusado sem tocar a rede
+
+def test_iter_json_fetches_all(api):
+    urls = [f"{api}/day/{i}" for i in range(10)]
+    got = dict(httpclient.iter_json(urls, concurrency=4))
+    assert set(got) == set(urls) and got[urls[3]] == {"path": "/day/3"}
+
+def test_iter_json_stops_when_consumer_stops(api):
+    before = set(threading.enumerate())
+    urls = [f"{api}/day/{i}" for i in range(50)]
+    for _ in httpclient.iter_json(urls, concurrency=2, buffer=1):
+        break
+    # a thread do laço de eventos termina e não busca o resto das URLs
+    deadline = time.monotonic() + 5
+    while set(threading.enumerate()) - before and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not set(threading.enumerate()) - before
+    assert len(StubAPI.hits) < 10
@@ -13,3 +13,13 @@ def test_brl_conversion_math():
     assert abs(gold.loc["USD","rate_brl_base"] - 5.0) < 1e-9
     assert abs(gold.loc["BRL","rate_brl_base"] - 1.0) < 1e-9
     assert abs(gold.loc["EUR","rate_brl_base"] - 10.0) < 1e-9
+
+def test_cross_rate_matrix_any_base():
+    from src.crossrate import CrossRates
+    eng = CrossRates(["USD", "BRL", "EUR"], [1.0, 5.0, 0.5])
+    m = eng.matrix()
+    # linha = base, coluna = moeda: 1 EUR = 2 USD ; 1 BRL = 0,1 EUR
+    assert abs(m[0, 2] - 2.0) < 1e-12
+    assert abs(m[2, 1] - 0.1) < 1e-12
+    assert (eng.base_vector("EUR") == m[2]).all()
+    assert list(eng.table("eur").columns) == ["currency", "rate_eur_base", "last_update_utc"]
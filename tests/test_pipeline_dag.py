@@ -0,0 +1,80 @@
+import json
+import numpy as np
+from datetime import datetime, timezone
+from pathlib import Path
+from src import analytics
+from src.cube import RateCube, cube_dir
+from src.pipeline import Task, days_between, run_dag, run_pipeline
+
+def test_dag_passes_values_in_memory_and_skips_fresh(tmp_path):
+    calls = []
+
+    def produce(day):
+        calls.append("a")
+        (tmp_path / "a.txt").write_text("1")
+        return 21
+
+    def double(day, a):
+        calls.append("b")
+        (tmp_path / "b.txt").write_text("2")
+        return a * 2
+
+    tasks = [
+        Task("b", double, ["a"], lambda d: [tmp_path / "a.txt"], lambda d: [tmp_path / "b.txt"]),
+        Task("a", produce, outputs=lambda d: [tmp_path / "a.txt"]),
+    ]
+    results, timings = run_dag(tasks, "2024-01-01")
+    assert results["b"] == 42
+    assert [t["task"] for t in timings] == ["a", "b"]
+
+    _, timings = run_dag(tasks, "2024-01-01")
+    assert {t["status"] for t in timings} == {"skipped"}
+    assert calls == ["a", "b"]
+
+
+def _raw(day, usd_brl):
+    Path("data/raw").mkdir(parents=True, exist_ok=True)
+    ts = int(datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+    payload = {"base_code": "USD", "time_last_update_unix": ts,
+               "conversion_rates": {"USD": 1.0, "BRL": usd_brl, "EUR": 0.9}}
+    Path(f"data/raw/{day}.json").write_text(json.dumps(payload), encoding="utf-8")
+
+
+def test_pipeline_refreshes_globals_when_an_earlier_day_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    days = days_between("2024-01-01", "2024-01-03")
+    for day, brl in zip(days, [5.0, 5.01, 5.02]):
+        _raw(day, brl)
+    run_pipeline(days, with_enrich=False)
+    assert analytics.load_day("2024-01-02").set_index("currency").loc["USD", "value"] == 5.01
+
+    # raw novo para um dia do meio: gold regravada e snapshot/analytics/rollups refeitos
+    _raw("2024-01-02", 5.05)
+    timings = run_pipeline(days, with_enrich=False)
+    status = {(t["task"], t["day"]): t["status"] for t in timings}
+    assert status[("load", "2024-01-02")] == "ok" and status[("load", "2024-01-01")] == "skipped"
+    assert status[("analytics", "2024-01-03")] == status[("rollup", "2024-01-03")] == "ok"
+    assert RateCube.load(cube_dir("gold")).rate("2024-01-02", "USD") == 5.05
+    assert analytics.load_day("2024-01-02").set_index("currency").loc["USD", "value"] == 5.05
+
+
+def test_pipeline_quality_runs_in_date_order_across_workers(tmp_path, monkeypatch):
+    import time
+    from src import quality, transform
+    monkeypatch.chdir(tmp_path)
+    days = days_between("2024-01-01", "2024-01-05")
+    for day, brl in zip(days, [5.0, 5.0, 6.0, 6.0, 6.0]):
+        _raw(day, brl)
+    # a partição de 03/01 termina por último (processos filhos herdam o patch via fork)
+    slow_ts = int(datetime(2024, 1, 3, tzinfo=timezone.utc).timestamp())
+    real = transform.to_silver_df
+    monkeypatch.setattr(transform, "to_silver_df",
+                        lambda data: time.sleep(1.0 if data["time_last_update_unix"] == slow_ts else 0) or real(data))
+    run_pipeline(days, workers=5, with_enrich=False)
+
+    state = quality.QualityState.load()
+    # os cinco dias entraram na linha de base; a alta do BRL fica no retorno de 03/01, não no de 04/01
+    assert state.last_date == "2024-01-05" and state.pos == 5
+    brl = state.ring[:5, state._col["BRL"]]
+    assert abs(brl[2] - np.log(6.0 / 5.0)) < 1e-12 and brl[3] == 0.0
+    assert all((tmp_path / f"data/gold/quality/quality_{d}.json").exists() for d in days)
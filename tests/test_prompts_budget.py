@@ -0,0 +1,56 @@
+import json
+import pandas as pd
+import pytest
+import src.enrich as enrich
+from src import prompts
+from src.cube import RateCube
+
+
+def _batch_reply(messages):
+    """Um resumo por data pedida no prompt (formato de lote)."""
+    days = [d for d in ("2024-01-30", "2024-01-31", "2024-02-01") if f'"{d}"' in messages[1]["content"]]
+    return json.dumps({d: {"title": f"Lote {d}", "paragraphs": ["O dólar subiu."]} for d in days})
+
+
+def _seed(tmp_path, write_gold):
+    # USD sobe 1% ao dia; ARS e CLP formam a cesta latino-americana
+    for i, day in enumerate(pd.date_range("2024-01-01", "2024-02-01").strftime("%Y-%m-%d")):
+        write_gold(day, {"BRL": 1.0, "USD": 5.0 * 1.01 ** i, "EUR": 6.0, "ARS": 0.005, "CLP": 0.006 * 1.02 ** i})
+    return tmp_path / "data" / "gold"
+
+
+def test_features_and_budget_degradation(tmp_path, write_gold):
+    _seed(tmp_path, write_gold)
+    (f,) = prompts.features(["2024-02-01", "2023-12-31"], RateCube.open("gold"))
+    assert f.date == "2024-02-01" and list(f.rates) == ["USD", "EUR", "ARS"]
+    assert f.changes["USD"]["d"] == pytest.approx(1.0)
+    assert f.changes["USD"]["s"] == pytest.approx((1.01 ** 7 - 1) * 100)
+    assert f.changes["USD"]["m"] == pytest.approx((1.01 ** 30 - 1) * 100)
+    assert [c for c, _ in f.up] == ["CLP", "USD"] and f.down == []
+    # cesta: média dos log-retornos de ARS (0) e CLP (+2%)
+    assert f.latam["d"] == pytest.approx((1.02 ** 0.5 - 1) * 100)
+
+    full, est = prompts.build_messages([f])
+    assert "Altas no dia: CLP +2,00, USD +1,00" in full[1]["content"] and "Cesta América Latina" in full[1]["content"]
+    # orçamento apertado: seções opcionais saem (altas/quedas primeiro) antes das taxas
+    tight, small = prompts.build_messages([f], budget=est - 10)
+    assert small <= est - 10 and "Altas no dia" not in tight[1]["content"] and "Cesta" in tight[1]["content"]
+    bare, _ = prompts.build_messages([f], budget=0)
+    assert "Cesta" not in bare[1]["content"] and "USD 6,8066" in bare[1]["content"]
+
+
+def test_batched_enrich_one_call_for_several_days(tmp_path, write_gold, fake_llm):
+    gold = _seed(tmp_path, write_gold)
+    fake = fake_llm(_batch_reply)
+
+    assert enrich.main(start="2024-01-30", end="2024-02-01", mode="live", batch=3, max_tokens=200, model="m1")
+    assert len(fake.calls) == 1
+    assert fake.calls[0]["max_tokens"] == 600 and fake.calls[0]["model"] == "m1"
+    for day in ("2024-01-30", "2024-01-31", "2024-02-01"):
+        data = json.loads((gold / f"daily_summary_{day}.json").read_text(encoding="utf-8"))
+        assert data["title"] == f"Lote {day}"
+
+    # orçamento que só comporta um dia por pedido: três chamadas, cada uma dentro do limite
+    one_day = prompts.build_messages(prompts.features(["2024-02-01"]))[1]
+    enrich.main(start="2024-01-30", end="2024-02-01", mode="live", batch=3, prompt_budget=one_day + 5)
+    assert len(fake.calls) == 4
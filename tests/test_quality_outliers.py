@@ -0,0 +1,63 @@
+import json
+import numpy as np
+from src import quality
+from src.transform import to_silver_df
+
+
+def _raw(day_idx: int, brl: float, eur: float, extra: dict | None = None):
+    rates = {"USD": 1.0, "BRL": brl, "EUR": eur, **(extra or {})}
+    return {"base_code": "USD", "time_last_update_unix": 1_700_000_000 + day_idx * 86400, "conversion_rates": rates}
+
+
+def _history(n: int):
+    # ruído pequeno e determinístico em torno de BRL 5,0 / EUR 0,9
+    rng = np.random.default_rng(0)
+    return [(f"2024-01-{i + 1:02d}", 5.0 * np.exp(rng.normal(0, 0.004)), 0.9 * np.exp(rng.normal(0, 0.003)))
+            for i in range(n)]
+
+
+def test_jump_is_quarantined_and_baseline_kept(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for i, (day, brl, eur) in enumerate(_history(20)):
+        out = quality.check(day, to_silver_df(_raw(i, brl, eur)))
+        assert len(out) == 3
+
+    before = quality.QualityState.load()
+    level_eur = before.level[before._col["EUR"]]
+
+    # EUR 1000× maior (erro de unidade na fonte) e uma moeda nova
+    df = to_silver_df(_raw(20, 5.01, 900.0, {"JPY": 150.0}))
+    out = quality.check("2024-01-21", df)
+
+    # EUR sai da silver e vai para a quarentena; BRL e a moeda nova passam
+    assert "EUR" not in set(out["target_currency"])
+    assert {"USD", "BRL", "JPY"} <= set(out["target_currency"])
+    assert (tmp_path / "data/quarantine/2024-01-21.parquet").exists()
+
+    report = json.loads((tmp_path / "data/gold/quality/quality_2024-01-21.json").read_text(encoding="utf-8"))
+    assert report["status"] == "warn"
+    assert report["quarantined"] == 1
+    assert report["outliers"][0]["currency"] == "EUR"
+    assert report["drift"]["new"] == ["JPY"]
+
+    # a taxa quarentenada não entra na linha de base: o dia seguinte normal continua ok
+    after = quality.QualityState.load()
+    assert after.level[after._col["EUR"]] == level_eur
+    quality.check("2024-01-22", to_silver_df(_raw(21, 5.0, 0.9, {"JPY": 150.0})))
+    assert quality.load_report("2024-01-22")["status"] == "ok"
+
+
+def test_flag_mode_keeps_rows_and_missing_brl_is_error(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("QUALITY_MODE", "flag")
+    for i, (day, brl, eur) in enumerate(_history(15)):
+        quality.check(day, to_silver_df(_raw(i, brl, eur)))
+    out = quality.check("2024-01-16", to_silver_df(_raw(15, 5.0, 900.0)))
+    assert "EUR" in set(out["target_currency"])
+
+    raw = {"base_code": "USD", "time_last_update_unix": 1_700_000_000 + 16 * 86400,
+           "conversion_rates": {"USD": 1.0, "EUR": 0.9}}
+    quality.check("2024-01-17", to_silver_df(raw))
+    report = quality.load_report("2024-01-17")
+    assert report["status"] == "error"
+    assert report["errors"] == ["BRL ausente"]
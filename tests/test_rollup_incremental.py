@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from src import rollup
+
+
+def _rates(usd: float, eur: float | None = 6.0) -> dict:
+    return {"BRL": 1.0, "USD": usd} | ({"EUR": eur} if eur is not None else {})
+
+
+def test_aggregate_matches_pandas_resample():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2024-01-01", "2025-12-31")
+    block = 5.0 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(len(dates), 2)), axis=0))
+    block[rng.random(block.shape) < 0.1] = np.nan
+    df = rollup.aggregate(dates.strftime("%Y-%m-%d").tolist(), ["USD", "EUR"], block, "week")
+
+    ref = pd.Series(block[:, 0], index=dates).resample("W-MON", label="left", closed="left")
+    got = df[df["currency"] == "USD"].set_index("period")
+    assert got.index[0] == "2024-01-01"  # segunda-feira
+    assert np.allclose(got["high"], ref.max())
+    assert np.allclose(got["low"], ref.min())
+    assert np.allclose(got["mean"], ref.mean())
+    assert np.allclose(got["open"], ref.first()) and np.allclose(got["close"], ref.last())
+    assert got["n_obs"].tolist() == ref.count().tolist()
+
+
+def test_update_is_incremental_and_picks_resolution(write_gold):
+    for i, day in enumerate(pd.date_range("2025-01-01", "2025-02-28").strftime("%Y-%m-%d")):
+        write_gold(day, _rates(5.0 + i / 100, eur=None if day == "2025-02-03" else 6.0))
+    assert rollup.update() == "2025-01-01"
+    assert rollup.update() is None
+
+    # novo dia em março: janeiro não é regravado, fevereiro e o ano sim
+    write_gold("2025-03-01", _rates(9.0))
+    assert rollup.update() == "2025-03-01"
+    _, month = rollup.history(["USD"], resolution="month")
+    assert month["period"].tolist() == ["2025-01-01", "2025-02-01", "2025-03-01"]
+    assert month["high"].iloc[-1] == 9.0 and month["open"].iloc[0] == 5.0
+    _, year = rollup.history(["EUR"], resolution="year")
+    assert year["n_obs"].tolist() == [59]
+
+    # dia regravado no meio do histórico recalcula a partir dele
+    write_gold("2025-01-15", _rates(1.0))
+    assert rollup.update() == "2025-01-15"
+    _, month = rollup.history(["USD"], resolution="month")
+    assert month["low"].iloc[0] == 1.0
+
+    assert rollup.pick_resolution("2015-01-01", "2025-01-01") == "week"
+    assert rollup.pick_resolution("2015-01-01", "2025-01-01", max_points=200) == "month"
+    assert rollup.pick_resolution("2025-01-01", "2025-03-01") == "day"
+    res, df = rollup.history(["USD", "EUR"], "2025-01-10", "2025-02-20", max_points=10)
+    assert res == "week" and df["period"].min() == "2025-01-06"
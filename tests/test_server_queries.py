@@ -0,0 +1,41 @@
+import threading
+import urllib.request
+import pytest
+from src import server
+
+def test_server_answers_queries_and_reloads(monkeypatch, write_gold):
+    write_gold("2024-01-01", {"USD": 5.0, "EUR": 5.5, "BRL": 1.0})
+    write_gold("2024-01-02", {"USD": 5.1, "EUR": 5.4, "BRL": 1.0})
+    srv, state = server.make_server(port=0)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setenv("FX_SERVER_URL", f"http://127.0.0.1:{srv.server_port}")
+    try:
+        assert server.query("rate", {"currencies": "USD"})["rates"] == {"USD": 5.1}
+        assert server.query("cross", {"base": "USD", "currencies": "EUR"})["rates"]["EUR"] == pytest.approx(5.4 / 5.1)
+        rows = server.query("compare", {"date1": "2024-01-01", "date2": "2024-01-02", "top": 1})["rows"]
+        assert rows[0]["currency"] == "USD" and rows[0]["pct"] == pytest.approx(2.0)
+
+        # mesma consulta com o ETag recebido → 304 sem corpo
+        url = f"{server.server_url()}/series?currency=USD"
+        with urllib.request.urlopen(url) as r:
+            etag = r.headers["ETag"]
+        req = urllib.request.Request(url, headers={"If-None-Match": etag})
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(req)
+        assert e.value.code == 304
+
+        # nova partição → recarga troca a versão e invalida o ETag
+        write_gold("2024-01-03", {"USD": 5.2, "EUR": 5.3, "BRL": 1.0})
+        assert state.reload()
+        assert server.query("series", {"currency": "USD"})["values"] == [5.0, 5.1, 5.2]
+        with urllib.request.urlopen(urllib.request.Request(url, headers={"If-None-Match": etag})) as r:
+            assert r.status == 200
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+def test_query_returns_none_when_server_is_down(monkeypatch):
+    monkeypatch.setenv("FX_SERVER_URL", "http://127.0.0.1:9")
+    assert server.query("rate") is None
+    monkeypatch.setenv("FX_SERVER_URL", "off")
+    assert server.query("rate") is None
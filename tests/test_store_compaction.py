@@ -0,0 +1,43 @@
+import src.store as store
+
+def test_compact_then_read_range(tmp_path, write_gold):
+    for day, usd in [("2024-01-30", 5.0), ("2024-01-31", 5.1), ("2024-02-01", 5.2)]:
+        write_gold(day, {"USD": usd, "EUR": 6.0, "BRL": 1.0})
+
+    assert store.compact("gold") == 3
+    assert (tmp_path / "data" / "gold" / "dataset" / "year=2024" / "month=02" / "part-0.parquet").exists()
+
+    # dia novo ainda não compactado também aparece na leitura
+    write_gold("2024-02-02", {"USD": 5.3, "EUR": 6.1, "BRL": 1.0})
+    assert store.list_dates("gold") == ["2024-01-30", "2024-01-31", "2024-02-01", "2024-02-02"]
+
+    df = store.read_range("gold", "2024-01-31", "2024-02-02", ["usd"])
+    assert list(df["date"]) == ["2024-01-31", "2024-02-01", "2024-02-02"]
+    assert list(df["rate_brl_base"]) == [5.1, 5.2, 5.3]
+
+def test_daily_file_rewritten_after_compaction_wins(write_gold):
+    for day, usd in [("2024-03-01", 5.0), ("2024-03-02", 5.1)]:
+        write_gold(day, {"USD": usd, "BRL": 1.0})
+    assert store.compact("gold") == 2
+
+    # backfill refeito de um dia já compactado: a leitura usa o arquivo novo, sem duplicar o dia
+    write_gold("2024-03-02", {"USD": 9.9, "BRL": 1.0})
+    df = store.read_range("gold", currencies=["USD"])
+    assert list(df["date"]) == ["2024-03-01", "2024-03-02"]
+    assert list(df["rate_brl_base"]) == [5.0, 9.9]
+    assert list(store.read_days("gold", ["2024-03-02"], ["USD"])["rate_brl_base"]) == [9.9]
+
+    # a próxima compactação incorpora a regravação
+    assert store.compact("gold") == 1
+    assert list(store.read_range("gold", currencies=["USD"])["rate_brl_base"]) == [5.0, 9.9]
+
+def test_recompacted_day_drops_removed_currencies(write_gold):
+    write_gold("2024-04-01", {"USD": 5.0, "EUR": 6.0, "BRL": 1.0})
+    write_gold("2024-04-02", {"USD": 5.1, "EUR": 6.1, "BRL": 1.0})
+    assert store.compact("gold") == 2
+    # dia regravado sem EUR (ex.: quarentena): a recompactação não ressuscita a moeda
+    write_gold("2024-04-02", {"USD": 5.1, "BRL": 1.0})
+    assert store.compact("gold") == 1
+    df = store.read_range("gold")
+    assert sorted(df.loc[df["date"] == "2024-04-02", "currency"]) == ["BRL", "USD"]
+    assert sorted(df.loc[df["date"] == "2024-04-01", "currency"]) == ["BRL", "EUR", "USD"]
@@ -0,0 +1,62 @@
+import json
+import pytest
+from src import load, telemetry, transform
+
+
+def _spans(tmp_path):
+    lines = []
+    for p in sorted((tmp_path / "data" / "traces").glob("spans-*.jsonl")):
+        lines += [json.loads(l) for l in p.read_text(encoding="utf-8").splitlines()]
+    return lines
+
+
+def test_pipeline_stages_emit_spans_with_counters(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    raw = {"base_code": "USD", "time_last_update_unix": 1_756_512_000,
+           "conversion_rates": {"USD": 1.0, "BRL": 5.4, "EUR": 0.86, "XXX": -1}}
+    with telemetry.span("pipeline", days=1):
+        load.run("2025-08-30", transform.run("2025-08-30", raw))
+
+    spans = {s["span"]: s for s in _spans(tmp_path)}
+    assert {"pipeline", "transform", "quality", "load"} <= set(spans)
+    t = spans["transform"]
+    assert t["day"] == "2025-08-30" and t["parent"] == "pipeline" and t["status"] == "ok"
+    assert t["rows_in"] == 4 and t["rows_out"] == 3 and t["bytes_written"] > 0
+    assert spans["quality"]["parent"] == "transform"
+    assert spans["load"]["rows_out"] == 3
+    assert len({s["run"] for s in spans.values()}) == 1
+
+
+def test_errors_propagation_and_stats(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ValueError):
+        with telemetry.span("stage"):
+            raise ValueError("x")
+    for _ in range(3):
+        with telemetry.span("enrich") as s:
+            with telemetry.span("llm") as c:
+                c.set(tokens_in=100, tokens_out=50, cost_usd=0.001)
+    spans = _spans(tmp_path)
+    assert spans[0]["status"] == "error" and spans[0]["error"] == "ValueError"
+    # contadores de HTTP/LLM sobem para o span pai
+    assert [s["tokens_in"] for s in spans if s["span"] == "enrich"] == [100, 100, 100]
+
+    agg = telemetry.aggregate(telemetry.load_spans(1))
+    assert agg.loc["stage", "errors"] == 1
+    assert agg.loc["llm", "calls"] == 3 and agg.loc["llm", "tokens_out"] == 150
+    text = telemetry.to_openmetrics(agg)
+    assert 'fx_span_duration_seconds{span="llm",quantile="0.95"}' in text
+    assert 'fx_tokens_in_total{span="enrich"} 300' in text
+    assert text.endswith("# EOF\n")
+
+
+def test_trace_off_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("FX_TRACE", "off")
+
+    @telemetry.traced()
+    def work():
+        return 42
+
+    assert work() == 42
+    assert not (tmp_path / "data" / "traces").exists()
@@ -0,0 +1,44 @@
+import pandas as pd
+from src.ticks import TickStore
+
+def _payload(ts, usd_brl):
+    return {"result": "success", "base_code": "USD", "time_last_update_unix": ts,
+            "conversion_rates": {"USD": 1.0, "BRL": usd_brl, "EUR": 0.9}}
+
+def test_ticks_dedup_rate_at_time_and_close(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = TickStore()
+    t0 = 1724976000  # 2024-08-30 00:00:00 UTC
+    assert store.append(_payload(t0, 5.50))
+    assert not store.append(_payload(t0, 5.50))          # mesmo timestamp
+    assert not store.append(_payload(t0 + 600, 5.50))    # taxas inalteradas
+    assert store.append(_payload(t0 + 3600, 5.60))
+    assert store.append(_payload(t0 + 7200, 5.70))
+    assert store.timestamps().tolist() == [t0, t0 + 3600, t0 + 7200]
+
+    # taxa no instante T = último tick <= T
+    assert store.at(t0 - 1) is None
+    assert store.at("2024-08-30T01:30", ["BRL"])[1]["BRL"] == 5.60
+    assert store.history("BRL", t0 + 1)["rate"].tolist() == [5.60, 5.70]
+
+    gold = store.close_day("2024-08-30")
+    assert gold.set_index("currency")["rate_brl_base"]["USD"] == 5.70
+    assert pd.read_parquet("data/silver/2024-08-30.parquet")["rate"].notna().all()
+
+
+def test_null_rates_and_queries_across_days(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = TickStore()
+    t0 = 1724976000  # 2024-08-30 00:00:00 UTC
+    payload = _payload(t0, 5.50)
+    payload["conversion_rates"]["XYZ"] = None  # nulo em um payload válido da API
+    assert store.append(payload)
+    assert store.read(t0).isna().tolist() == [False, False, False, True]
+    assert store.append(_payload(t0 + 86400 + 60, 5.60))
+
+    # instante em um dia sem ticks: cai no último tick do dia anterior com dados
+    assert store.at(t0 + 3 * 86400)[1]["BRL"] == 5.60
+    assert store.at(t0 + 86400)[0] == t0
+    assert store.history("BRL")["rate"].tolist() == [5.50, 5.60]
+    assert store.history("XYZ")["rate"].isna().all()
+    assert store.history("BRL", t0 + 1, t0 + 2 * 86400)["ts"].tolist() == [t0 + 86460]
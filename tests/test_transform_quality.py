@@ -9,3 +9,16 @@ def test_quality_filters():
     }
     df = to_silver_df(raw)
     assert set(df['target_currency']) == {"USD", "BRL"}
+
+def test_schema_validation_and_non_numeric_rates():
+    import pytest
+    with pytest.raises(ValueError):
+        to_silver_df({"base_code": "USD", "conversion_rates": {"BRL": 5.0}})
+    raw = {
+        "base_code": "USD",
+        "time_last_update_unix": 4102444800,
+        "conversion_rates": {"USD": 1, "BRL": "5.0", "EUR": None, "ARS": "abc"}
+    }
+    df = to_silver_df(raw)
+    assert list(df['target_currency']) == ["USD", "BRL"]
+    assert list(df['rate']) == [1.0, 5.0]